@@ -73,11 +73,35 @@ class CSVImportArticleAdmin(utils_admin_utils.ArticleFKModelAdmin):
     date_hierarchy = ('imported')
 
 
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'job_type',
+        'status',
+        'journal',
+        'owner',
+        'processed',
+        'total',
+        'created',
+        'finished',
+    )
+    list_filter = (
+        'job_type',
+        'status',
+        'journal',
+    )
+    raw_id_fields = (
+        'owner',
+    )
+    date_hierarchy = ('created')
+
+
 for pair in [
     (models.ExportFile, ExportFileAdmin),
     (models.CSVImport, CSVImportAdmin),
     (models.CSVImportCreateArticle, CSVImportArticleAdmin),
     (models.CSVImportUpdateArticle, CSVImportArticleAdmin),
     (models.OJSFile,),
+    (models.ImportJob, ImportJobAdmin),
 ]:
     admin.site.register(*pair)
@@ -0,0 +1,10 @@
+"""
+Benchmarks for the importers.
+
+Each scenario generates a synthetic corpus, imports it into a throwaway test
+database and reports wall time, queries per article and peak RSS. Results
+can be compared against the baselines stored in baselines.json:
+
+    python manage.py benchmark_imports --articles 200 --authors 5
+    python manage.py benchmark_imports --scenario jats --save-baseline
+"""
@@ -0,0 +1,478 @@
+"""
+Generators of synthetic corpora for the importer benchmarks.
+
+The generated inputs are deterministic for a given size so that runs can be
+compared against each other.
+"""
+import base64
+import csv
+import io
+import json
+import zipfile
+from datetime import date, timedelta
+from xml.sax.saxutils import escape
+
+from plugins.imports import plugin_settings
+
+# Smallest valid files of each type, enough for mime detection to succeed
+PDF_BYTES = (
+    b'%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n'
+    b'2 0 obj<</Type/Pages/Kids[]/Count 0>>endobj\n'
+    b'trailer<</Root 1 0 R>>\n%%EOF\n'
+)
+PNG_BYTES = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNk'
+    '+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+)
+
+START_DATE = date(2020, 1, 1)
+
+
+def _article_date(index):
+    return START_DATE + timedelta(days=index)
+
+
+def _keywords(index, count=3):
+    return ['keyword {}'.format((index + i) % 50) for i in range(count)]
+
+
+def generate_update_csv(
+    journal_code, articles=100, authors=3, issues=10, keywords=3, start=0,
+):
+    """
+    Generates an Import / Export / Update CSV of new articles
+    :param journal_code: The code of the journal the articles are imported to
+    :param articles: Number of articles
+    :param authors: Number of author rows per article
+    :param issues: Number of issues the articles are spread across
+    :param keywords: Number of keywords per article
+    :param start: Index of the first article, to generate distinct articles
+    :return: The CSV as a string
+    """
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=plugin_settings.UPDATE_CSV_HEADERS)
+    writer.writeheader()
+
+    for i in range(start, start + articles):
+        published = _article_date(i)
+        for j in range(authors):
+            row = dict.fromkeys(plugin_settings.UPDATE_CSV_HEADERS, '')
+            row.update({
+                'Author given name': 'Given{}'.format(j),
+                'Author surname': 'Surname{}-{}'.format(i, j),
+                'Author email': 'author{}-{}@example.com'.format(i, j),
+                'Author institution': 'Institution {}'.format(j),
+                'Author is primary (Y/N)': 'Y' if j == 0 else 'N',
+                'Author is corporate (Y/N)': 'N',
+            })
+            if j == 0:
+                row.update({
+                    'Article title': 'Synthetic article {}'.format(i),
+                    'Article abstract': 'Abstract of article {}'.format(i),
+                    'Keywords': ', '.join(_keywords(i, keywords)),
+                    'Language': 'English',
+                    'Peer reviewed (Y/N)': 'Y',
+                    'DOI': '10.9999/bench.{}'.format(i),
+                    'Date accepted': published.isoformat(),
+                    'Date published': published.isoformat(),
+                    'First page': '1',
+                    'Last page': '10',
+                    'Article section': 'Article',
+                    'Stage': 'Published',
+                    'Journal code': journal_code,
+                    'Volume number': str(i % issues // 4 + 1),
+                    'Issue number': str(i % issues % 4 + 1),
+                    'Issue title': 'Issue {}'.format(i % issues),
+                    'Issue pub date': _article_date(i % issues).isoformat(),
+                })
+            writer.writerow(row)
+
+    return output.getvalue()
+
+
+def _jats_article(journal_code, index, authors, figures):
+    published = _article_date(index)
+    contribs = ''.join(
+        '<contrib contrib-type="author"><name>'
+        '<surname>Surname{i}-{j}</surname><given-names>Given{j}</given-names>'
+        '</name><email>author{i}-{j}@example.com</email>'
+        '<aff>Institution {j}</aff></contrib>'.format(i=index, j=j)
+        for j in range(authors)
+    )
+    keywords = ''.join(
+        '<kwd>{}</kwd>'.format(keyword) for keyword in _keywords(index)
+    )
+    figure_xml = ''.join(
+        '<fig id="f{j}"><graphic xlink:href="figures/fig{j}.png"/></fig>'.format(
+            j=j,
+        )
+        for j in range(figures)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<article xmlns:xlink="http://www.w3.org/1999/xlink" '
+        'article-type="research-article">'
+        '<front><journal-meta>'
+        '<journal-id journal-id-type="publisher-id">{code}</journal-id>'
+        '<journal-title-group><journal-title>Benchmark</journal-title>'
+        '</journal-title-group></journal-meta>'
+        '<article-meta>'
+        '<article-id pub-id-type="doi">10.9999/jats.{i}</article-id>'
+        '<title-group><article-title>Synthetic JATS article {i}'
+        '</article-title></title-group>'
+        '<contrib-group>{contribs}</contrib-group>'
+        '<pub-date date-type="pub"><day>{d.day}</day><month>{d.month}</month>'
+        '<year>{d.year}</year></pub-date>'
+        '<volume>{volume}</volume><issue>{issue}</issue>'
+        '<fpage>1</fpage><lpage>10</lpage>'
+        '<abstract><p>Abstract of article {i}</p></abstract>'
+        '<kwd-group>{keywords}</kwd-group>'
+        '</article-meta></front>'
+        '<body><sec><title>Introduction</title><p>Body of article {i}</p>'
+        '{figures}</sec></body></article>'
+    ).format(
+        code=escape(journal_code),
+        i=index,
+        d=published,
+        volume=index // 20 + 1,
+        issue=index % 4 + 1,
+        contribs=contribs,
+        keywords=keywords,
+        figures=figure_xml,
+    )
+
+
+def generate_jats_zip(path, journal_code, articles=100, authors=3, figures=2):
+    """
+    Writes a zip of JATS articles, one directory per article holding the
+    XML, a PDF and a figures directory.
+    :param path: Where the zip file is written
+    :return: The path of the zip file
+    """
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for i in range(articles):
+            folder = 'article{}'.format(i)
+            zf.writestr(
+                '{}/article{}.xml'.format(folder, i),
+                _jats_article(journal_code, i, authors, figures),
+            )
+            zf.writestr('{}/article{}.pdf'.format(folder, i), PDF_BYTES)
+            for j in range(figures):
+                zf.writestr(
+                    '{}/figures/fig{}.png'.format(folder, j),
+                    PNG_BYTES,
+                )
+    return path
+
+
+def _native_article(index, authors, files):
+    published = _article_date(index)
+    embedded = base64.b64encode(PDF_BYTES).decode()
+    submission_files = ''.join(
+        '<submission_file id="{file_id}" file_id="{file_id}" stage="proof">'
+        '<name locale="en_US">article{i}-{j}.pdf</name>'
+        '<file id="{file_id}" filesize="{size}" extension="pdf">'
+        '<embed encoding="base64">{embedded}</embed></file>'
+        '</submission_file>'.format(
+            i=index,
+            j=j,
+            file_id=index * 100 + j + 1,
+            size=len(PDF_BYTES),
+            embedded=embedded,
+        )
+        for j in range(files)
+    )
+    author_xml = ''.join(
+        '<author seq="{j}" user_group_ref="Author">'
+        '<givenname locale="en_US">Given{j}</givenname>'
+        '<familyname locale="en_US">Surname{i}-{j}</familyname>'
+        '<country>GB</country>'
+        '<email>author{i}-{j}@example.com</email></author>'.format(i=index, j=j)
+        for j in range(authors)
+    )
+    keywords = ''.join(
+        '<keyword>{}</keyword>'.format(keyword) for keyword in _keywords(index)
+    )
+    galleys = ''.join(
+        '<article_galley locale="en_US" approved="true">'
+        '<id type="internal" advice="ignore">{file_id}</id>'
+        '<name locale="en_US">PDF</name><seq>{j}</seq>'
+        '<submission_file_ref id="{file_id}"/></article_galley>'.format(
+            j=j, file_id=index * 100 + j + 1,
+        )
+        for j in range(files)
+    )
+    return (
+        '<article date_submitted="{d}" status="3" stage="production">'
+        '<id type="internal" advice="ignore">{i}</id>'
+        '{submission_files}'
+        '<publication version="1" status="3" section_ref="ART" '
+        'date_published="{d}">'
+        '<id type="internal" advice="ignore">{i}</id>'
+        '<id type="doi" advice="update">10.9999/native.{i}</id>'
+        '<title locale="en_US">Synthetic native article {i}</title>'
+        '<abstract locale="en_US">&lt;p&gt;Abstract {i}&lt;/p&gt;</abstract>'
+        '<licenseUrl>https://creativecommons.org/licenses/by/4.0/</licenseUrl>'
+        '<copyrightHolder locale="en_US">The authors</copyrightHolder>'
+        '<keywords locale="en_US">{keywords}</keywords>'
+        '<authors>{authors}</authors>'
+        '{galleys}'
+        '<pages>1-10</pages>'
+        '</publication></article>'
+    ).format(
+        i=index,
+        d=published.isoformat(),
+        submission_files=submission_files,
+        keywords=keywords,
+        authors=author_xml,
+        galleys=galleys,
+    )
+
+
+def generate_native_xml(articles=100, authors=3, files=1, issues=5):
+    """
+    Generates an OJS native XML export of issues with embedded files
+    :return: The XML as a string
+    """
+    per_issue = max(articles // issues, 1)
+    issue_xml = []
+    for issue_index, start in enumerate(range(0, articles, per_issue)):
+        published = _article_date(issue_index)
+        issue_xml.append(
+            '<issue published="1" current="0">'
+            '<id type="internal" advice="ignore">{n}</id>'
+            '<description locale="en_US">Issue {n}</description>'
+            '<issue_identification><volume>{volume}</volume>'
+            '<number>{number}</number><year>{year}</year>'
+            '</issue_identification>'
+            '<date_published>{d}</date_published>'
+            '<sections><section ref="ART" seq="0" meta_indexed="1" '
+            'editor_restricted="0"><id type="internal" advice="ignore">1</id>'
+            '<abbrev locale="en_US">ART</abbrev>'
+            '<title locale="en_US">Articles</title></section></sections>'
+            '<articles>{articles}</articles>'
+            '</issue>'.format(
+                n=issue_index,
+                volume=issue_index // 4 + 1,
+                number=issue_index % 4 + 1,
+                year=published.year,
+                d=published.isoformat(),
+                articles=''.join(
+                    _native_article(i, authors, files)
+                    for i in range(start, min(start + per_issue, articles))
+                ),
+            )
+        )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<issues xmlns="http://pkp.sfu.ca">{}</issues>'.format(''.join(issue_xml))
+    )
+
+
+def ojs3_author(submission_id, publication_id, seq):
+    return {
+        'affiliation': {'en_US': 'Institution {}'.format(seq)},
+        'email': 'author{}-{}@example.com'.format(submission_id, seq),
+        'familyName': {'en_US': 'Surname{}-{}'.format(submission_id, seq)},
+        'givenName': {'en_US': 'Given{}'.format(seq)},
+        'id': publication_id * 100 + seq,
+        'orcid': '',
+        'publicationId': publication_id,
+        'seq': seq,
+    }
+
+
+def ojs3_galley(base_url, submission_id, publication_id):
+    file_id = submission_id * 10
+    return {
+        'file': {
+            'createdAt': '2021-02-23 14:17:46',
+            'id': file_id,
+            'label': 'PDF',
+            'mimetype': 'application/pdf',
+            'name': {'en_US': 'article{}.pdf'.format(submission_id)},
+            'updatedAt': '2021-02-23 14:17:46',
+            'uploaderUserId': None,
+            'url': '{}/files/{}.pdf'.format(base_url, file_id),
+        },
+        'id': file_id,
+        'label': 'PDF',
+        'publicationId': publication_id,
+        'seq': 0,
+        'urlRemote': '',
+    }
+
+
+def ojs3_submission(submission_id, publication_id, published):
+    return {
+        'authors': [],
+        'currentPublicationId': publication_id,
+        'dateSubmitted': '{} 10:00:00'.format(published.isoformat()),
+        'editors': [],
+        'id': submission_id,
+        'locale': 'en_US',
+        'publications': [{'id': publication_id}],
+        'reviewAssignments': [],
+        'reviewRounds': [],
+        'section-editors': [],
+        'stageId': 5,
+        'status': 3,
+    }
+
+
+def ojs3_publication(
+    base_url, submission_id, publication_id, published, authors, keywords=3,
+):
+    return {
+        'abstract': {'en_US': 'Abstract of article {}'.format(submission_id)},
+        'authors': [
+            ojs3_author(submission_id, publication_id, seq)
+            for seq in range(authors)
+        ],
+        'datePublished': published.isoformat(),
+        'fullTitle': {
+            'en_US': 'Synthetic OJS3 article {}'.format(submission_id),
+        },
+        'galleys': [ojs3_galley(base_url, submission_id, publication_id)],
+        'id': publication_id,
+        'keywords': {'en_US': _keywords(submission_id, keywords)},
+        'licenseUrl': 'https://creativecommons.org/licenses/by/4.0/',
+        'pages': '1-10',
+        'pub-id::doi': '10.9999/ojs3.{}'.format(submission_id),
+        'sectionId': 1,
+        'submissionId': submission_id,
+    }
+
+
+def ojs3_submission_file(base_url, submission_id, file_id, file_stage):
+    return {
+        'assocId': None,
+        'createdAt': '2021-02-23 14:17:46',
+        'fileStage': file_stage,
+        'id': file_id,
+        'label': 'file',
+        'mimetype': 'application/pdf',
+        'name': {'en_US': 'submission{}-{}.pdf'.format(submission_id, file_id)},
+        'submissionId': submission_id,
+        'updatedAt': '2021-02-23 14:17:46',
+        'uploaderUserId': None,
+        'url': '{}/files/{}.pdf'.format(base_url, file_id),
+    }
+
+
+def ojs3_user(user_id, role_id=65536):
+    return {
+        'affiliation': {'en_US': 'Institution {}'.format(user_id % 10)},
+        'biography': None,
+        'country': None,
+        'disabled': False,
+        'email': 'user{}@example.com'.format(user_id),
+        'familyName': {'en_US': 'Surname{}'.format(user_id)},
+        'givenName': {'en_US': 'Given{}'.format(user_id)},
+        'groups': [{'id': role_id, 'roleId': role_id}],
+        'id': user_id,
+        'interests': [],
+        'orcid': None,
+        'signature': None,
+        'userName': 'user{}'.format(user_id),
+    }
+
+
+def ojs3_issue(base_url, issue_id, articles, galley_id=None):
+    """
+    :param articles: The submission dicts of the articles in the issue
+    :param galley_id: Optional ID of an issue galley
+    """
+    published = _article_date(issue_id)
+    return {
+        'articles': articles,
+        'coverImageUrl': {'en_US': ''},
+        'datePublished': '{} 00:00:00'.format(published.isoformat()),
+        'description': {'en_US': 'Issue {}'.format(issue_id)},
+        'galleys': [{'id': galley_id}] if galley_id else [],
+        'id': issue_id,
+        'isCurrent': False,
+        'isPublished': True,
+        'number': str(issue_id % 4 + 1),
+        'sections': [{'id': 1, 'seq': 0, 'title': {'en_US': 'Articles'}}],
+        'title': {'en_US': ''},
+        'volume': issue_id // 4 + 1,
+        'year': published.year,
+    }
+
+
+def ojs3_context(base_url, journal_id, url_path):
+    empty = {'en_US': ''}
+    return {
+        '_href': '{}/_/api/v1/contexts/{}'.format(base_url, journal_id),
+        'about': empty,
+        'acronym': {'en_US': url_path.upper()},
+        'authorGuidelines': empty,
+        'description': {'en_US': 'Journal {}'.format(journal_id)},
+        'editorialTeam': empty,
+        'favicon': {'en_US': None},
+        'id': journal_id,
+        'journalThumbnail': {'en_US': None},
+        'name': {'en_US': 'Synthetic journal {}'.format(journal_id)},
+        'onlineIssn': None,
+        'openAccessPolicy': empty,
+        'pageHeaderLogoImage': {'en_US': None},
+        'printIssn': None,
+        'publicationFeeDescription': empty,
+        'url': '{}/{}'.format(base_url, url_path),
+        'urlPath': url_path,
+    }
+
+
+def ojs3_publication_stats(submission_id):
+    return {
+        'abstractViews': submission_id * 7 % 500,
+        'galleyViews': submission_id * 3 % 200,
+        'publication': {'id': submission_id},
+    }
+
+
+def generate_ojs3_responses(base_url, articles=100, authors=3, per_page=20):
+    """
+    Generates the responses of an OJS 3 journal API for a number of
+    published submissions, keyed by request path and query string, in the
+    shape the stub server replays them.
+    :param base_url: The URL the stub server will be reachable at
+    :return: dict of 'path?query' => (content type, body bytes)
+    """
+    responses = {}
+
+    def add_json(path, data):
+        responses[path] = ('application/json', json.dumps(data).encode())
+
+    submissions = []
+    for i in range(articles):
+        submission_id = i + 1
+        publication_id = 1000 + submission_id
+        published = _article_date(i)
+        submission = ojs3_submission(submission_id, publication_id, published)
+        submissions.append(submission)
+        add_json('/api/v1/submissions/{}'.format(submission_id), submission)
+        add_json(
+            '/api/v1/submissions/{}/publications/{}'.format(
+                submission_id, publication_id,
+            ),
+            ojs3_publication(
+                base_url, submission_id, publication_id, published, authors,
+            ),
+        )
+        responses['/files/{}.pdf'.format(submission_id * 10)] = (
+            'application/pdf', PDF_BYTES,
+        )
+
+    # The client pages through the listing until it gets an empty page
+    for offset in range(0, articles + per_page, per_page):
+        add_json(
+            '/api/v1/submissions/?count={}&offset={}'.format(per_page, offset),
+            {
+                'items': submissions[offset:offset + per_page],
+                'itemsMax': len(submissions),
+            },
+        )
+
+    return responses
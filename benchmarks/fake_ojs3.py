@@ -0,0 +1,365 @@
+"""
+A fake OJS 3 REST API for load testing the OJS 3 client and importers.
+
+The server generates a synthetic corpus on demand, so it can stand in for
+journals of any size without holding them in memory. It implements the
+endpoints OJS3APIClient consumes: contexts, submissions and their
+publications and files, issues, users, publication stats and file
+downloads. Requests can be slowed down and made to fail at a given rate:
+
+    corpus = FakeOJS3Corpus(articles=1000, issues=20)
+    with FakeOJS3Server(corpus, latency=0.05, error_rate=0.01) as server:
+        client = clients.OJS3APIClient(server.journal_url())
+
+Recorded responses, keyed by path and query string as for the stub
+server, take precedence over the generated ones.
+"""
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from urllib import parse as urlparse
+
+from plugins.imports.benchmarks import corpora
+from plugins.imports.benchmarks.ojs3_stub import OJS3StubServer, ReplayHandler
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+PUBLICATION_ID_OFFSET = 1000000
+
+# File stages as defined by OJS3APIClient
+SUBMISSION_FILE_SUBMISSION = 2
+SUBMISSION_FILE_PRODUCTION_READY = 11
+
+
+class FakeOJS3Corpus(object):
+    """
+    A deterministic OJS 3 corpus. Every journal holds the same submissions,
+    issues and users, generated from their IDs when requested.
+    """
+    def __init__(
+        self, journals=1, articles=100, authors=3, issues=10, users=50,
+    ):
+        self.journals = journals
+        self.articles = articles
+        self.authors = authors
+        self.issues = issues
+        self.users = users
+        self.base_url = ''
+
+    @property
+    def journal_paths(self):
+        return ['journal{}'.format(i) for i in range(1, self.journals + 1)]
+
+    @property
+    def articles_per_issue(self):
+        if not self.issues:
+            return 0
+        return math.ceil(self.articles / self.issues)
+
+    def context(self, journal_id):
+        if not 1 <= journal_id <= self.journals:
+            return None
+        return corpora.ojs3_context(
+            self.base_url, journal_id, 'journal{}'.format(journal_id),
+        )
+
+    def submission(self, submission_id):
+        if not 1 <= submission_id <= self.articles:
+            return None
+        submission = corpora.ojs3_submission(
+            submission_id,
+            PUBLICATION_ID_OFFSET + submission_id,
+            corpora.START_DATE,
+        )
+        if self.users:
+            submission['authors'] = [(submission_id - 1) % self.users + 1]
+        return submission
+
+    def publication(self, submission_id, publication_id):
+        if (
+            not 1 <= submission_id <= self.articles
+            or publication_id != PUBLICATION_ID_OFFSET + submission_id
+        ):
+            return None
+        return corpora.ojs3_publication(
+            self.base_url, submission_id, publication_id,
+            corpora.START_DATE, self.authors,
+        )
+
+    def submission_files(self, submission_id, file_stages=None):
+        """ A manuscript and a production ready file for each submission"""
+        stages = (
+            SUBMISSION_FILE_SUBMISSION,
+            SUBMISSION_FILE_PRODUCTION_READY,
+        )
+        return [
+            corpora.ojs3_submission_file(
+                self.base_url, submission_id, submission_id * 10 + i, stage,
+            )
+            for i, stage in enumerate(stages, 1)
+            if not file_stages or stage in file_stages
+        ]
+
+    def issue(self, issue_id):
+        if not 1 <= issue_id <= self.issues:
+            return None
+        first = (issue_id - 1) * self.articles_per_issue + 1
+        last = min(first + self.articles_per_issue, self.articles + 1)
+        return corpora.ojs3_issue(
+            self.base_url,
+            issue_id,
+            [self.submission(i) for i in range(first, last)],
+            galley_id=issue_id,
+        )
+
+    def user(self, user_id):
+        if not 1 <= user_id <= self.users:
+            return None
+        return corpora.ojs3_user(user_id)
+
+
+ROUTES = []
+
+
+def route(pattern, journal=True):
+    """
+    Registers the decorated handler method for paths matching the pattern.
+    Journal routes are prefixed with the journal's URL path.
+    """
+    if journal:
+        pattern = r'/(?P<journal>[^/]+)' + pattern
+    regex = re.compile('^{}$'.format(pattern))
+
+    def decorator(func):
+        ROUTES.append((regex, func))
+        return func
+    return decorator
+
+
+def paginate(total, query, build):
+    """
+    Pages through items the way OJS 3 does, using offset and count. Only
+    the items in the requested page are built.
+    :param total: Number of items, with IDs from 1 to total
+    :param query: The query parameters of the request
+    :param build: Callable that returns the item for a given ID
+    """
+    offset = int(query.get('offset', 0))
+    count = min(int(query.get('count', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+    return {
+        'items': [
+            build(i)
+            for i in range(offset + 1, min(offset + count, total) + 1)
+        ],
+        'itemsMax': total,
+    }
+
+
+class FakeOJS3Handler(ReplayHandler):
+
+    def do_GET(self):
+        self.server.fake.simulate_latency()
+        if self.server.fake.should_fail():
+            self.server.fake.count('error')
+            self.send_error(500)
+            return
+        if self.replay():
+            self.server.fake.count('fixture')
+            return
+
+        parts = urlparse.urlsplit(self.path)
+        query = dict(urlparse.parse_qsl(parts.query))
+        for regex, handler in ROUTES:
+            match = regex.match(parts.path)
+            if not match:
+                continue
+            kwargs = match.groupdict()
+            journal_path = kwargs.pop('journal', None)
+            if (
+                journal_path is not None
+                and journal_path not in self.corpus.journal_paths
+            ):
+                continue
+            self.server.fake.count(handler.__name__)
+            response = handler(self, query, **kwargs)
+            if response is None:
+                self.send_error(404)
+            else:
+                self.send_body(*response)
+            return
+
+        self.server.fake.count('not_found')
+        self.send_error(404)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        self.server.fake.count('login')
+        self.send_response(200)
+        self.send_header('Set-Cookie', 'OJSSID=fake; Path=/')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    @property
+    def corpus(self):
+        return self.server.fake.corpus
+
+    @staticmethod
+    def json(data):
+        if data is None:
+            return None
+        return 'application/json', json.dumps(data).encode()
+
+    @route(r'/_/api/v1/contexts/?', journal=False)
+    def contexts(self, query):
+        contexts = [
+            self.corpus.context(i) for i in range(1, self.corpus.journals + 1)
+        ]
+        search = query.get('searchPhrase')
+        if search:
+            contexts = [c for c in contexts if c['urlPath'] == search]
+        return self.json(paginate(
+            len(contexts),
+            query,
+            lambda i: {
+                'id': contexts[i - 1]['id'],
+                '_href': contexts[i - 1]['_href'],
+            },
+        ))
+
+    @route(r'/_/api/v1/contexts/(?P<journal_id>\d+)', journal=False)
+    def context(self, query, journal_id):
+        return self.json(self.corpus.context(int(journal_id)))
+
+    @route(r'/files/(?P<name>[^/]+)', journal=False)
+    def file(self, query, name):
+        return 'application/pdf', corpora.PDF_BYTES
+
+    @route(r'/public/journals/(?P<journal_id>\d+)/(?P<name>[^/]+)', journal=False)
+    def public_file(self, query, journal_id, name):
+        return 'image/png', corpora.PNG_BYTES
+
+    @route(r'/issue/download/(?P<issue_id>\d+)/(?P<galley_id>\d+)')
+    def issue_galley(self, query, issue_id, galley_id):
+        return 'application/pdf', corpora.PDF_BYTES
+
+    @route(r'/api/v1/submissions/?')
+    def submissions(self, query):
+        return self.json(
+            paginate(self.corpus.articles, query, self.corpus.submission)
+        )
+
+    @route(r'/api/v1/submissions/(?P<submission_id>\d+)')
+    def submission(self, query, submission_id):
+        return self.json(self.corpus.submission(int(submission_id)))
+
+    @route(
+        r'/api/v1/submissions/(?P<submission_id>\d+)'
+        r'/publications/(?P<publication_id>\d+)'
+    )
+    def publication(self, query, submission_id, publication_id):
+        return self.json(
+            self.corpus.publication(int(submission_id), int(publication_id))
+        )
+
+    @route(r'/api/v1/submissions/(?P<submission_id>\d+)/files/?')
+    def submission_files(self, query, submission_id):
+        if not self.corpus.submission(int(submission_id)):
+            return None
+        file_stages = None
+        if query.get('fileStages'):
+            file_stages = {
+                int(stage) for stage in query['fileStages'].split(',')
+            }
+        files = self.corpus.submission_files(int(submission_id), file_stages)
+        return self.json(
+            paginate(len(files), query, lambda i: files[i - 1])
+        )
+
+    @route(r'/api/v1/issues/?')
+    def issues(self, query):
+        if query.get('isPublished') == 'False':
+            # Every issue in the corpus is published
+            return self.json({'items': [], 'itemsMax': 0})
+        return self.json(
+            paginate(self.corpus.issues, query, lambda i: {'id': i})
+        )
+
+    @route(r'/api/v1/issues/(?P<issue_id>\d+)')
+    def issue(self, query, issue_id):
+        return self.json(self.corpus.issue(int(issue_id)))
+
+    @route(r'/api/v1/users/?')
+    def users(self, query):
+        return self.json(
+            paginate(self.corpus.users, query, lambda i: {'id': i})
+        )
+
+    @route(r'/api/v1/users/(?P<user_id>\d+)')
+    def user(self, query, user_id):
+        return self.json(self.corpus.user(int(user_id)))
+
+    @route(r'/api/v1/stats/publications/?')
+    def publication_stats(self, query):
+        return self.json(paginate(
+            self.corpus.articles, query, corpora.ojs3_publication_stats,
+        ))
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeOJS3Server(OJS3StubServer):
+    """
+    Serves a FakeOJS3Corpus, in a background thread with start() or in the
+    foreground with serve_forever().
+    :param corpus: The FakeOJS3Corpus to serve
+    :param latency: Seconds added to every GET request
+    :param jitter: Up to this many seconds are added on top of the latency
+    :param error_rate: Fraction of GET requests answered with a 500
+    :param seed: Seed for the jitter and errors, so that runs are repeatable
+    :param responses: Recorded responses served in place of generated ones
+    """
+    HANDLER = FakeOJS3Handler
+
+    def __init__(
+        self, corpus=None, latency=0, jitter=0, error_rate=0, seed=0,
+        responses=None, host='127.0.0.1', port=0,
+    ):
+        super().__init__(responses=responses, host=host, port=port)
+        self.corpus = corpus or FakeOJS3Corpus()
+        self.corpus.base_url = self.url
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server.fake = self
+
+    def journal_url(self, journal_path=None):
+        return '{}/{}'.format(
+            self.url, journal_path or self.corpus.journal_paths[0],
+        )
+
+    def count(self, name):
+        with self._lock:
+            self.requests[name] += 1
+
+    def simulate_latency(self):
+        delay = self.latency
+        if self.jitter:
+            with self._lock:
+                delay += self._random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+
+    def should_fail(self):
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
@@ -0,0 +1,110 @@
+"""
+A local HTTP server that replays recorded OJS 3 API responses.
+
+Responses are looked up by request path and query string, query parameters
+are sorted so that their order doesn't matter. Posts to the login page
+always succeed so that authenticated clients can be pointed at the stub.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import parse as urlparse
+
+
+def normalise_path(path):
+    """ Sorts the query parameters of a request path"""
+    parts = urlparse.urlsplit(path)
+    query = urlparse.urlencode(sorted(urlparse.parse_qsl(parts.query)))
+    if query:
+        return '{}?{}'.format(parts.path, query)
+    return parts.path
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if not self.replay():
+            self.send_error(404)
+
+    def replay(self):
+        """ Sends the recorded response for the request path, if any"""
+        response = self.server.responses.get(normalise_path(self.path))
+        if response is None:
+            return False
+        self.send_body(*response)
+        return True
+
+    def send_body(self, content_type, body):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class OJS3StubServer(object):
+    """
+    Replays OJS 3 responses from a background thread:
+
+        with OJS3StubServer() as server:
+            server.responses = corpora.generate_ojs3_responses(server.url)
+            client = clients.OJS3APIClient(server.url)
+    """
+    HANDLER = ReplayHandler
+
+    def __init__(self, responses=None, host='127.0.0.1', port=0):
+        self._server = ThreadingHTTPServer((host, port), self.HANDLER)
+        self._server.daemon_threads = True
+        self._server.responses = {}
+        self.responses = responses or {}
+        self._thread = None
+
+    @property
+    def responses(self):
+        return self._server.responses
+
+    @responses.setter
+    def responses(self, responses):
+        self._server.responses = {
+            normalise_path(path): response
+            for path, response in responses.items()
+        }
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def serve_forever(self):
+        """ Serves requests on the calling thread until interrupted"""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
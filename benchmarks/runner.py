@@ -0,0 +1,246 @@
+"""
+Runs the importer benchmarks and compares them against stored baselines.
+
+Scenarios are registered with the scenario decorator. Each one generates its
+corpus and wraps the import in the measure context manager it is given, so
+that corpus generation is left out of the measurements. Every scenario runs
+in a transaction that is rolled back afterwards, so scenarios don't see each
+other's data.
+"""
+import csv
+import json
+import os
+import resource
+import sys
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.db import transaction
+from submission import models as submission_models
+
+from plugins.imports import instrumentation, jats, utils
+from plugins.imports.benchmarks import corpora
+from plugins.imports.benchmarks.fake_ojs3 import FakeOJS3Corpus, FakeOJS3Server
+from plugins.imports.benchmarks.ojs3_stub import OJS3StubServer
+from plugins.imports.ojs import clients, main, native
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), 'baselines.json')
+DEFAULT_TOLERANCE = 0.2
+# Round trip time simulated by the fake OJS 3 server, in seconds
+OJS3_LATENCY = 0.02
+COMPARED_METRICS = ('seconds_per_article', 'queries_per_article', 'peak_rss_mb')
+
+SCENARIOS = {}
+
+CorpusSize = namedtuple('CorpusSize', ['articles', 'authors'])
+
+
+def scenario(name):
+    """ Registers the decorated function as a benchmark scenario"""
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+
+def reset_peak_rss():
+    """
+    Resets the peak resident set size of the process so that each scenario
+    reports its own peak. Only supported on Linux, elsewhere the peak is the
+    high water mark of the whole process.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        return False
+    return True
+
+
+def get_peak_rss_mb():
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        # macOS reports bytes rather than kilobytes
+        max_rss /= 1024
+    return max_rss / 1024
+
+
+class Measurement(object):
+    def __init__(self, name, size, log_queries=False):
+        self.name = name
+        self.size = size
+        self.log_queries = log_queries
+        self.run = None
+        self.query_log = None
+        self.peak_rss_mb = None
+
+    @contextmanager
+    def __call__(self):
+        reset_peak_rss()
+        with instrumentation.track(self.name, total=self.size.articles) as run:
+            self.run = run
+            if self.log_queries:
+                with instrumentation.log_queries() as query_log:
+                    self.query_log = query_log
+                    yield run
+            else:
+                yield run
+        self.peak_rss_mb = get_peak_rss_mb()
+
+    def result(self):
+        articles = self.size.articles or 1
+        return {
+            'scenario': self.name,
+            'articles': self.size.articles,
+            'authors': self.size.authors,
+            'wall_seconds': round(self.run.elapsed, 3),
+            'seconds_per_article': round(self.run.elapsed / articles, 4),
+            'queries': self.run.queries,
+            'queries_per_article': round(self.run.queries / articles, 2),
+            'http_requests': self.run.http_requests,
+            'failed': self.run.failed,
+            'peak_rss_mb': round(self.peak_rss_mb, 1),
+            'duplicate_queries': (
+                len(self.query_log.duplicates()) if self.query_log else None
+            ),
+        }
+
+
+def run_scenario(name, journal, owner, size, query_report=0):
+    """
+    Runs a registered scenario and rolls back whatever it imported
+    :param name: The name the scenario is registered with
+    :param journal: The Journal the corpus is imported into
+    :param owner: The Account that owns the imported articles
+    :param size: A CorpusSize
+    :param query_report: Number of most repeated SQL statements to include
+        in the results, the SQL is only recorded when this is set
+    :return: A dict of results
+    """
+    measure = Measurement(name, size, log_queries=bool(query_report))
+    with transaction.atomic():
+        SCENARIOS[name](journal, owner, size, measure)
+        transaction.set_rollback(True)
+    result = measure.result()
+    if query_report:
+        result['query_report'] = measure.query_log.report(query_report)
+    return result
+
+
+def load_baselines(path=BASELINES_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as baselines_file:
+        return json.load(baselines_file)
+
+
+def save_baselines(results, path=BASELINES_PATH):
+    baselines = load_baselines(path)
+    for result in results:
+        baselines[result['scenario']] = {
+            key: value for key, value in result.items()
+            if key != 'query_report'
+        }
+    with open(path, 'w') as baselines_file:
+        json.dump(baselines, baselines_file, indent=2, sort_keys=True)
+
+
+def missing_baselines(results, baselines):
+    """
+    Lists the scenarios of the results with no baseline metrics recorded.
+    A scenario can be listed in the baselines with empty metrics.
+    """
+    return [
+        result['scenario'] for result in results
+        if not any(
+            (baselines.get(result['scenario']) or {}).get(metric)
+            for metric in COMPARED_METRICS
+        )
+    ]
+
+
+def compare(result, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares a result against its baseline
+    :param tolerance: Fraction a metric may grow before it is a regression
+    :return: A list of (metric, baseline value, new value) regressions
+    """
+    regressions = []
+    for metric in COMPARED_METRICS:
+        if metric == 'peak_rss_mb' and (
+            result['articles'] != baseline['articles']
+            or result['authors'] != baseline['authors']
+        ):
+            # Memory doesn't scale linearly with the corpus size
+            continue
+        old, new = baseline.get(metric), result.get(metric)
+        if old and new > old * (1 + tolerance):
+            regressions.append((metric, old, new))
+    return regressions
+
+
+@scenario('update_csv')
+def update_csv(journal, owner, size, measure):
+    csv_string = corpora.generate_update_csv(
+        journal.code, articles=size.articles, authors=size.authors,
+    )
+    reader = csv.DictReader(csv_string.splitlines())
+    with measure():
+        utils.update_article_metadata(reader, owner=owner)
+
+
+@scenario('jats')
+def jats_zip(journal, owner, size, measure):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        zip_path = corpora.generate_jats_zip(
+            os.path.join(temp_dir, 'jats.zip'),
+            journal.code,
+            articles=size.articles,
+            authors=size.authors,
+        )
+        with measure():
+            jats.import_jats_zipped(
+                zip_path, journal, owner=owner,
+                stage=submission_models.STAGE_PUBLISHED,
+            )
+
+
+@scenario('native_xml')
+def native_xml(journal, owner, size, measure):
+    xml_content = corpora.generate_native_xml(
+        articles=size.articles, authors=size.authors,
+    )
+    with measure():
+        native.import_issues(
+            xml_content, journal, owner, submission_models.STAGE_PUBLISHED,
+        )
+
+
+@scenario('ojs3')
+def ojs3_articles(journal, owner, size, measure):
+    with OJS3StubServer() as server:
+        server.responses = corpora.generate_ojs3_responses(
+            server.url, articles=size.articles, authors=size.authors,
+        )
+        client = clients.OJS3APIClient(server.url)
+        with measure():
+            main.import_ojs3_articles(client, journal)
+
+
+@scenario('ojs3_latency')
+def ojs3_articles_with_latency(journal, owner, size, measure):
+    corpus = FakeOJS3Corpus(
+        articles=size.articles, authors=size.authors, users=0,
+    )
+    with FakeOJS3Server(corpus, latency=OJS3_LATENCY) as server:
+        client = clients.OJS3APIClient(server.journal_url())
+        with measure():
+            main.import_ojs3_articles(client, journal)
@@ -0,0 +1,110 @@
+"""
+Date parsing shared by the importers.
+
+Imports repeat a small number of distinct date strings across a very large
+number of cells and JSON fields, and dateutil is slow, so parsed values are
+kept in bounded LRU caches. ISO 8601 strings, which is what CSV exports and
+the OJS APIs mostly produce, are parsed with datetime.fromisoformat and only
+other formats fall back to dateutil. Dates and datetimes are immutable, so
+the cached values are safe to share.
+"""
+import re
+from datetime import datetime
+from functools import lru_cache
+
+from dateutil import parser as dateutil_parser
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import get_current_timezone, is_aware, make_aware
+
+CACHE_SIZE = 8192
+# Set date time to 12 so the date doesn't change when a timezone is applied
+NOON = 12
+ISO_DATE_RE = re.compile('[0-9]{4}-[0-9]{2}-[0-9]{2}')
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse(date_string):
+    """
+    Parses a date string into a datetime, naive unless the string has an
+    offset
+    :param date_string: str
+    :return: datetime
+    :raises ValueError: if the string can't be parsed as a date
+    """
+    try:
+        return datetime.fromisoformat(date_string)
+    except ValueError:
+        return dateutil_parser.parse(date_string)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_datetime_or_date(date_string):
+    """
+    Parses a date string into a datetime, or a date when the string is an
+    ISO date without a time
+    :param date_string: str
+    :return: datetime, date or None if date_string is empty
+    """
+    if not date_string:
+        return None
+    return (
+        parse_datetime(date_string)
+        or parse_date(date_string)
+        or dateutil_parser.parse(date_string)
+    )
+
+
+def get_aware_datetime(date_string, use_noon_if_no_time=True, tz=None):
+    """
+    Parses a date string into a timezone aware datetime
+    :param date_string: str
+    :param use_noon_if_no_time: Set the time to noon for ISO dates without
+        a time
+    :param tz: The timezone for strings without an offset, defaults to the
+        current timezone
+    :return: datetime
+    """
+    return _get_aware_datetime(
+        date_string,
+        use_noon_if_no_time,
+        tz or get_current_timezone(),
+    )
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _get_aware_datetime(date_string, use_noon_if_no_time, tz):
+    if use_noon_if_no_time and ISO_DATE_RE.fullmatch(date_string):
+        date_string += ' 12:00'
+    parsed_datetime = parse(date_string)
+    if is_aware(parsed_datetime):
+        return parsed_datetime
+    return make_aware(parsed_datetime, tz)
+
+
+def get_aware_datetime_at_noon(date_string, tz=None):
+    """
+    Parses a date string into a timezone aware datetime at noon, discarding
+    the time of day, for sources that store dates at midnight with no offset
+    :param date_string: str
+    :param tz: The timezone to apply, defaults to the current timezone
+    :return: datetime
+    """
+    return _get_aware_datetime_at_noon(
+        date_string,
+        tz or get_current_timezone(),
+    )
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _get_aware_datetime_at_noon(date_string, tz):
+    return make_aware(parse(date_string).replace(hour=NOON), tz)
+
+
+def clear_caches():
+    for cached in (
+        parse,
+        parse_datetime_or_date,
+        _get_aware_datetime,
+        _get_aware_datetime_at_noon,
+    ):
+        cached.cache_clear()
@@ -1,9 +1,9 @@
+import io
 import zipfile
 import os
 import uuid
 import csv
 from itertools import (
-    chain,
     count,
     filterfalse,
 )
@@ -12,10 +12,13 @@ from plugins.imports import plugin_settings
 
 from bs4 import BeautifulSoup
 
+from django.db.models import Prefetch, QuerySet, prefetch_related_objects
+from django.http import StreamingHttpResponse
 from django.template.loader import render_to_string
 from submission import models as submission_models
 
 from core import files, models as core_models
+from plugins.imports import models
 
 
 CSV_HEADER_ROW = "Article identifier, Article title, Section Name, Volume number, Issue number, Subtitle, Abstract," \
@@ -157,42 +160,160 @@ def add_author_information(row, author, frozen, article):
     return row
 
 
-def export_using_import_format(articles):
+EXPORT_SELECT_RELATED = (
+    'correspondence_author',
+    'journal',
+    'license',
+    'primary_issue',
+    'projected_issue',
+    'section',
+)
+
+
+def get_export_prefetches():
     """
-    Exports data for an article using the schema specified for the 
-    Import / Export / Update tool.
+    Returns the prefetch lookups needed to generate export rows without
+    hitting the database once per article.
+    """
+    return [
+        'authors',
+        'articleauthororder_set',
+        'identifier_set',
+        'keywords',
+        Prefetch(
+            'frozenauthor_set',
+            queryset=submission_models.FrozenAuthor.objects.select_related(
+                'author',
+            ),
+        ),
+        Prefetch(
+            'fieldanswer_set',
+            queryset=submission_models.FieldAnswer.objects.select_related(
+                'field',
+            ),
+        ),
+        Prefetch(
+            'exportfile_set',
+            queryset=models.ExportFile.objects.select_related('file'),
+        ),
+    ]
+
+
+def prefetch_export_data(articles):
     """
+    Loads all of the data required to export the given articles.
+    :param articles: A queryset or an iterable of Article objects
+    :return: A queryset or list of articles with their relations loaded
+    """
+    if isinstance(articles, QuerySet):
+        # Clear any existing lookups, Django refuses to prefetch the same
+        # relation twice with a different queryset.
+        return articles.select_related(
+            *EXPORT_SELECT_RELATED,
+        ).prefetch_related(None).prefetch_related(
+            *get_export_prefetches(),
+        )
 
-    body_rows = []
+    articles = list(articles)
+    prefetch_related_objects(
+        articles,
+        *EXPORT_SELECT_RELATED,
+        *get_export_prefetches(),
+    )
+    return articles
+
+
+EXPORT_BATCH_SIZE = 500
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def get_custom_headers(articles):
+    """
+    Returns the names of the custom submission fields of every journal
+    the given articles belong to.
+    """
+    if isinstance(articles, QuerySet):
+        journal_ids = articles.values_list('journal_id', flat=True)
+    else:
+        journal_ids = {article.journal_id for article in articles}
+    return set(
+        submission_models.Field.objects.filter(
+            journal__id__in=journal_ids,
+        ).values_list('name', flat=True)
+    )
+
+
+def get_export_headers(articles):
     default_headers = plugin_settings.UPDATE_CSV_HEADERS
-    custom_headers = {}
+    custom_headers = get_custom_headers(articles)
+    return list(default_headers) + sorted(
+        custom_headers.difference(default_headers)
+    )
 
-    for article in articles:
-        body_rows.extend(generate_rows_for_article(article))
-        if article.journal.id not in custom_headers:
-            custom_headers[article.journal.id] = set(
-                article.journal.field_set.values_list("name", flat=True)
+
+def iter_article_batches(articles, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Yields the articles in batches with their export data prefetched, so
+    that only one batch is held in memory at a time.
+    """
+    if isinstance(articles, QuerySet):
+        article_pks = list(articles.values_list('pk', flat=True))
+        for i in range(0, len(article_pks), batch_size):
+            yield prefetch_export_data(
+                submission_models.Article.objects.filter(
+                    pk__in=article_pks[i:i + batch_size],
+                ).order_by('pk')
             )
+    else:
+        articles = list(articles)
+        for i in range(0, len(articles), batch_size):
+            yield prefetch_export_data(articles[i:i + batch_size])
+
+
+def iter_export_rows(articles, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Lazily yields the import format rows for the given articles.
+    """
+    for batch in iter_article_batches(articles, batch_size):
+        for article in batch:
+            yield from generate_rows_for_article(article)
+
 
+def export_using_import_format(articles):
+    """
+    Exports data for an article using the schema specified for the 
+    Import / Export / Update tool.
+    """
     csv_name = '{0}.csv'.format(uuid.uuid4())
     filepath = files.get_temp_file_path_from_name(
         csv_name,
     )
 
     with open(filepath, "w", encoding="utf-8") as f:
-        export_headers = set(chain(
-            default_headers,
-            *custom_headers.values()
-        ))
-        wr = csv.DictWriter(f, fieldnames=export_headers)
+        wr = csv.DictWriter(f, fieldnames=get_export_headers(articles))
         wr.writeheader()
-        for row in body_rows:
+        for row in iter_export_rows(articles):
             wr.writerow(row)
 
     return filepath, csv_name
 
 
+def get_doi(article):
+    """
+    Returns the article DOI from the (possibly prefetched) identifiers
+    instead of querying for it like Article.get_doi does.
+    """
+    for identifier in article.identifier_set.all():
+        if identifier.id_type == 'doi':
+            return identifier.identifier
+    return None
+
+
 def generate_rows_for_article(article):
+    """
+    Generates the export rows for an article. Call prefetch_export_data
+    first when exporting more than a handful of articles.
+    """
     body_rows = []
     row = {}
 
@@ -203,6 +324,8 @@ def generate_rows_for_article(article):
     else:
         issue = None
 
+    doi = get_doi(article)
+
     row['Janeway ID'] = article.pk
     row['Article title'] = article.title
     row['Article abstract'] = article.abstract
@@ -213,8 +336,8 @@ def generate_rows_for_article(article):
     row['Licence'] = article.license.short_name if article.license else ''
     row['Language'] = article.get_language_display()
     row['Peer reviewed (Y/N)'] = 'Y' if article.peer_reviewed else 'N'
-    row['DOI'] = article.get_doi() if article.get_doi() else ''
-    row['DOI (URL form)'] = "https://doi.org/{}".format(article.get_doi()) if article.get_doi() else ''
+    row['DOI'] = doi if doi else ''
+    row['DOI (URL form)'] = "https://doi.org/{}".format(doi) if doi else ''
     row['Date accepted'] = article.date_accepted.isoformat() if article.date_accepted else ''
     row['Date published'] = article.date_published.isoformat() if article.date_published else ''
     row['Article number'] = article.article_number
@@ -235,29 +358,30 @@ def generate_rows_for_article(article):
 
     export_custom_submission_fields(row, article)
 
-    if article.frozen_authors():
-        author_list = article.frozen_authors()
+    frozen_authors = article.frozenauthor_set.all()
+    if frozen_authors:
+        author_list = frozen_authors
         frozen = True
     else:
         author_list = article.authors.all()
         frozen = False
 
+    author_orders = {
+        author_order.author_id: author_order.order
+        for author_order in article.articleauthororder_set.all()
+    }
     author_dict = {}
 
     for author in author_list:
         if frozen:
             order = author.order
+        elif author.pk in author_orders:
+            order = author_orders[author.pk]
         else:
-            try:
-                order = submission_models.ArticleAuthorOrder.objects.get(
-                    article=article,
-                    author=author
-                ).order
-            except submission_models.ArticleAuthorOrder.DoesNotExist:
-                order = next(filterfalse(
-                    set(author_dict.keys()).__contains__,
-                    count(1)
-                ))
+            order = next(filterfalse(
+                set(author_dict.keys()).__contains__,
+                count(1)
+            ))
         author_dict[order] = author
 
     for order in sorted(list(author_dict.keys())):
@@ -278,21 +402,99 @@ def export_custom_submission_fields(row, article):
         row[field_answer.field.name] = field_answer.answer
 
 
-def zip_export_files(journal, articles, csv_path):
-    zip_file_name = 'export_{}_csv.zip'.format(journal.code)
-    zip_path = os.path.join(files.TEMP_DIR, zip_file_name)
-    zip_file = zipfile.ZipFile(zip_path, mode='w')
+class StreamBuffer(object):
+    """
+    A write only file-like object used as the target of a ZipFile so the
+    written bytes can be handed to a StreamingHttpResponse as they arrive.
+    It has no tell or seek, which makes ZipFile write in streaming mode.
+    """
+    def __init__(self):
+        self.chunks = []
 
-    zip_file.write(
-        csv_path,
-        'article_data.csv'
-    )
-    for article in articles:
-        for export_file in article.export_files:
-            zip_file.write(
-                export_file.file.self_article_path(),
-                '{}/{}'.format(article.pk, export_file.file.original_filename),
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_export_zip(articles):
+    """
+    Generates a ZIP containing the import format CSV of the given articles
+    and their export files. The ZIP is built incrementally, bytes are
+    yielded as soon as they are written.
+    :param articles: A queryset or an iterable of Article objects
+    """
+    buffer = StreamBuffer()
+
+    with zipfile.ZipFile(buffer, mode='w') as zip_file:
+        with zip_file.open(
+            'article_data.csv', mode='w', force_zip64=True,
+        ) as csv_entry:
+            csv_file = io.TextIOWrapper(csv_entry, encoding='utf-8')
+            wr = csv.DictWriter(
+                csv_file,
+                fieldnames=get_export_headers(articles),
             )
+            wr.writeheader()
+            for row in iter_export_rows(articles):
+                wr.writerow(row)
+                chunk = buffer.pop()
+                if chunk:
+                    yield chunk
+            csv_file.flush()
+            csv_file.detach()
+        yield buffer.pop()
+
+        if isinstance(articles, QuerySet):
+            export_files = models.ExportFile.objects.filter(
+                article__in=articles,
+            )
+        else:
+            export_files = models.ExportFile.objects.filter(
+                article__in=[article.pk for article in articles],
+            )
+        export_files = export_files.select_related('file').order_by(
+            'article_id',
+            'pk',
+        )
 
-    zip_file.close()
-    return files.serve_temp_file(zip_path, zip_file_name)
+        for export_file in export_files.iterator():
+            file_path = export_file.file.self_article_path()
+            if not os.path.exists(file_path):
+                continue
+            zip_path = '{}/{}'.format(
+                export_file.article_id,
+                export_file.file.original_filename,
+            )
+            with open(file_path, 'rb') as source, zip_file.open(
+                zip_path, mode='w', force_zip64=True,
+            ) as zip_entry:
+                for data in iter(lambda: source.read(STREAM_CHUNK_SIZE), b''):
+                    zip_entry.write(data)
+                    yield buffer.pop()
+            yield buffer.pop()
+
+    yield buffer.pop()
+
+
+def stream_export_response(journal, articles):
+    """
+    Returns a StreamingHttpResponse serving the export ZIP of the given
+    articles without writing it to disk first.
+    """
+    zip_file_name = 'export_{}_csv.zip'.format(journal.code)
+    response = StreamingHttpResponse(
+        stream_export_zip(articles),
+        content_type='application/zip',
+    )
+    response['Content-Disposition'] = 'attachment; filename="{}"'.format(
+        zip_file_name,
+    )
+    return response
@@ -0,0 +1,163 @@
+"""
+Reconciles the frozen authors of imported articles in bulk.
+
+Importers describe the authors of each article as a list of FrozenAuthor
+field values. The list is compared with the frozen authors the article
+already has, position by position, so a re-import only inserts, updates or
+deletes the rows that differ, with one bulk query of each kind for a whole
+batch of articles. Accounts are resolved by email with a single query.
+
+A row that is reused for a different author has the fields describing the
+person reset to their defaults first, so it keeps nothing of the author it
+held before.
+"""
+from collections import defaultdict
+from itertools import zip_longest
+
+from django.db.models.functions import Lower
+
+from core import models as core_models
+from submission import models as submission_models
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Fields describing the person a frozen author stands for, which are reset
+# when a row is reused for another author. Fields missing from the installed
+# version of Janeway are skipped.
+PERSON_FIELDS = (
+    'author',
+    'first_name',
+    'middle_name',
+    'last_name',
+    'name_prefix',
+    'name_suffix',
+    'institution',
+    'department',
+    'country',
+    'frozen_biography',
+    'frozen_email',
+    'frozen_orcid',
+    'display_email',
+    'is_corporate',
+)
+
+
+def resolve_accounts(emails, create_defaults=None):
+    """
+    Looks up the accounts of many emails, ignoring their case
+    :param emails: An iterable of email addresses
+    :param create_defaults: Optional dict of email to the field values of an
+        account to create when there is none for that email
+    :return: A dict of lowercased email to Account
+    """
+    lowered = {email.lower() for email in emails if email}
+    accounts = {}
+    if lowered:
+        for account in core_models.Account.objects.annotate(
+            lower_email=Lower('email'),
+        ).filter(lower_email__in=lowered):
+            accounts[account.lower_email] = account
+
+    for email, defaults in (create_defaults or {}).items():
+        if email and email.lower() not in accounts:
+            accounts[email.lower()] = core_models.Account.objects.create(
+                email=email,
+                **defaults,
+            )
+    return accounts
+
+
+def get_account(accounts, email):
+    """ Returns the account resolved for an email, if there is one"""
+    if not email:
+        return None
+    return accounts.get(email.lower())
+
+
+def get_person_defaults():
+    """ Returns the default value of each person field of FrozenAuthor"""
+    fields = {
+        field.name: field
+        for field in submission_models.FrozenAuthor._meta.get_fields()
+    }
+    return {
+        name: fields[name].get_default()
+        for name in PERSON_FIELDS if name in fields
+    }
+
+
+def _apply(frozen_author, values):
+    """ Sets the values on a frozen author, returning whether any changed"""
+    changed = False
+    for name, value in values.items():
+        field = frozen_author._meta.get_field(name)
+        if field.is_relation:
+            # Compare IDs so that the current object isn't fetched
+            if getattr(frozen_author, field.attname) != (
+                value.pk if value else None
+            ):
+                setattr(frozen_author, name, value)
+                changed = True
+        elif getattr(frozen_author, name) != value:
+            setattr(frozen_author, name, value)
+            changed = True
+    return changed
+
+
+def reconcile(authors_by_article):
+    """
+    Makes the frozen authors of each article match the given authors
+    :param authors_by_article: A dict of Article to a list of dicts of
+        FrozenAuthor field values, in author order. An 'author' value is the
+        linked Account or None. Person fields that aren't given are reset to
+        their defaults.
+    :return: A tuple of the number of frozen authors created, updated and
+        deleted
+    """
+    if not authors_by_article:
+        return 0, 0, 0
+
+    existing = defaultdict(list)
+    for frozen_author in submission_models.FrozenAuthor.objects.filter(
+        article__in=authors_by_article,
+    ).order_by('order', 'pk'):
+        existing[frozen_author.article_id].append(frozen_author)
+
+    person_defaults = get_person_defaults()
+    to_create = []
+    to_update = []
+    to_delete = []
+    update_fields = set()
+    for article, authors in authors_by_article.items():
+        for frozen_author, values in zip_longest(
+            existing[article.pk], authors,
+        ):
+            if values is None:
+                to_delete.append(frozen_author.pk)
+                continue
+            values = dict(person_defaults, **values)
+            if frozen_author is None:
+                to_create.append(
+                    submission_models.FrozenAuthor(article=article, **values)
+                )
+            elif _apply(frozen_author, values):
+                to_update.append(frozen_author)
+                update_fields.update(values)
+
+    if to_delete:
+        submission_models.FrozenAuthor.objects.filter(
+            pk__in=to_delete,
+        ).delete()
+    if to_update:
+        submission_models.FrozenAuthor.objects.bulk_update(
+            to_update, sorted(update_fields),
+        )
+    if to_create:
+        submission_models.FrozenAuthor.objects.bulk_create(to_create)
+
+    logger.debug(
+        "Frozen authors created: %s, updated: %s, deleted: %s",
+        len(to_create), len(to_update), len(to_delete),
+    )
+    return len(to_create), len(to_update), len(to_delete)
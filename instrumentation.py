@@ -0,0 +1,357 @@
+"""
+Progress and throughput instrumentation for the importers.
+
+An import run counts the items it processes, the time spent in named
+phases and the DB queries and HTTP requests issued along the way. Progress
+is logged as JSON records and a summary can be written to a JSON file
+at the end of the run:
+
+    with instrumentation.track('my_import', total=len(rows)) as run:
+        for row in rows:
+            with run.item(row['id']):
+                with instrumentation.phase('authors'):
+                    ...
+
+Code further down the call stack can use the module level item and phase
+helpers, they do nothing when no run is being tracked.
+
+log_queries records the SQL itself, so that the statements an import
+repeats can be found:
+
+    with instrumentation.log_queries() as query_log:
+        ...
+    print(query_log.report())
+"""
+import contextvars
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+from django.db import connection
+from django.utils import timezone
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_current_run = contextvars.ContextVar('imports_current_run', default=None)
+
+LOG_INTERVAL = 10
+
+
+class ImportRun(object):
+    def __init__(self, name, total=None, log_interval=LOG_INTERVAL):
+        self.name = name
+        self.total = total
+        self.log_interval = log_interval
+        self.processed = 0
+        self.failed = 0
+        self.queries = 0
+        self.http_requests = 0
+        self.counters = defaultdict(int)
+        self.phases = defaultdict(
+            lambda: {'count': 0, 'seconds': 0, 'queries': 0, 'http_requests': 0}
+        )
+        self.started = timezone.now()
+        self.finished = None
+        self._start_time = time.perf_counter()
+        self._end_time = None
+        self._last_log = self._start_time
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _thread_counts(self):
+        if not hasattr(self._local, 'counts'):
+            self._local.counts = {'queries': 0, 'http_requests': 0}
+        return self._local.counts
+
+    def _count_query(self, execute, sql, params, many, context):
+        with self._lock:
+            self.queries += 1
+        self._thread_counts()['queries'] += 1
+        return execute(sql, params, many, context)
+
+    def count_http_request(self):
+        with self._lock:
+            self.http_requests += 1
+        self._thread_counts()['http_requests'] += 1
+
+    def incr(self, counter, value=1):
+        """ Increments a free form counter reported in the summary"""
+        with self._lock:
+            self.counters[counter] += value
+
+    @contextmanager
+    def bind(self):
+        """
+        Makes this the current run of the calling thread and counts the
+        queries run on the thread's database connection.
+        """
+        token = _current_run.set(self)
+        try:
+            with connection.execute_wrapper(self._count_query):
+                yield self
+        finally:
+            _current_run.reset(token)
+
+    @contextmanager
+    def _measure(self):
+        counts = self._thread_counts()
+        queries, http_requests = counts['queries'], counts['http_requests']
+        start = time.perf_counter()
+        measurement = {}
+        try:
+            yield measurement
+        finally:
+            measurement['seconds'] = time.perf_counter() - start
+            measurement['queries'] = counts['queries'] - queries
+            measurement['http_requests'] = (
+                counts['http_requests'] - http_requests
+            )
+
+    @contextmanager
+    def item(self, label=None):
+        """ Measures the processing of a single item"""
+        failed = False
+        with self._measure() as measurement:
+            try:
+                yield
+            except Exception:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self.processed += 1
+                    if failed:
+                        self.failed += 1
+        logger.debug(json.dumps({
+            'event': 'import_item',
+            'run': self.name,
+            'item': str(label) if label is not None else None,
+            'failed': failed,
+            **measurement,
+        }))
+        self.log_progress()
+
+    @contextmanager
+    def phase(self, name):
+        """ Accumulates the time, queries and requests spent in a phase"""
+        with self._measure() as measurement:
+            yield
+        with self._lock:
+            phase = self.phases[name]
+            phase['count'] += 1
+            for key in ('seconds', 'queries', 'http_requests'):
+                phase[key] += measurement[key]
+
+    @property
+    def elapsed(self):
+        return (self._end_time or time.perf_counter()) - self._start_time
+
+    @property
+    def items_per_second(self):
+        if not self.elapsed:
+            return 0
+        return self.processed / self.elapsed
+
+    @property
+    def eta(self):
+        """ Estimated seconds until the run completes, if the total is known"""
+        if self.total is None or not self.items_per_second:
+            return None
+        return max(self.total - self.processed, 0) / self.items_per_second
+
+    def log_progress(self, force=False):
+        now = time.perf_counter()
+        if not force and now - self._last_log < self.log_interval:
+            return
+        self._last_log = now
+        logger.info(json.dumps({
+            'event': 'import_progress',
+            'run': self.name,
+            'processed': self.processed,
+            'total': self.total,
+            'failed': self.failed,
+            'items_per_second': round(self.items_per_second, 2),
+            'eta_seconds': round(self.eta) if self.eta is not None else None,
+            'queries': self.queries,
+            'http_requests': self.http_requests,
+        }))
+
+    def finish(self):
+        self._end_time = time.perf_counter()
+        self.finished = timezone.now()
+
+    def summary(self):
+        processed = self.processed or 1
+        return {
+            'run': self.name,
+            'started': self.started.isoformat(),
+            'finished': self.finished.isoformat() if self.finished else None,
+            'seconds': round(self.elapsed, 3),
+            'processed': self.processed,
+            'total': self.total,
+            'failed': self.failed,
+            'items_per_second': round(self.items_per_second, 2),
+            'queries': self.queries,
+            'queries_per_item': round(self.queries / processed, 2),
+            'http_requests': self.http_requests,
+            'http_requests_per_item': round(self.http_requests / processed, 2),
+            'counters': dict(self.counters),
+            'phases': {
+                name: dict(phase, seconds=round(phase['seconds'], 3))
+                for name, phase in sorted(
+                    self.phases.items(),
+                    key=lambda phase: phase[1]['seconds'],
+                    reverse=True,
+                )
+            },
+        }
+
+    def write_summary(self, path):
+        with open(path, 'w') as summary_file:
+            json.dump(self.summary(), summary_file, indent=2)
+
+
+def current_run():
+    return _current_run.get()
+
+
+@contextmanager
+def track(name, total=None, summary_path=None, log_interval=LOG_INTERVAL):
+    """
+    Tracks an import run. If a run is already being tracked, for instance
+    by the management command that called the importer, it is reused.
+    :param name: A name for the run, used in the log records
+    :param total: The number of items expected, used for the ETA
+    :param summary_path: Optional path where a JSON summary is written
+    :param log_interval: Minimum number of seconds between progress logs
+    """
+    run = current_run()
+    if run is not None:
+        if total is not None:
+            run.total = total
+        yield run
+        return
+
+    run = ImportRun(name, total=total, log_interval=log_interval)
+    with run.bind():
+        try:
+            yield run
+        finally:
+            run.finish()
+            run.log_progress(force=True)
+            logger.info(json.dumps(
+                {'event': 'import_summary', **run.summary()}
+            ))
+            if summary_path:
+                run.write_summary(summary_path)
+
+
+def item(label=None):
+    run = current_run()
+    return run.item(label) if run else nullcontext()
+
+
+def phase(name):
+    run = current_run()
+    return run.phase(name) if run else nullcontext()
+
+
+def incr(counter, value=1):
+    run = current_run()
+    if run:
+        run.incr(counter, value)
+
+
+def record_http_request(*args, **kwargs):
+    """ Counts an HTTP request against the current run, if there is one"""
+    run = current_run()
+    if run:
+        run.count_http_request()
+
+
+def count_session_requests(session):
+    """ Counts every response received by a requests session"""
+    if record_http_request not in session.hooks['response']:
+        session.hooks['response'].append(record_http_request)
+    return session
+
+
+def bind_current_run(func):
+    """
+    Wraps a function so that, when called from a worker thread, it reports
+    to the run that was current when it was wrapped.
+    """
+    run = current_run()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if run is None:
+            return func(*args, **kwargs)
+        with run.bind():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+class QueryLog(object):
+    """ Records the SQL statements run on a database connection"""
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, repr(params)))
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def duplicates(self):
+        """
+        Statements that were run more than once with the same parameters
+        :return: A list of (sql, params, count) tuples, most repeated first
+        """
+        return [
+            (sql, params, count)
+            for (sql, params), count in Counter(self.queries).most_common()
+            if count > 1
+        ]
+
+    def most_repeated(self, limit=10):
+        """
+        Statements that were run most often, regardless of their parameters
+        :return: A list of (sql, count) tuples
+        """
+        return Counter(sql for sql, _params in self.queries).most_common(limit)
+
+    def report(self, limit=10, width=300):
+        duplicates = self.duplicates()
+        lines = [
+            '{} queries, {} duplicated statements'.format(
+                len(self), len(duplicates),
+            ),
+            'Most repeated:',
+        ]
+        lines.extend(
+            '  {} x {}'.format(count, sql[:width])
+            for sql, count in self.most_repeated(limit)
+        )
+        if duplicates:
+            lines.append('Exact duplicates:')
+            lines.extend(
+                '  {} x {} {}'.format(count, sql[:width], params[:width])
+                for sql, params, count in duplicates[:limit]
+            )
+        return '\n'.join(lines)
+
+
+@contextmanager
+def log_queries():
+    """ Records the SQL run on the calling thread's connection"""
+    query_log = QueryLog()
+    with connection.execute_wrapper(query_log):
+        yield query_log
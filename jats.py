@@ -33,7 +33,12 @@ from review import models as review_models
 from review.const import VisibilityOptions as VO
 from identifiers.models import DOI_REGEX_PATTERN
 
-from plugins.imports import common
+from plugins.imports import (
+    common,
+    frozen_authors,
+    instrumentation,
+    keywords as imports_keywords,
+)
 from plugins.imports.utils import DummyRequest
 
 logger = get_logger(__name__)
@@ -117,11 +122,16 @@ def import_jats_article(
     return article
 
 
-def import_jats_zipped(zip_file, journal=None, owner=None, persist=True, stage=None):
+def import_jats_zipped(
+    zip_file, journal=None, owner=None, persist=True, stage=None,
+    on_progress=None,
+):
     """ Import a batch of Zipped JATS articles and their associated files
     :param zip_file: The zipped jats to be imported
     :param journal: Journal in which to import the articles
     :param owner: An instance of core.models.Account
+    :param on_progress: Optional callable, called with (processed, total)
+        after each directory of the zip is processed
     """
     errors = []
     articles = []
@@ -131,48 +141,66 @@ def import_jats_zipped(zip_file, journal=None, owner=None, persist=True, stage=N
     with zipfile.ZipFile(zip_file, 'r') as zf:
         with tempfile.TemporaryDirectory(dir=temp_path) as temp_dir:
             zf.extractall(path=temp_dir)
-
-            for root, dirs, filenames in os.walk(temp_dir):
-                try:
-                    jats_path = jats_filename = pdf_path = pdf_filename = None
-                    supplements = []
-
-                    for filename in filenames:
-                        mimetype, _ = mimetypes.guess_type(filename)
-                        file_path = os.path.join(root, filename)
-                        if mimetype in files.XML_MIMETYPES:
-                            jats_path = file_path
-                            jats_filename = filename
-                        elif mimetype in files.PDF_MIMETYPES:
-                            pdf_path = file_path
-                            pdf_filename = filename
-                        else:
-                            supplements.append(file_path)
-
-
-                    if jats_path:
-                        # Check nested dirs relative to xml like ./figures
-                        for dir_ in dirs:
-                            dir_path = os.path.join(root, dir_)
-                            for filename in os.listdir(dir_path):
-                                mimetype, _ = mimetypes.guess_type(filename)
-                                file_path = os.path.join(dir_path, filename)
+            walked = list(os.walk(temp_dir))
+
+            with instrumentation.track(
+                'import_jats_zipped',
+                total=sum(
+                    any(
+                        mimetypes.guess_type(filename)[0] in files.XML_MIMETYPES
+                        for filename in filenames
+                    )
+                    for _root, _dirs, filenames in walked
+                ),
+            ) as run, imports_keywords.keyword_cache():
+                for i, (root, dirs, filenames) in enumerate(walked):
+                    if on_progress:
+                        on_progress(i, len(walked))
+                    try:
+                        jats_path = jats_filename = pdf_path = pdf_filename = None
+                        supplements = []
+
+                        for filename in filenames:
+                            mimetype, _ = mimetypes.guess_type(filename)
+                            file_path = os.path.join(root, filename)
+                            if mimetype in files.XML_MIMETYPES:
+                                jats_path = file_path
+                                jats_filename = filename
+                            elif mimetype in files.PDF_MIMETYPES:
+                                pdf_path = file_path
+                                pdf_filename = filename
+                            else:
                                 supplements.append(file_path)
 
-                        logger.info("[JATS] Importing from %s", jats_path)
-                        with open(jats_path, 'r') as jats_file:
-                            article = import_jats_article(
-                                jats_file.read(), journal, persist,
-                                jats_filename, owner, supplements,
-                                stage=stage,
-                            )
-                            articles.append((jats_filename, article))
-                        if pdf_path:
-                            import_pdf(article, pdf_path, pdf_filename)
-                except Exception as err:
-                    logger.warning(err)
-                    logger.warning(traceback.format_exc())
-                    errors.append((filenames, err))
+
+                        if jats_path:
+                            # Check nested dirs relative to xml like ./figures
+                            for dir_ in dirs:
+                                dir_path = os.path.join(root, dir_)
+                                for filename in os.listdir(dir_path):
+                                    mimetype, _ = mimetypes.guess_type(filename)
+                                    file_path = os.path.join(dir_path, filename)
+                                    supplements.append(file_path)
+
+                            logger.info("[JATS] Importing from %s", jats_path)
+                            with run.item(jats_path):
+                                with open(jats_path, 'r') as jats_file:
+                                    article = import_jats_article(
+                                        jats_file.read(), journal, persist,
+                                        jats_filename, owner, supplements,
+                                        stage=stage,
+                                    )
+                                    articles.append((jats_filename, article))
+                                if pdf_path:
+                                    with instrumentation.phase('pdf'):
+                                        import_pdf(article, pdf_path, pdf_filename)
+                    except Exception as err:
+                        logger.warning(err)
+                        logger.warning(traceback.format_exc())
+                        errors.append((filenames, err))
+
+    if on_progress:
+        on_progress(len(walked), len(walked))
 
     return articles, errors
 
@@ -446,38 +474,39 @@ def save_article(metadata, journal=None, issue=None, owner=None, stage=None):
                 defaults={"article": article},
             )
 
-        # Delete all frozen authors for this article.
-        article.frozenauthor_set.all().delete()
+        # Reconcile the frozen authors of this article with the metadata
+        accounts = frozen_authors.resolve_accounts(
+            (author["email"] for author in metadata["authors"]),
+            create_defaults={
+                author["email"]: {
+                    "first_name": author["first_name"],
+                    "last_name": author["last_name"],
+                    "institution": author["institution"] or journal.name,
+                    "orcid": author["orcid"],
+                }
+                for author in metadata["authors"]
+                if author["email"]
+            },
+        )
+        author_values = []
         for idx, author in enumerate(metadata["authors"]):
-            account = None
-            if author["email"]:
-                account, c = Account.objects.get_or_create(
-                    email=author['email'],
-                    defaults={
-                        "first_name": author["first_name"],
-                        "last_name": author["last_name"],
-                        "institution": author["institution"] or journal.name,
-                        "orcid": author["orcid"],
-                    },
-                )
-
-            fa = submission_models.FrozenAuthor.objects.create(
-                article=article,
-                author=account,
-                first_name=author["first_name"],
-                last_name=author["last_name"],
-                institution=author["institution"] or journal.name,
-                frozen_orcid=author["orcid"],
-                frozen_email=author['email'],
-                order=idx,
-            )
+            account = frozen_authors.get_account(accounts, author["email"])
+            author_values.append({
+                "author": account,
+                "first_name": author["first_name"],
+                "last_name": author["last_name"],
+                "institution": author["institution"] or journal.name,
+                "frozen_orcid": author["orcid"],
+                "frozen_email": author["email"],
+                "order": idx,
+            })
             if account and author["correspondence"]:
                 article.correspondence_author = account
+        frozen_authors.reconcile({article: author_values})
+        if metadata["authors"]:
             article.save()
 
-        for kwd in metadata["keywords"]:
-            keyword, _ = submission_models.Keyword.objects.get_or_create(word=kwd)
-            article.keywords.add(keyword)
+        imports_keywords.set_article_keywords(article, metadata["keywords"])
 
         if metadata["license_url"]:
             url = metadata["license_url"]
@@ -804,11 +833,8 @@ def save_preprint(
                     'affiliation': author['institution'] or '',
                 }
             )
-        for kwd in meta["keywords"]:
-            keyword, _ = submission_models.Keyword.objects.get_or_create(
-                word=kwd,
-            )
-            preprint.keywords.add(keyword)
+        keyword_ids = imports_keywords.intern(meta["keywords"])
+        preprint.keywords.add(*keyword_ids.values())
 
         if meta["license_url"]:
             url = meta["license_url"]
@@ -917,6 +943,7 @@ def import_html_reviews(preprint, review_files, owner):
 def fetch_remote_image(url):
     try:
         response = requests.get(url, stream=True)
+        instrumentation.record_http_request()
         if response.status_code == 200:
             image_blob = response.content
             content_file = ContentFile(image_blob)
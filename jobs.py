@@ -0,0 +1,285 @@
+"""
+A small database backed job queue for long running imports and exports.
+
+Views enqueue an ImportJob and return straight away, the run_import_jobs
+management command claims queued jobs and executes them, recording
+progress on the job so that the UI can poll it. Running jobs record a
+heartbeat, so that those left running by a worker that died can be failed
+by another one.
+"""
+import csv
+from datetime import timedelta
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone, translation
+
+from core import files
+from submission import models as submission_models
+from plugins.imports import export, jats, logic, models, utils
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+JOB_HANDLERS = {}
+PROGRESS_SAVE_INTERVAL = 1
+# Seconds between the heartbeats of a running job
+HEARTBEAT_INTERVAL = 30
+# Running jobs without a heartbeat for this long have lost their worker
+STALE_JOB_TIMEOUT = timedelta(minutes=10)
+
+
+def job_handler(job_type):
+    """ Registers the decorated function as the handler of a job type"""
+    def decorator(func):
+        JOB_HANDLERS[job_type] = func
+        return func
+    return decorator
+
+
+def enqueue(job_type, owner=None, journal=None, **parameters):
+    """
+    Queues a job to be run by the run_import_jobs management command.
+    :param job_type: One of ImportJob.JOB_TYPES
+    :param owner: The Account that requested the job
+    :param journal: The Journal the job runs against
+    :param parameters: JSON serialisable arguments for the job handler
+    :return: The queued ImportJob
+    """
+    return models.ImportJob.objects.create(
+        job_type=job_type,
+        owner=owner,
+        journal=journal,
+        parameters=parameters,
+    )
+
+
+def claim_next_job():
+    """
+    Marks the oldest queued job as running and returns it. Rows are locked
+    with SKIP LOCKED so that several workers can share the queue.
+    :return: An ImportJob or None when the queue is empty
+    """
+    with transaction.atomic():
+        job = models.ImportJob.objects.select_for_update(
+            skip_locked=True,
+        ).filter(
+            status=models.ImportJob.QUEUED,
+        ).order_by('created').first()
+
+        if job:
+            job.status = models.ImportJob.RUNNING
+            job.started = job.heartbeat = timezone.now()
+            job.save()
+
+    return job
+
+
+def reclaim_stale_jobs(timeout=STALE_JOB_TIMEOUT):
+    """
+    Fails the running jobs whose worker stopped recording heartbeats, so
+    that the UI stops polling them, and deletes their uploaded files.
+    :param timeout: A timedelta after which a job without a heartbeat is
+        considered stale
+    :return: A list of the reclaimed ImportJobs
+    """
+    now = timezone.now()
+    cutoff = now - timeout
+    with transaction.atomic():
+        stale_jobs = list(
+            models.ImportJob.objects.select_for_update(
+                skip_locked=True,
+            ).filter(
+                Q(heartbeat__lt=cutoff)
+                | Q(heartbeat__isnull=True, started__lt=cutoff),
+                status=models.ImportJob.RUNNING,
+            )
+        )
+        for job in stale_jobs:
+            job.status = models.ImportJob.FAILED
+            job.finished = now
+            job.errors.append(
+                'The worker running this job stopped before it finished.'
+            )
+            job.save()
+
+    for job in stale_jobs:
+        logger.warning("Reclaimed stale %s", job)
+        remove_job_files(job)
+    return stale_jobs
+
+
+def remove_job_files(job):
+    """ Deletes the uploaded file a job was given, if it still exists"""
+    path = job.parameters.get('path')
+    if path and os.path.exists(path):
+        os.unlink(path)
+
+
+class Heartbeat(threading.Thread):
+    """ Records that a job is still running until it is stopped"""
+    def __init__(self, job, interval=HEARTBEAT_INTERVAL):
+        super().__init__(daemon=True)
+        self.job = job
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                try:
+                    models.ImportJob.objects.filter(pk=self.job.pk).update(
+                        heartbeat=timezone.now(),
+                    )
+                except Exception as e:
+                    logger.exception(e)
+        finally:
+            # The thread has its own database connection
+            connection.close()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+def run_job(job):
+    """ Runs a claimed job and records its outcome"""
+    handler = JOB_HANDLERS[job.job_type]
+    progress = JobProgress(job)
+    heartbeat = Heartbeat(job)
+    logger.info("Running %s", job)
+
+    heartbeat.start()
+    try:
+        handler(job, progress)
+    except Exception as e:
+        logger.exception(e)
+        progress.add_error(str(e))
+        job.status = models.ImportJob.FAILED
+    else:
+        job.status = models.ImportJob.COMPLETE
+    finally:
+        heartbeat.stop()
+        remove_job_files(job)
+
+    progress.save()
+    job.finished = timezone.now()
+    job.save()
+    logger.info("Finished %s", job)
+    return job
+
+
+class JobProgress(object):
+    """
+    Records the progress of a running job. Counts are written to the
+    database at most once every PROGRESS_SAVE_INTERVAL seconds.
+    """
+    def __init__(self, job):
+        self.job = job
+        self._last_save = 0
+
+    def update(self, processed, total=None):
+        self.job.processed = processed
+        if total is not None:
+            self.job.total = total
+        if time.monotonic() - self._last_save > PROGRESS_SAVE_INTERVAL:
+            self.save()
+
+    def add_error(self, error):
+        self.job.errors.append(error)
+
+    def save(self):
+        models.ImportJob.objects.filter(pk=self.job.pk).update(
+            processed=self.job.processed,
+            total=self.job.total,
+            errors=self.job.errors,
+        )
+        self._last_save = time.monotonic()
+
+
+@job_handler(models.ImportJob.UPDATE)
+def run_update_import(job, progress):
+    """ Runs an Import / Export / Update CSV"""
+    parameters = job.parameters
+    with open(parameters['path'], 'r', encoding='utf-8-sig') as csv_file:
+        reader = csv.DictReader(csv_file)
+        with translation.override(settings.LANGUAGE_CODE):
+            errors, actions = utils.update_article_metadata(
+                reader,
+                parameters['folder_path'],
+                owner=job.owner,
+                import_id=parameters['filename'],
+                on_progress=progress.update,
+            )
+
+    for error in errors:
+        progress.add_error(
+            {key: str(value) for key, value in error.items()}
+        )
+    job.result = {'actions': list(actions.values())}
+
+
+@job_handler(models.ImportJob.JATS)
+def run_jats_import(job, progress):
+    """ Imports a zip file of JATS articles"""
+    parameters = job.parameters
+    articles, errors = jats.import_jats_zipped(
+        parameters['path'],
+        job.journal,
+        owner=job.owner,
+        stage=parameters.get('stage'),
+        on_progress=progress.update,
+    )
+
+    for filenames, error in errors:
+        progress.add_error('{}: {}'.format(', '.join(filenames), error))
+    job.result = {
+        'articles': [
+            {'file': filename, 'id': article.pk, 'title': article.title}
+            for filename, article in articles
+        ],
+    }
+
+
+@job_handler(models.ImportJob.EXPORT)
+def run_export(job, progress):
+    """ Writes an export ZIP for the given articles to the temp directory"""
+    articles = submission_models.Article.objects.filter(
+        journal=job.journal,
+        pk__in=job.parameters['article_ids'],
+    )
+    progress.update(0, articles.count())
+
+    zip_file_name = 'export_{}_{}.zip'.format(job.journal.code, uuid.uuid4())
+    zip_path = files.get_temp_file_path_from_name(zip_file_name)
+    with open(zip_path, 'wb') as zip_file:
+        for chunk in export.stream_export_zip(articles):
+            zip_file.write(chunk)
+
+    progress.update(job.total)
+    job.result_file = zip_file_name
+
+
+@job_handler(models.ImportJob.WORDPRESS)
+def run_wordpress_import(job, progress):
+    """ Imports the selected posts of a WordPress site as news items"""
+    parameters = job.parameters
+    import_object = models.WordPressImport.objects.get(
+        pk=parameters['import_id'],
+    )
+    posts = logic.get_cached_posts(import_object)
+    progress.update(0, len(parameters['post_ids']))
+    logic.import_posts(
+        parameters['post_ids'],
+        posts,
+        ContentType.objects.get_for_id(parameters['content_type_id']),
+        parameters['object_id'],
+        import_object,
+    )
+    progress.update(job.total)
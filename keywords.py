@@ -0,0 +1,171 @@
+"""
+Interns keywords and writes the keywords of imported articles in bulk.
+
+Importers see the same few hundred keywords over and over, so within a
+keyword_cache block, which an import run opens, the ID of each word is
+cached. Words missing from the cache are looked up with one query and those
+missing from the database created with one more, then the ordered
+KeywordArticle rows of an article are written with a bulk query of each
+kind rather than a query per keyword.
+
+The cache only lives for the block, as keywords can be deleted or merged by
+other processes while a long lived worker runs. Words are only cached once
+the transaction that found or created them has committed, so a rolled back
+import can't leave IDs of keywords that don't exist in the cache.
+"""
+from contextlib import contextmanager
+import threading
+import weakref
+
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from submission import models as submission_models
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_keyword_caches = threading.local()
+# Every open cache, so that keywords deleted by this process are forgotten
+_open_caches = weakref.WeakSet()
+
+
+class KeywordCache():
+    """ The IDs of the keywords interned within a keyword_cache block"""
+    def __init__(self):
+        self.keyword_ids = {}
+        self.lock = threading.Lock()
+
+    def get_many(self, words):
+        with self.lock:
+            return {
+                word: self.keyword_ids[word]
+                for word in words if word in self.keyword_ids
+            }
+
+    def remember(self, keyword_ids):
+        with self.lock:
+            self.keyword_ids.update(keyword_ids)
+
+    def forget(self, word, pk):
+        with self.lock:
+            if self.keyword_ids.get(word) == pk:
+                del self.keyword_ids[word]
+
+
+@contextmanager
+def keyword_cache():
+    """ Caches the IDs of the keywords interned in the block
+    Blocks opened within another one on the same thread reuse its cache.
+    """
+    cache = getattr(_keyword_caches, "current", None)
+    if cache is not None:
+        yield cache
+        return
+
+    cache = KeywordCache()
+    _open_caches.add(cache)
+    _keyword_caches.current = cache
+    try:
+        yield cache
+    finally:
+        _keyword_caches.current = None
+        _open_caches.discard(cache)
+
+
+@receiver(post_delete, sender=submission_models.Keyword)
+def forget_deleted_keyword(sender, instance, **kwargs):
+    for cache in list(_open_caches):
+        cache.forget(instance.word, instance.pk)
+
+
+def unique_words(words):
+    """ Returns the non empty words, without duplicates, in their order"""
+    return list(dict.fromkeys(word for word in words if word))
+
+
+def intern(words):
+    """
+    Resolves the Keyword ID of many words, creating any that don't exist
+    :param words: An iterable of keyword strings
+    :return: A dict of word to Keyword ID
+    """
+    words = unique_words(words)
+    cache = getattr(_keyword_caches, "current", None)
+    keyword_ids = cache.get_many(words) if cache else {}
+    missing = [word for word in words if word not in keyword_ids]
+    if not missing:
+        return keyword_ids
+
+    # Keyword.word isn't unique, so use the oldest of any duplicates
+    found = {}
+    for pk, word in submission_models.Keyword.objects.filter(
+        word__in=missing,
+    ).order_by('-pk').values_list('pk', 'word'):
+        found[word] = pk
+
+    to_create = [word for word in missing if word not in found]
+    if to_create:
+        submission_models.Keyword.objects.bulk_create(
+            submission_models.Keyword(word=word) for word in to_create
+        )
+        # Not every database backend sets the PK of bulk created objects
+        for pk, word in submission_models.Keyword.objects.filter(
+            word__in=to_create,
+        ).order_by('-pk').values_list('pk', 'word'):
+            found[word] = pk
+        logger.debug("Created %s keywords", len(to_create))
+
+    if cache:
+        transaction.on_commit(lambda: cache.remember(found))
+    keyword_ids.update(found)
+    return keyword_ids
+
+
+def set_article_keywords(article, words, replace=False):
+    """
+    Writes the keywords of an article, in the given order
+    :param article: an instance of submission.models.Article
+    :param words: An iterable of keyword strings, empty ones are ignored
+    :param replace: Remove any keywords of the article that aren't in words
+    :return: A list of the Keyword IDs of the article, in order
+    """
+    words = unique_words(words)
+    keyword_ids = intern(words)
+    ordered_ids = list(dict.fromkeys(keyword_ids[word] for word in words))
+
+    existing = {
+        keyword_article.keyword_id: keyword_article
+        for keyword_article in submission_models.KeywordArticle.objects.filter(
+            article=article,
+        )
+    }
+    to_create = []
+    to_update = []
+    for order, keyword_id in enumerate(ordered_ids):
+        keyword_article = existing.pop(keyword_id, None)
+        if keyword_article is None:
+            to_create.append(
+                submission_models.KeywordArticle(
+                    article=article,
+                    keyword_id=keyword_id,
+                    order=order,
+                )
+            )
+        elif keyword_article.order != order:
+            keyword_article.order = order
+            to_update.append(keyword_article)
+
+    if replace and existing:
+        submission_models.KeywordArticle.objects.filter(
+            pk__in=[keyword_article.pk for keyword_article in existing.values()],
+        ).delete()
+    if to_update:
+        submission_models.KeywordArticle.objects.bulk_update(
+            to_update, ['order'],
+        )
+    if to_create:
+        submission_models.KeywordArticle.objects.bulk_create(to_create)
+
+    return ordered_ids
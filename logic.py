@@ -1,17 +1,36 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from uuid import uuid4
 from io import open as iopen
 
 import requests
+from requests.adapters import HTTPAdapter
 from wordpress_xmlrpc import Client
 from wordpress_xmlrpc.methods.posts import GetPosts
 from bs4 import BeautifulSoup
 
+from django.core.cache import cache as django_cache
 from django.utils import timezone
 from django.conf import settings
 
-from comms.models import NewsItem
+from comms.models import NewsItem, Tag
 from utils.function_cache import cache
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+POSTS_PER_PAGE = 100
+# Number of pages of posts requested from WordPress at the same time
+LISTING_WORKERS = 4
+# Listings are cached so the post list and the import job don't walk the
+# whole blog again
+POSTS_CACHE_KEY = 'imports_wordpress_posts_{pk}'
+POSTS_CACHE_TIMEOUT = 60 * 60
+NEWS_ITEM_BATCH_SIZE = 500
+IMAGE_WORKERS = 8
+# Connect and read timeouts for image downloads, in seconds
+IMAGE_TIMEOUT = (5, 30)
 
 
 @cache(120)
@@ -30,51 +49,218 @@ def get_posts(details, increment, offset):
     return posts
 
 
-def import_posts(posts_to_import, posts, request, import_object):
+def get_all_posts(details, increment=POSTS_PER_PAGE, workers=LISTING_WORKERS):
+    """
+    Pages through the XMLRPC API and returns every post, requesting the
+    given number of pages at a time
+    """
+    posts = list()
+    offset = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            offsets = [offset + increment * page for page in range(workers)]
+            pages = list(executor.map(
+                lambda page_offset: get_posts(details, increment, page_offset),
+                offsets,
+            ))
+            for new_posts in pages:
+                posts.extend(new_posts)
+            if any(len(new_posts) == 0 for new_posts in pages):
+                break
+
+            offset = offsets[-1] + increment
+
+    return posts
+
+
+def get_cached_posts(details, refresh=False):
+    """
+    Returns every post of a WordPress import, from the cache if it has been
+    listed already
+    :param details: WordPressImport
+    :param refresh: List the posts again even if they are cached
+    :return: A list of WordPressPost objects
+    """
+    cache_key = POSTS_CACHE_KEY.format(pk=details.pk)
+    posts = None if refresh else django_cache.get(cache_key)
+    if posts is None:
+        posts = get_all_posts(details)
+        django_cache.set(cache_key, posts, POSTS_CACHE_TIMEOUT)
+    return posts
+
+
+def import_posts(posts_to_import, posts, content_type, object_id, import_object):
+    """
+    Creates a news item for each selected post, unless one with the same
+    title exists already, and sets the tags of every selected post.
+    :param posts_to_import: The IDs of the posts to import
+    :param posts: Every post listed from the WordPress site
+    :param content_type: ContentType of the object that owns the news
+    :param object_id: PK of the object that owns the news
+    :param import_object: WordPressImport, deleted once the import is done
+    """
+    posts_to_import = set(posts_to_import)
+    selected_posts = dict()
     for post in posts:
         if post.id in posts_to_import:
+            selected_posts.setdefault(post.title, post)
+
+    news_items = NewsItem.objects.filter(
+        content_type=content_type,
+        object_id=object_id,
+    )
+    existing_items = {
+        news_item.title: news_item
+        for news_item in news_items.filter(title__in=selected_posts)
+    }
 
-            defaults = {
-                'body': post.content,
-                'posted': post.date,
-                'posted_by': import_object.user,
-                'start_display': timezone.now(),
-            }
-
-            new_news_item, c = NewsItem.objects.get_or_create(
-                content_type=request.model_content_type,
-                object_id=request.site_type.pk,
-                title=post.title,
-                defaults=defaults,
+    start_display = timezone.now()
+    NewsItem.objects.bulk_create(
+        [
+            NewsItem(
+                content_type=content_type,
+                object_id=object_id,
+                title=title,
+                body=post.content,
+                posted=post.date,
+                posted_by=import_object.user,
+                start_display=start_display,
             )
+            for title, post in selected_posts.items()
+            if title not in existing_items
+        ],
+        batch_size=NEWS_ITEM_BATCH_SIZE,
+    )
+    # Not every database backend sets the PKs of bulk created objects
+    created_items = list(news_items.filter(
+        title__in=set(selected_posts) - set(existing_items),
+    ))
 
-            tags = [tag.name for tag in post.terms]
-            new_news_item.set_tags(tags)
+    set_tags({
+        news_item: [tag.name for tag in selected_posts[news_item.title].terms]
+        for news_item in chain(existing_items.values(), created_items)
+    })
 
-            if c:
-                rewrite_image_paths(new_news_item)
+    rehost_images(created_items)
 
+    django_cache.delete(POSTS_CACHE_KEY.format(pk=import_object.pk))
     import_object.delete()
-    
+
+
+def set_tags(tags_by_news_item):
+    """
+    Sets the tags of many news items at once, with the same result as
+    calling NewsItem.set_tags on each of them
+    :param tags_by_news_item: A dict of NewsItem to a list of tag texts
+    """
+    if not tags_by_news_item:
+        return
+
+    texts = {text for tags in tags_by_news_item.values() for text in tags}
+    tags = {tag.text: tag for tag in Tag.objects.filter(text__in=texts)}
+    Tag.objects.bulk_create(
+        [Tag(text=text) for text in texts - set(tags)],
+        batch_size=NEWS_ITEM_BATCH_SIZE,
+    )
+    tags.update({
+        tag.text: tag
+        for tag in Tag.objects.filter(text__in=texts - set(tags))
+    })
+
+    through = NewsItem.tags.through
+    news_item_field = NewsItem.tags.field.m2m_field_name()
+    tag_field = NewsItem.tags.field.m2m_reverse_field_name()
+    wanted = {
+        (news_item.pk, tags[text].pk)
+        for news_item, texts in tags_by_news_item.items()
+        for text in texts
+    }
+
+    stale_pks = list()
+    current = set()
+    for pk, news_item_id, tag_id in through.objects.filter(
+        **{news_item_field + '__in': tags_by_news_item},
+    ).values_list('pk', news_item_field, tag_field):
+        if (news_item_id, tag_id) in wanted:
+            current.add((news_item_id, tag_id))
+        else:
+            stale_pks.append(pk)
+
+    through.objects.filter(pk__in=stale_pks).delete()
+    through.objects.bulk_create(
+        [
+            through(**{
+                news_item_field + '_id': news_item_id,
+                tag_field + '_id': tag_id,
+            })
+            for news_item_id, tag_id in wanted - current
+        ],
+        batch_size=NEWS_ITEM_BATCH_SIZE,
+    )
+
 
 def rewrite_image_paths(news_item):
-    soup = BeautifulSoup(news_item.body, 'html.parser')
-    images = soup.find_all('img')
+    rehost_images([news_item])
+
+
+def rehost_images(news_items, workers=IMAGE_WORKERS):
+    """
+    Downloads the images used in the bodies of the given news items and
+    points them at the local copies. Each URL is downloaded once, however
+    many items use it, and downloads run concurrently.
+    :param news_items: A list of NewsItem objects
+    :param workers: Number of images downloaded at the same time
+    """
+    soups = [
+        (news_item, BeautifulSoup(news_item.body, 'html.parser'))
+        for news_item in news_items
+    ]
+    sources = list({
+        image['src'].split('?')[0]
+        for _, soup in soups
+        for image in soup.find_all('img')
+        if image.get('src')
+    })
 
-    print(images)
+    paths = {}
+    if sources:
+        with requests.Session() as session:
+            adapter = HTTPAdapter(pool_maxsize=workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                paths = dict(zip(sources, executor.map(
+                    lambda source: download_and_store_image(source, session),
+                    sources,
+                )))
 
-    for image in images:
-        img_src = image['src'].split('?')[0]
-        path = download_and_store_image(img_src)
-        image['src'] = path
+    for news_item, soup in soups:
+        for image in soup.find_all('img'):
+            if not image.get('src'):
+                continue
+            path = paths.get(image['src'].split('?')[0])
+            if path:
+                image['src'] = path
 
-    news_item.body = soup.prettify()
-    news_item.save()
+        news_item.body = soup.prettify()
+        news_item.save()
 
 
-def download_and_store_image(image_source):
-    image = requests.get(image_source)
-    image.raw.decode_content = True
+def download_and_store_image(image_source, session=None):
+    """
+    Downloads an image and stores it in the media root
+    :param image_source: The URL of the image
+    :param session: Optional requests.Session to download with
+    :return: The media URL of the stored image or None if it could not be
+        downloaded
+    """
+    try:
+        image = (session or requests).get(image_source, timeout=IMAGE_TIMEOUT)
+        image.raise_for_status()
+    except requests.RequestException as e:
+        logger.warning('Unable to download image %s: %s', image_source, e)
+        return None
     name = os.path.basename(image_source)
 
     fileurl = save_media_file(
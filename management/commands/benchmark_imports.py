@@ -0,0 +1,120 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.runner import DiscoverRunner
+from journal import models as journal_models
+from utils.testing import helpers
+
+from plugins.imports.benchmarks import runner
+
+
+class Command(BaseCommand):
+    """ Benchmarks the importers against synthetic corpora"""
+
+    help = (
+        "Imports synthetic corpora into a test database and reports wall "
+        "time, queries per article and peak RSS for each importer"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            choices=sorted(runner.SCENARIOS),
+            help='Scenario to run, can be repeated. Defaults to all of them',
+        )
+        parser.add_argument('--articles', type=int, default=100)
+        parser.add_argument('--authors', type=int, default=3)
+        parser.add_argument(
+            '--tolerance', type=float, default=runner.DEFAULT_TOLERANCE,
+            help='Fraction a metric may grow over its baseline',
+        )
+        parser.add_argument(
+            '--baselines', default=runner.BASELINES_PATH,
+            help='Path to the JSON file of baselines',
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true', default=False,
+            help='Store the results as the new baselines',
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true', default=False,
+            help='Reuse the test database between runs',
+        )
+        parser.add_argument(
+            '--json', action='store_true', default=False,
+            help='Print the results as JSON',
+        )
+        parser.add_argument(
+            '--query-report', type=int, default=0, metavar='N',
+            help='Print the N most repeated SQL statements of each scenario',
+        )
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'] or sorted(runner.SCENARIOS)
+        size = runner.CorpusSize(options['articles'], options['authors'])
+
+        test_runner = DiscoverRunner(
+            keepdb=options['keepdb'],
+            verbosity=0,
+            interactive=False,
+        )
+        old_config = test_runner.setup_databases()
+        try:
+            journal, *_ = helpers.create_journals()
+            journal_models.IssueType.objects.get_or_create(
+                journal=journal,
+                code='issue',
+            )
+            helpers.create_roles(['editor', 'author', 'reviewer'])
+            owner = helpers.create_user('benchmark@example.com')
+            results = [
+                runner.run_scenario(
+                    name, journal, owner, size,
+                    query_report=options['query_report'],
+                )
+                for name in scenarios
+            ]
+        finally:
+            test_runner.teardown_databases(old_config)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            for result in results:
+                self.stdout.write(
+                    '{scenario}: {wall_seconds}s, '
+                    '{queries_per_article} queries/article, '
+                    '{peak_rss_mb} MB peak RSS, '
+                    '{failed} failed'.format(**result)
+                )
+                if result.get('query_report'):
+                    self.stdout.write(result['query_report'])
+
+        if options['save_baseline']:
+            runner.save_baselines(results, options['baselines'])
+            self.stdout.write('Baselines saved to %s' % options['baselines'])
+            return
+
+        baselines = runner.load_baselines(options['baselines'])
+        regressed = False
+        for result in results:
+            baseline = baselines.get(result['scenario'])
+            if not baseline:
+                continue
+            for metric, old, new in runner.compare(
+                result, baseline, options['tolerance'],
+            ):
+                regressed = True
+                self.stderr.write(
+                    '%s: %s regressed from %s to %s' % (
+                        result['scenario'], metric, old, new,
+                    )
+                )
+        if regressed:
+            raise CommandError('Benchmarks regressed against the baselines')
+        missing = runner.missing_baselines(results, baselines)
+        if missing:
+            raise CommandError(
+                'No baselines recorded for %s, record them on the reference '
+                'machine with --save-baseline' % ', '.join(missing)
+            )
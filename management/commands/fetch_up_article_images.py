@@ -1,15 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
+from urllib3.util.retry import Retry
 
 from django.core.management.base import BaseCommand
 from django.core.files.base import ContentFile
 
 from journal import models
 from core import models as core_models, files
+from identifiers import models as identifier_models
+from utils.logger import get_logger
 
 import logging
 logging.getLogger("requests").setLevel(logging.WARNING)
 
+logger = get_logger(__name__)
+
+UP_API_URL = "https://taskmaster.ubiquity.press/api/article/{journal_code}/{article_id}/html"
+# Connect and read timeouts for API calls and image downloads, in seconds
+TIMEOUT = (5, 60)
+
+
+def get_session(workers):
+    """ A session with a connection pool per worker that retries failures"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_maxsize=workers,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+        ),
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def fetch_images(session, base_url, up_journal_code, doi, missing_images):
+    """
+    Fetches the missing images of a galley from the UP API
+    :return: A list of (image name, image content) tuples
+    """
+    article_id = doi.split('.')[-1]
+    response = session.get(
+        UP_API_URL.format(journal_code=up_journal_code, article_id=article_id),
+        timeout=TIMEOUT,
+    )
+    response.raise_for_status()
+    dependent_files = response.json().get('dependent_files') or {}
+
+    images = []
+    for name, path in dependent_files.items():
+        if name in missing_images:
+            image_url = f"{base_url}jnl-{up_journal_code}-files/{path}"
+            image = session.get(image_url, timeout=TIMEOUT)
+            image.raise_for_status()
+            images.append((name, image.content))
+    return images
+
 
 class Command(BaseCommand):
     """Fetches UP article images from their API."""
@@ -19,44 +70,106 @@ class Command(BaseCommand):
         parser.add_argument('-u', '--up_journal_code')
         parser.add_argument('-b', '--base_url')
         parser.add_argument('-o', '--owner')
+        parser.add_argument(
+            '-w', '--workers', type=int, default=8,
+            help='Number of galleys whose images are fetched at the same time',
+        )
 
     def handle(self, *args, **options):
         base_url = options.get('base_url')
         up_journal_code = options.get('up_journal_code')
+        workers = options.get('workers')
         owner = core_models.Account.objects.get(pk=options.get('owner'))
         journal = models.Journal.objects.get(
             code=options.get('journal_code'),
         )
         galleys = core_models.Galley.objects.filter(
             article__journal=journal,
+            file__isnull=False,
+        ).select_related(
+            'article',
+            'file',
+        ).prefetch_related(
+            'images',
+        )
+        dois = dict(
+            identifier_models.Identifier.objects.filter(
+                id_type='doi',
+                article__journal=journal,
+            ).values_list('article_id', 'identifier')
+        )
+
+        # Parse each galley once and work out which images it is missing,
+        # those fetched on a previous run are already among its images.
+        to_fetch = []
+        for galley in tqdm(galleys, desc='Parsing galleys'):
+            doi = dois.get(galley.article_id)
+            if not doi:
+                continue
+            linked = {image.original_filename for image in galley.images.all()}
+            missing_images = {
+                name for name in galley.has_missing_image_files(show_all=True) or []
+                if name and name not in linked
+            }
+            if missing_images:
+                to_fetch.append((galley, doi, missing_images))
+
+        # Images saved to the article but not linked to this galley, for
+        # example by a run that stopped part way, don't need fetching again
+        saved_files = core_models.File.objects.filter(
+            article_id__in={galley.article_id for galley, _, _ in to_fetch},
+            original_filename__in=set().union(
+                *(missing for _, _, missing in to_fetch)
+            ),
+            is_galley=False,
         )
+        saved_by_name = {
+            (saved_file.article_id, saved_file.original_filename): saved_file
+            for saved_file in saved_files
+        }
+        for galley, _, missing_images in to_fetch:
+            for name in list(missing_images):
+                saved_file = saved_by_name.get((galley.article_id, name))
+                if saved_file:
+                    galley.images.add(saved_file)
+                    missing_images.discard(name)
+        to_fetch = [fetch for fetch in to_fetch if fetch[2]]
 
-        # Loop through all of the galleys and for those with missing
-        # images try to get them.
-        for galley in tqdm(galleys):
-            missing_images = galley.has_missing_image_files()
-            if missing_images and galley.article.get_doi():
-                article_id = galley.article.get_doi().split('.')[-1]
-                up_api_url = f"https://taskmaster.ubiquity.press/api/article/{up_journal_code}/{article_id}/html"
-                r = requests.get(up_api_url)
-                data = r.json().get('dependent_files')
-
-                if data:
-                    for k, v in data.items():
-                        if k in missing_images:
-                            image_url = f"{base_url}jnl-{up_journal_code}-files/{v}"
-                            image = requests.get(image_url)
-                            django_file = ContentFile(image.content)
-                            django_file.name = k
-                            new_file = files.save_file_to_article(
-                                django_file,
-                                galley.article,
-                                owner,
-                            )
-                            new_file.is_galley = False
-                            new_file.label = 'Image File'
-                            new_file.original_filename = k
-                            new_file.save()
-                            galley.images.add(new_file)
+        with get_session(workers) as session, ThreadPoolExecutor(
+            max_workers=workers,
+        ) as executor:
 
+            def fetch(galley_doi_missing):
+                _, doi, missing_images = galley_doi_missing
+                try:
+                    return fetch_images(
+                        session, base_url, up_journal_code, doi,
+                        missing_images,
+                    ), None
+                except (requests.RequestException, ValueError) as e:
+                    return [], e
 
+            results = executor.map(fetch, to_fetch)
+            for (galley, doi, _), (images, error) in tqdm(
+                zip(to_fetch, results),
+                total=len(to_fetch),
+                desc='Fetching images',
+            ):
+                if error:
+                    logger.warning(
+                        'Unable to fetch images for %s: %s', doi, error,
+                    )
+                    continue
+                for name, content in images:
+                    django_file = ContentFile(content)
+                    django_file.name = name
+                    new_file = files.save_file_to_article(
+                        django_file,
+                        galley.article,
+                        owner,
+                    )
+                    new_file.is_galley = False
+                    new_file.label = 'Image File'
+                    new_file.original_filename = name
+                    new_file.save()
+                    galley.images.add(new_file)
@@ -5,6 +5,7 @@ from journal import models
 from core.models import Account
 from utils.logger import get_logger
 
+from plugins.imports import instrumentation
 from plugins.imports.jats import import_jats_zipped
 
 logger = get_logger(__name__)
@@ -19,6 +20,10 @@ class Command(BaseCommand):
         parser.add_argument('-j', '--journal_code')
         parser.add_argument('-o', '--owner_id', default=1)
         parser.add_argument('-d', '--dry-run', action="store_true", default=False)
+        parser.add_argument(
+            '--stats-json', default=None,
+            help='Write a JSON summary of the import throughput to this path',
+        )
 
     def handle(self, *args, **options):
         verbosity = int(options['verbosity'])
@@ -34,10 +39,14 @@ class Command(BaseCommand):
         persist = True
         if options["dry_run"]:
             persist = False
-        articles = import_jats_zipped(
-            options["zip_file"], journal,
-            owner=owner, persist=persist,
-        )
+        with instrumentation.track(
+            'import_jats_zipped',
+            summary_path=options["stats_json"],
+        ):
+            articles = import_jats_zipped(
+                options["zip_file"], journal,
+                owner=owner, persist=persist,
+            )
         for article in articles:
             if not persist:
                 pprint.pprint(article)
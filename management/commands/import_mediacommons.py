@@ -6,6 +6,7 @@ from journal import models
 from core.models import Account
 from django.core.management.base import BaseCommand
 
+from plugins.imports import instrumentation, keywords as imports_keywords
 from plugins.imports.mediacommons import import_article, import_article_xml
 
 
@@ -23,6 +24,10 @@ class Command(BaseCommand):
         parser.add_argument('-j', '--journal-code')
         parser.add_argument('-o', '--owner-id', default=1)
         parser.add_argument('--xml-only', default=False, action="store_true")
+        parser.add_argument(
+            '--stats-json', default=None,
+            help='Write a JSON summary of the import throughput to this path',
+        )
 
     def handle(self, *args, **options):
         journal = models.Journal.objects.get(code=options["journal_code"])
@@ -35,10 +40,15 @@ class Command(BaseCommand):
             ]
         else:
             filenames = [options["path"]]
-        for filename in filenames:
-            with open(filename, "r") as json_file:
-                data = json.loads(json_file.read())
-                if options["xml_only"]:
-                    import_article_xml(journal, owner, data)
-                else:
-                    import_article( journal, owner, data)
+        with instrumentation.track(
+            'mediacommons.import_article',
+            total=len(filenames),
+            summary_path=options["stats_json"],
+        ) as run, imports_keywords.keyword_cache():
+            for filename in filenames:
+                with open(filename, "r") as json_file, run.item(filename):
+                    data = json.loads(json_file.read())
+                    if options["xml_only"]:
+                        import_article_xml(journal, owner, data)
+                    else:
+                        import_article( journal, owner, data)
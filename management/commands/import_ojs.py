@@ -2,7 +2,7 @@ import getpass
 from journal import models
 
 from django.core.management.base import BaseCommand
-from plugins.imports import ojs
+from plugins.imports import keywords as imports_keywords, ojs
 
 
 class Command(BaseCommand):
@@ -34,6 +34,21 @@ class Command(BaseCommand):
         parser.add_argument('--ignore-galleys', action="store_true",
                             default=False,
                             help="Imports only article metrics")
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Number of article files or pages fetched at the same time, '
+                 'defaults to 1 for files and 8 for pages',
+        )
+        parser.add_argument(
+            '--editor-assignments', action="store_true", default=False,
+            help="Imports only editor assignments, scraped from the "
+                 "submission pages of imported articles",
+        )
+        parser.add_argument(
+            '--page-cache-dir', default=None,
+            help="Caches scraped pages here, so later runs parse them "
+                 "without downloading them again",
+        )
 
     def handle(self, *args, **options):
         journal = models.Journal.objects.get(code=options["journal_code"])
@@ -46,25 +61,36 @@ class Command(BaseCommand):
             options["password"] or password,
         )
 
-        if options["users"]:
-            ojs.import_users(client, journal)
+        # Keyword IDs are cached for the length of the import
+        with imports_keywords.keyword_cache():
+            if options["users"]:
+                ojs.import_users(client, journal)
 
-        elif options["editorial"]:
-            ojs.import_unassigned_articles(client, journal)
-            ojs.import_in_review_articles(client, journal)
-            ojs.import_in_editing_articles(client, journal)
-        elif options["sections"]:
-            ojs.import_sections(client, journal)
-        elif options["issues"]:
-            ojs.import_issues(client, journal)
-        elif options["collections"]:
-            ojs.import_collections(client, journal)
-        elif options["issues"]:
-            ojs.import_issues(client, journal)
-        elif options["ojs_id"]:
-            ojs.import_article(client, journal, options["ojs_id"])
-        elif options["metrics"]:
-            ojs.import_metrics(client, journal)
-        else:
-            ojs.import_published_articles(
-                client, journal, not options["ignore_galleys"])
+            elif options["editorial"]:
+                workers = options["workers"] or 1
+                ojs.import_unassigned_articles(client, journal, workers)
+                ojs.import_in_review_articles(client, journal, workers)
+                ojs.import_in_editing_articles(client, journal, workers)
+            elif options["sections"]:
+                ojs.import_sections(client, journal)
+            elif options["issues"]:
+                ojs.import_issues(client, journal)
+            elif options["collections"]:
+                ojs.import_collections(client, journal)
+            elif options["issues"]:
+                ojs.import_issues(client, journal)
+            elif options["ojs_id"]:
+                ojs.import_article(client, journal, options["ojs_id"])
+            elif options["metrics"]:
+                ojs.import_metrics(client, journal)
+            elif options["editor_assignments"]:
+                ojs.scrape_editor_assignments(
+                    client, journal,
+                    page_cache_dir=options["page_cache_dir"],
+                    workers=options["workers"],
+                )
+            else:
+                ojs.import_published_articles(
+                    client, journal, not options["ignore_galleys"],
+                    workers=options["workers"] or 1,
+                )
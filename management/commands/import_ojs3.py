@@ -3,7 +3,7 @@ import getpass
 from journal import models
 
 from django.core.management.base import BaseCommand
-from plugins.imports import ojs
+from plugins.imports import instrumentation, ojs
 
 
 class Command(BaseCommand):
@@ -36,6 +36,14 @@ class Command(BaseCommand):
         parser.add_argument('--ignore-galleys', action="store_true",
                             default=False,
                             help="Do not import article galleys")
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of issues imported, or users fetched, at the same time',
+        )
+        parser.add_argument(
+            '--stats-json', default=None,
+            help='Write a JSON summary of the import throughput to this path',
+        )
 
 
     def handle(self, *args, **options):
@@ -49,16 +57,27 @@ class Command(BaseCommand):
             options["username"],
             password,
         )
+        with instrumentation.track(
+            'import_ojs3',
+            summary_path=options["stats_json"],
+        ):
+            self.run_import(client, journal, options)
+
+    def run_import(self, client, journal, options):
         if options["issues"]:
-            ojs.import_ojs3_issues(client, journal)
+            ojs.import_ojs3_issues(
+                client, journal, workers=options["workers"],
+            )
         elif options["metrics"]:
             ojs.import_ojs3_metrics(client, journal)
         elif options["issue_id"]:
             ojs.import_ojs3_issues(client, journal, issue_id=options["issue_id"])
         elif options["unpublished_issues"]:
-            ojs.import_ojs3_unpublished_issues(client, journal)
+            ojs.import_ojs3_unpublished_issues(
+                client, journal, workers=options["workers"],
+            )
         elif options["users"]:
-            ojs.import_ojs3_users(client, journal)
+            ojs.import_ojs3_users(client, journal, workers=options["workers"])
         elif options["just_galleys"]:
             ojs.import_ojs3_galleys(client, journal, options["ojs_id"])
         else:
@@ -24,6 +24,14 @@ class Command(BaseCommand):
         parser.add_argument('--include_articles', action="store_true",
                             default=False,
                             help="Include importing journal articles")
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of journals whose content is imported at the same time',
+        )
+        parser.add_argument(
+            '--log-dir', default=None,
+            help='Write the log of each journal to <journal path>.log here',
+        )
 
 
     def handle(self, *args, **options):
@@ -40,4 +48,6 @@ class Command(BaseCommand):
             journal_acronym=options["journal_acronym"],
             include_content=options["include_articles"],
             update_journals=options["update_journals"],
+            workers=options["workers"],
+            log_dir=options["log_dir"],
         )
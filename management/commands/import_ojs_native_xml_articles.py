@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 
+from plugins.imports import instrumentation
 from plugins.imports.ojs import native
 
 from journal import models as journal_models
@@ -15,6 +16,14 @@ class Command(BaseCommand):
         parser.add_argument('journal_code', default=None)
         parser.add_argument('owner_id', default=None)
         parser.add_argument('stage', default=None)
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of issues to import concurrently',
+        )
+        parser.add_argument(
+            '--stats-json', default=None,
+            help='Write a JSON summary of the import throughput to this path',
+        )
 
     def handle(self, *args, **options):
         with open(options.get('xml_path'), 'rb') as issue_file:
@@ -27,10 +36,21 @@ class Command(BaseCommand):
                 pk=options.get('owner_id')
             )
             stage = options.get('stage')
-            articles_imported, articles_updated = native.import_issues(
-                xml_content,
-                journal,
-                owner,
-                stage,
-            )
-            print(f'Imported: {len(articles_imported)}, updated: {len(articles_updated)}')
\ No newline at end of file
+            with instrumentation.track(
+                'native.import_issues',
+                summary_path=options.get('stats_json'),
+            ):
+                articles_imported, articles_updated, errors = native.import_issues(
+                    xml_content,
+                    journal,
+                    owner,
+                    stage,
+                    workers=options.get('workers'),
+                )
+            for issue, error in errors:
+                print(f'Failed to import issue {issue}: {error}')
+            print(
+                f'Imported: {len(articles_imported)}, '
+                f'updated: {len(articles_updated)}, '
+                f'failed issues: {len(errors)}'
+            )
\ No newline at end of file
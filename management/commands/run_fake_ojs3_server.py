@@ -0,0 +1,76 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from plugins.imports.benchmarks.fake_ojs3 import FakeOJS3Corpus, FakeOJS3Server
+
+
+class Command(BaseCommand):
+    """ Serves a synthetic OJS 3 REST API for load testing the importers"""
+
+    help = (
+        "Serves a fake OJS 3 REST API with a synthetic corpus that the "
+        "import_ojs3 and import_ojs3_journals commands can be pointed at"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8300)
+        parser.add_argument('--journals', type=int, default=1)
+        parser.add_argument('--articles', type=int, default=100)
+        parser.add_argument('--authors', type=int, default=3)
+        parser.add_argument('--issues', type=int, default=10)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument(
+            '--latency', type=float, default=0,
+            help='Seconds added to every request',
+        )
+        parser.add_argument(
+            '--jitter', type=float, default=0,
+            help='Up to this many seconds are added on top of the latency',
+        )
+        parser.add_argument(
+            '--error-rate', type=float, default=0,
+            help='Fraction of requests answered with a 500 error',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--fixtures', default=None,
+            help='JSON file of request paths to the JSON they respond with, '
+                 'served in place of the generated responses',
+        )
+
+    def handle(self, *args, **options):
+        responses = {}
+        if options['fixtures']:
+            with open(options['fixtures'], 'r') as fixtures_file:
+                responses = {
+                    path: ('application/json', json.dumps(data).encode())
+                    for path, data in json.load(fixtures_file).items()
+                }
+
+        corpus = FakeOJS3Corpus(
+            journals=options['journals'],
+            articles=options['articles'],
+            authors=options['authors'],
+            issues=options['issues'],
+            users=options['users'],
+        )
+        server = FakeOJS3Server(
+            corpus,
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            seed=options['seed'],
+            responses=responses,
+            host=options['host'],
+            port=options['port'],
+        )
+        for journal_path in corpus.journal_paths:
+            self.stdout.write('Serving %s' % server.journal_url(journal_path))
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write('Requests served: %s' % dict(server.requests))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from plugins.imports import jobs
+
+
+class Command(BaseCommand):
+    """Runs queued import and export jobs."""
+    help = "Runs the import and export jobs queued from the imports plugin"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true', default=False,
+            help='Exit once the queue is empty instead of waiting for jobs',
+        )
+        parser.add_argument(
+            '--sleep', type=int, default=5,
+            help='Seconds to wait between checks of an empty queue',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            jobs.reclaim_stale_jobs()
+            job = jobs.claim_next_job()
+            if job:
+                jobs.run_job(job)
+            elif options.get('once'):
+                break
+            else:
+                time.sleep(options.get('sleep'))
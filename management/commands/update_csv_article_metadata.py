@@ -7,6 +7,7 @@ from core.models import Account
 from django.core.management.base import BaseCommand
 from journal import models
 
+from plugins.imports import instrumentation, validation
 from plugins.imports.utils import DummyRequest
 from plugins.imports.utils import update_article_metadata
 
@@ -18,11 +19,34 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('csv_file')
         parser.add_argument('--owner-id', default=1)
+        parser.add_argument(
+            '--stats-json', default=None,
+            help='Write a JSON summary of the import throughput to this path',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true', default=False,
+            help='Validate the CSV and report any errors without importing it',
+        )
 
     def handle(self, *args, **options):
+        if options["dry_run"]:
+            errors = validation.validate_update_csv(options["csv_file"])
+            for error in errors:
+                message = error["error"]
+                if error.get("lines"):
+                    message += " (lines {})".format(error["lines"])
+                self.stderr.write(message)
+            self.stdout.write(
+                "Validation found {} errors".format(len(errors))
+            )
+            return
+
         owner = Account.objects.get(pk=options["owner_id"])
 
-        with open(options["csv_file"], "r") as f:
+        with open(options["csv_file"], "r") as f, instrumentation.track(
+            'update_article_metadata',
+            summary_path=options["stats_json"],
+        ):
             reader = csv.DictReader(f, delimiter=",")
             rows, actions = update_article_metadata(
                 reader,
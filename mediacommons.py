@@ -14,7 +14,6 @@ from core import (
         models as core_models,
 )
 from bs4 import BeautifulSoup
-from dateutil import parser as dateparser
 from django.conf import settings
 from django.core.files.base import ContentFile
 from django.db.utils import IntegrityError
@@ -28,7 +27,13 @@ from review import models as rw_models
 from submission import models as sm_models
 from utils.logger import get_logger
 
-from plugins.imports import common, jats
+from plugins.imports import (
+    common,
+    dates,
+    instrumentation,
+    jats,
+    keywords as imports_keywords,
+)
 from plugins.imports.utils import DummyRequest
 
 
@@ -56,6 +61,24 @@ def import_article(journal, owner, data):
         logger.info("Updating record for ID %s", pub_id)
 
     issues_data = data["part_of"]
+    with instrumentation.phase('issues'):
+        import_issues_data(journal, article, data, issues_data)
+
+    with instrumentation.phase('reviews'):
+        for review_data in data["reviews"]:
+            import_review_data(article, review_data)
+
+    with instrumentation.phase('authors'):
+        for idx, author_data in enumerate(data["contributors"], 1):
+            import_author(article, author_data, idx)
+        article.snapshot_authors(article)
+
+    with instrumentation.phase('galley'):
+        make_xml_galley(article, owner, data)
+    common.create_article_workflow_log(article)
+
+
+def import_issues_data(journal, article, data, issues_data):
     for i, issue_data in enumerate(issues_data):
         issue, created = update_or_create_issue(journal, issue_data)
         if created:
@@ -104,16 +127,6 @@ def import_article(journal, owner, data):
                 )
             )
 
-    for review_data in data["reviews"]:
-        import_review_data(article, review_data)
-
-    for idx, author_data in enumerate(data["contributors"], 1):
-        import_author(article, author_data, idx)
-    article.snapshot_authors(article)
-
-    make_xml_galley(article, owner, data)
-    common.create_article_workflow_log(article)
-
 
 def get_article_by_id(journal, pub_id):
     article = None
@@ -150,14 +163,12 @@ def update_or_create_article_by_id(journal, owner, pub_id, data):
     )
 
     section = sm_models.Section.objects.filter(journal=journal).first()
-    for tag in data["tags"] or []:
-        keyword, c = sm_models.Keyword.objects.get_or_create(word=tag)
-        article.keywords.add(keyword)
+    imports_keywords.set_article_keywords(article, data["tags"] or [])
 
     article.title = data["title"]
     article.section = section
     article.stage = "Published"
-    article.date_published = dateparser.parse(data["date"])
+    article.date_published = dates.parse(data["date"])
     article.owner = owner
     article.peer_reviewed = bool(data.get("reviews", False))
     if data["representative_image"]:
@@ -370,6 +381,7 @@ def prepare_review_data(mc_reviews):
 def fetch_remote_file(url, filename=None):
     logger.info("Fetching file from %s", url)
     response = requests.get(url)
+    instrumentation.record_http_request()
     if not response.ok:
         logger.error("Status %s received", response.status_code)
         return None
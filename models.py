@@ -129,3 +129,74 @@ class OJSFile(models.Model):
         'core.File',
         on_delete=models.CASCADE,
     )
+
+
+class ImportJob(models.Model):
+    """
+    A unit of import or export work queued from the web UI and executed by
+    the run_import_jobs management command.
+    """
+    UPDATE = 'update'
+    JATS = 'jats'
+    EXPORT = 'export'
+    WORDPRESS = 'wordpress'
+    JOB_TYPES = (
+        (UPDATE, 'Import / Export / Update CSV'),
+        (JATS, 'Zipped JATS import'),
+        (EXPORT, 'Article export'),
+        (WORDPRESS, 'WordPress posts import'),
+    )
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETE = 'complete'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (COMPLETE, 'Complete'),
+        (FAILED, 'Failed'),
+    )
+
+    job_type = models.CharField(max_length=20, choices=JOB_TYPES)
+    status = models.CharField(
+        max_length=20,
+        choices=STATUSES,
+        default=QUEUED,
+    )
+    journal = models.ForeignKey(
+        'journal.Journal',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+    )
+    owner = models.ForeignKey(
+        'core.Account',
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+    )
+    parameters = models.JSONField(default=dict, blank=True)
+    total = models.PositiveIntegerField(blank=True, null=True)
+    processed = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    result_file = models.CharField(max_length=999, blank=True, null=True)
+    created = models.DateTimeField(default=timezone.now)
+    started = models.DateTimeField(blank=True, null=True)
+    heartbeat = models.DateTimeField(blank=True, null=True)
+    finished = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ('-created',)
+
+    def __str__(self):
+        return '{} job #{} ({})'.format(
+            self.get_job_type_display(),
+            self.pk,
+            self.get_status_display(),
+        )
+
+    @property
+    def is_finished(self):
+        return self.status in {self.COMPLETE, self.FAILED}
@@ -11,6 +11,7 @@ from plugins.imports.ojs.main import (
     import_sections,
     import_users,
     import_journal_settings,
+    scrape_editor_assignments,
 
     #OJS3
     import_ojs3_articles,
@@ -1,19 +1,35 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from dateutil.relativedelta import relativedelta
+import hashlib
+from http.cookiejar import LoadError, LWPCookieJar
+from itertools import chain, islice
 import os
 import re
+import threading
 from urllib import parse as urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
 from django.core.files.base import ContentFile
 from utils.logger import get_logger
 
 from core.files import check_in_memory_mime
 
-from plugins.imports import common
+from plugins.imports import common, instrumentation
 
 logger = get_logger(__name__)
 
+# Connections kept open per host by each pooled session
+SESSION_POOL_MAXSIZE = 32
+
+# Number of users listed at a time when fetching user details concurrently
+USER_FETCH_PAGE_SIZE = 500
+
+_session_pool = None
+
 class PaginatedResults():
     OFFSET_KEY = ""
     PAGE_KEY = ""
@@ -102,6 +118,117 @@ class OJS3PaginatedResults(PaginatedResults):
             self._page += self._per_page
 
 
+class PooledSession():
+    """ A session shared by the clients of an OJS install and user"""
+    def __init__(self, session, cookie_path=None):
+        self.session = session
+        self.cookie_path = cookie_path
+        self.authenticated = False
+        # Whether the session was authenticated by this process, rather than
+        # with cookies saved by an earlier run that may have expired
+        self.verified = False
+        # Incremented on every login, so that a client that finds the
+        # session expired can tell if another client already logged in again
+        self.logins = 0
+        self.lock = threading.Lock()
+
+
+class SessionPool():
+    """ Shares requests sessions between the clients of the same OJS install
+
+    Clients for the same install and credentials get the same session, so
+    they share its authenticated cookies and connection pool. When a
+    cookie_dir is given, the cookies of authenticated sessions are also saved
+    there and loaded by later runs, which check them on first use and only
+    log in again if they have expired.
+    """
+    def __init__(self, cookie_dir=None, pool_maxsize=SESSION_POOL_MAXSIZE):
+        self.cookie_dir = cookie_dir
+        self.pool_maxsize = pool_maxsize
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, base_url, username=None, password=None):
+        """ Returns the PooledSession of an install and credentials
+        :param base_url: The base URL of the OJS install
+        :param username: The user the session authenticates as, if any
+        :param password: The password of the user
+        """
+        key = (base_url, get_credentials_key(username, password))
+        with self._lock:
+            if key not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_maxsize=self.pool_maxsize)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                pooled = PooledSession(session, self.get_cookie_path(*key))
+                pooled.authenticated = self.load_cookies(pooled)
+                self._sessions[key] = pooled
+            return self._sessions[key]
+
+    def get_cookie_path(self, base_url, credentials_key):
+        if not (self.cookie_dir and credentials_key):
+            return None
+        key = hashlib.sha256(
+            "{} {}".format(base_url, credentials_key).encode("utf-8")
+        ).hexdigest()
+        return os.path.join(self.cookie_dir, "%s.cookies" % key)
+
+    def load_cookies(self, pooled):
+        """ Loads the saved cookies of a session, if it has any
+        :return: Whether any cookies were loaded
+        """
+        if not pooled.cookie_path or not os.path.exists(pooled.cookie_path):
+            return False
+        jar = LWPCookieJar(pooled.cookie_path)
+        try:
+            jar.load(ignore_discard=True)
+        except (OSError, LoadError) as e:
+            logger.warning("Unable to load cookies: %s", e)
+            return False
+        for cookie in jar:
+            pooled.session.cookies.set_cookie(cookie)
+        logger.debug("Loaded saved cookies for %s", pooled.cookie_path)
+        return bool(jar)
+
+    def save_cookies(self, pooled):
+        """ Saves the cookies of a session, readable by the owner only"""
+        if not pooled.cookie_path:
+            return
+        os.makedirs(self.cookie_dir, mode=0o700, exist_ok=True)
+        # Create the file with its permissions before writing any cookies
+        os.close(os.open(
+            pooled.cookie_path, os.O_WRONLY | os.O_CREAT, 0o600,
+        ))
+        os.chmod(pooled.cookie_path, 0o600)
+        jar = LWPCookieJar(pooled.cookie_path)
+        for cookie in pooled.session.cookies:
+            jar.set_cookie(cookie)
+        jar.save(ignore_discard=True)
+
+
+def get_credentials_key(username, password):
+    """ A hash of the credentials a session authenticates with, so that
+    sessions are never shared by clients with different passwords
+    """
+    if not username:
+        return None
+    return hashlib.sha256(
+        "{}\0{}".format(username, password or "").encode("utf-8")
+    ).hexdigest()
+
+
+def get_session_pool():
+    """ Returns the session pool of the process, created on first use"""
+    global _session_pool
+    if _session_pool is None:
+        _session_pool = SessionPool(
+            cookie_dir=getattr(settings, "IMPORTS_OJS_COOKIE_DIR", None)
+            or os.path.join(settings.BASE_DIR, "files", "temp", "ojs_sessions"),
+        )
+    return _session_pool
+
+
 class OJSBaseClient():
     API_PATH = ''  # Path to the OJS API to be consumed
     AUTH_PATH = '/login/signIn' # Path where the auth details should be posted
@@ -113,23 +240,123 @@ class OJSBaseClient():
     LOGIN_HEADERS = {
         "Content-Type": "application/x-www-form-urlencoded",
     }
-
-    def __init__(self, journal_url, username=None, password=None, session=None):
-        """"A Client for consumption of OJS APIs"""
+    # A page that redirects to the login page unless the user is logged in
+    SESSION_CHECK_PATH = '/user/profile'
+
+    def __init__(
+        self, journal_url, username=None, password=None, session=None,
+        session_pool=None,
+    ):
+        """"A Client for consumption of OJS APIs
+        :param journal_url: The URL of the journal
+        :param username: Optional username to log in with
+        :param password: Optional password to log in with
+        :param session: Optional requests session, used instead of one
+            from the session pool
+        :param session_pool: Optional SessionPool, defaults to the one of
+            the process
+        """
         self.journal_url = journal_url
         self.base_url = urlparse.urlunsplit(
             urlparse.urlsplit(journal_url)._replace(path="/")
         )
         self._auth_dict = {}
-        self.session = session or requests.Session()
+        self.session_pool = session_pool
+        self._pooled = None
+        if session is None:
+            self.session_pool = session_pool or get_session_pool()
+            self._pooled = self.session_pool.get(
+                self.base_url, username, password,
+            )
+            session = self._pooled.session
+        self.session = session
         self.session.headers.update(**self.HEADERS)
+        instrumentation.count_session_requests(self.session)
         self.authenticated = False
         if username and password:
             self._auth_dict = {
                 'username': username,
                 'password': password,
             }
+            if self._pooled and self._pooled.authenticated:
+                logger.debug("Reusing the session of %s", self.base_url)
+                self.authenticated = True
+                self.verify_session()
+            else:
+                self.login()
+
+    def for_journal(self, journal_url):
+        """ Returns a client for another journal of the same install
+        The client shares the session of this one, so it is authenticated
+        without logging in again.
+        :param journal_url: The URL of the other journal
+        """
+        if self._pooled:
+            return type(self)(
+                journal_url,
+                session_pool=self.session_pool,
+                **self._auth_dict,
+            )
+        client = type(self)(journal_url, session=self.session)
+        client._auth_dict = self._auth_dict
+        client.authenticated = self.authenticated
+        return client
+
+    def request(self, method, url, **kwargs):
+        """ Makes a request with the session of the client
+        If the session has expired, the client logs in again and repeats
+        the request.
+        """
+        logins = self._pooled.logins if self._pooled else None
+        response = self.session.request(method, url, **kwargs)
+        if self._auth_dict and self.is_login_required(response):
+            logger.info("Session for %s expired", self.base_url)
+            self.login_again(logins)
+            response = self.session.request(method, url, **kwargs)
+        return response
+
+    def is_login_required(self, response):
+        """ Whether the response means the session isn't authenticated"""
+        if response.status_code == 401:
+            return True
+        for redirect in chain(response.history, [response]):
+            if redirect.is_redirect:
+                location = redirect.headers.get("Location", "")
+                if "/login" in urlparse.urlsplit(location).path:
+                    return True
+        return False
+
+    def verify_session(self):
+        """ Checks the cookies saved by an earlier run on first use, logging
+        in again if they are no longer authenticated
+        """
+        with self._pooled.lock:
+            if self._pooled.verified:
+                return
+            try:
+                response = self.session.get(
+                    self.journal_url + self.SESSION_CHECK_PATH,
+                )
+                expired = self.is_login_required(response)
+            except requests.RequestException as e:
+                logger.warning("Unable to check the saved session: %s", e)
+                expired = True
+            if expired:
+                logger.info("Saved session for %s expired", self.base_url)
+                self.login()
+            else:
+                self._pooled.verified = True
+
+    def login_again(self, logins=None):
+        """ Logs in again, unless another client sharing the session already
+        did so since logins was read
+        """
+        if not self._pooled:
             self.login()
+            return
+        with self._pooled.lock:
+            if self._pooled.logins == logins:
+                self.login()
 
     def login(self, username=None, password=None):
         # Fetch Login page
@@ -141,7 +368,54 @@ class OJSBaseClient():
         }
         req_headers = self.LOGIN_HEADERS
         self.post(auth_url, headers=req_headers, body=req_body)
+        self.logged_in()
+
+    def logged_in(self):
         self.authenticated = True
+        if self._pooled:
+            self._pooled.authenticated = True
+            self._pooled.verified = True
+            self._pooled.logins += 1
+            self.session_pool.save_cookies(self._pooled)
+
+
+class PrefetchedFilesClient():
+    """ Wraps a client to serve files that are fetched ahead of time
+
+    The files are fetched by the executor as soon as this is created, and
+    fetch_file waits for the file requested, so an article's files download
+    concurrently while the importers write earlier articles. Anything else
+    is delegated to the wrapped client.
+    """
+    def __init__(self, client, urls, executor):
+        """
+        :param client: An OJS client
+        :param urls: The URLs of the files to fetch ahead of time
+        :param executor: A concurrent.futures.Executor to fetch them with
+        """
+        self._client = client
+        fetch = instrumentation.bind_current_run(self._fetch)
+        self._files = {url: executor.submit(fetch, url) for url in urls}
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def _fetch(self, url):
+        django_file = self._client.fetch_file(url)
+        if django_file is None:
+            return None
+        return django_file.name, django_file.read()
+
+    def fetch_file(self, url, filename=None, extension=None, exc_mimes=None):
+        future = self._files.get(url)
+        if future is None or filename or extension or exc_mimes:
+            return self._client.fetch_file(url, filename, extension, exc_mimes)
+        fetched = future.result()
+        if fetched is None:
+            return None
+        # A new file each time, the importers may save the same URL twice
+        name, content = fetched
+        return ContentFile(content, name=name)
 
 
 class OJSJanewayClient(OJSBaseClient):
@@ -162,7 +436,9 @@ class OJSJanewayClient(OJSBaseClient):
 
 
     def fetch(self, request_url, headers=None, stream=False):
-        resp = self.session.get(request_url, headers=headers, stream=stream)
+        resp = self.request(
+            "GET", request_url, headers=headers, stream=stream,
+        )
         if not resp.ok:
             resp.raise_for_status()
         return resp
@@ -338,6 +614,7 @@ class UPJanewayClient(OJSJanewayClient):
     API_PATH = '/jms/janeway'
     AUTH_PATH = '/author/login/'
     SUBMISSION_PATH = '/jms/editor/submission/%s'
+    SESSION_CHECK_PATH = '/jms/user/profile'
 
     def login(self, username=None, password=None):
         # Fetch Login page
@@ -355,7 +632,7 @@ class UPJanewayClient(OJSJanewayClient):
             Referer=auth_url,
         )
         self.post(auth_url, headers=req_headers, body=req_body)
-        self.authenticated = True
+        self.logged_in()
 
     def set_csrftoken(self, url):
         """ Set the CSRF token cookie for the session
@@ -364,7 +641,8 @@ class UPJanewayClient(OJSJanewayClient):
         :param url: The URL for which the CSRFTOKEN needs setting
         """
         logger.debug("Setting CSRFTOKEN for url:%s " % url)
-        self.fetch(url)
+        # Not made through self.request, the login page isn't authenticated
+        self.session.get(url).raise_for_status()
 
 
 def strip_scheme(url):
@@ -415,7 +693,9 @@ class OJS3APIClient(OJSBaseClient):
     SUBMISSION_FILE_INTERNAL_REVIEW_REVISION = 20
 
     def fetch(self, request_url, headers=None, stream=False):
-        resp = self.session.get(request_url, headers=headers, stream=stream)
+        resp = self.request(
+            "GET", request_url, headers=headers, stream=stream,
+        )
         if not resp.ok:
             resp.raise_for_status()
         return resp
@@ -559,9 +839,10 @@ class OJS3APIClient(OJSBaseClient):
 
         return self.get_submission_files(submission_id, **query_params)
 
-    def get_submission_files(self, submission_id, **query_params):
+    def get_submission_files(self, submission_id, per_page=20, **query_params):
         """ Gets all the files linked to a given ojs submission
         :param submission_id: The OJS submission ID
+        :param per_page: Number of files requested at a time
         :param review_ids: A list of review assignment ids to filter by
         :round_ids: A list of review round ids to filter by
         """
@@ -575,7 +856,7 @@ class OJS3APIClient(OJSBaseClient):
             request_url += "?%s" % urlparse.urlencode(query_params)
 
         client = self.fetch
-        paginator = OJS3PaginatedResults(request_url, client)
+        paginator = OJS3PaginatedResults(request_url, client, per_page=per_page)
 
         for f in paginator:
             yield f
@@ -622,8 +903,11 @@ class OJS3APIClient(OJSBaseClient):
         )
         return self.fetch_file(request_url)
 
-    def get_users(self):
-        """ Retrieves all users for the given journal"""
+    def get_users(self, workers=1):
+        """ Retrieves all users for the given journal
+        :param workers: Number of users whose details are fetched at the
+            same time
+        """
         request_url = (
             self.journal_url
             + self.API_PATH
@@ -631,9 +915,22 @@ class OJS3APIClient(OJSBaseClient):
         )
         client = self.fetch
         paginator = OJS3PaginatedResults(request_url, client)
-        for _, user in enumerate(paginator):
-            # The site endpoint for each issue object provides more metadata
-            yield self.get_user(user["id"])
+        if workers <= 1:
+            for _, user in enumerate(paginator):
+                # The site endpoint for each issue object provides more metadata
+                yield self.get_user(user["id"])
+            return
+
+        get_user = instrumentation.bind_current_run(
+            lambda user: self.get_user(user["id"]),
+        )
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Fetch a page of users at a time so that a large site isn't
+            # listed in full before the first user is returned
+            page = list(islice(paginator, USER_FETCH_PAGE_SIZE))
+            while page:
+                yield from executor.map(get_user, page)
+                page = list(islice(paginator, USER_FETCH_PAGE_SIZE))
 
     def get_user(self, ojs_user_id):
         """ Retrieves the user matching the provided ID"""
@@ -662,3 +959,97 @@ class OJS3APIClient(OJSBaseClient):
         paginator = OJS3PaginatedResults(request_url, self.fetch)
         for result in paginator:
             yield result
+
+
+class SubmissionFileInventory():
+    """ Serves the submission files of an OJS 3 submission from memory
+
+    Wraps an OJS3APIClient and lists every file of the submission once, the
+    first time a file listing is requested. The listing methods of the client
+    are then answered from an index of the files by stage, review round and
+    associated object, every other attribute is looked up on the client.
+    """
+    PER_PAGE = 100
+
+    def __init__(self, client, submission_id):
+        self.client = client
+        self.submission_id = submission_id
+        self._files = None
+        self._by_stage = defaultdict(list)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    @property
+    def files(self):
+        if self._files is None:
+            self._files = list(self.client.get_submission_files(
+                self.submission_id, per_page=self.PER_PAGE,
+            ))
+            for file_json in self._files:
+                self._by_stage[file_json.get("fileStage")].append(file_json)
+        return self._files
+
+    def get_files(self, file_stage, review_round_ids=None, assoc_ids=None):
+        """ Returns the files of a stage from memory
+        :param file_stage: One of the SUBMISSION_FILE_ stages of the client
+        :param review_round_ids: Only files of these review rounds
+        :param assoc_ids: Only files associated with these objects, such as
+            the review assignments of reviewer attachments
+        """
+        self.files
+        files = self._by_stage[file_stage]
+        if review_round_ids is not None:
+            review_round_ids = {int(i) for i in review_round_ids}
+            files = [
+                f for f in files if f.get("reviewRoundId") in review_round_ids
+            ]
+        if assoc_ids is not None:
+            assoc_ids = {int(i) for i in assoc_ids}
+            files = [f for f in files if f.get("assocId") in assoc_ids]
+        return list(files)
+
+    def has_review_rounds(self, file_stage):
+        """ Older versions of OJS don't include the review round of files"""
+        return all("reviewRoundId" in f for f in self.get_files(file_stage))
+
+    def get_submission_files(self, submission_id, **query_params):
+        if submission_id != self.submission_id or query_params:
+            return self.client.get_submission_files(
+                submission_id, **query_params)
+        return list(self.files)
+
+    def get_prod_ready_files(self, submission_id):
+        if submission_id != self.submission_id:
+            return self.client.get_prod_ready_files(submission_id)
+        return self.get_files(self.SUBMISSION_FILE_PRODUCTION_READY)
+
+    def get_manuscript_files(self, submission_id):
+        if submission_id != self.submission_id:
+            return self.client.get_manuscript_files(submission_id)
+        return self.get_files(self.SUBMISSION_FILE_SUBMISSION)
+
+    def get_copyediting_files(self, submission_id, drafts=False):
+        if submission_id != self.submission_id:
+            return self.client.get_copyediting_files(submission_id, drafts)
+        if drafts:
+            return self.get_files(self.SUBMISSION_FILE_FINAL)
+        return self.get_files(self.SUBMISSION_FILE_COPYEDIT)
+
+    def get_review_files(self, submission_id, review_ids=None, round_ids=None, revisions=False):
+        if submission_id != self.submission_id:
+            return self.client.get_review_files(
+                submission_id, review_ids, round_ids, revisions)
+        if review_ids:
+            return self.get_files(
+                self.SUBMISSION_FILE_REVIEW_ATTACHMENT, assoc_ids=review_ids)
+        elif round_ids:
+            if revisions:
+                file_stage = self.SUBMISSION_FILE_REVIEW_REVISION
+            else:
+                file_stage = self.SUBMISSION_FILE_REVIEW_FILE
+            if not self.has_review_rounds(file_stage):
+                return self.client.get_review_files(
+                    submission_id, review_ids, round_ids, revisions)
+            return self.get_files(file_stage, review_round_ids=round_ids)
+        return list(self.files)
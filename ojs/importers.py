@@ -1,11 +1,9 @@
 import os
-import re
 from datetime import timedelta
 from urllib import parse as urlparse
 import uuid
 
 from bs4 import BeautifulSoup
-from dateutil import parser as dateparser
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils import timezone, translation
@@ -24,18 +22,14 @@ from submission import models as submission_models
 from utils import setting_handler
 from utils.logger import get_logger
 
-from plugins.imports import utils
+from plugins.imports import dates, keywords as imports_keywords, utils
+from plugins.imports.ojs import scraper
 try:
     from plugins.typesetting import plugin_settings as typesetting_settings
 except ImportError:
     typesetting_settings = None
 
 logger = get_logger(__name__)
-# Set date time to 12 UTC to ensure correct date for timezone
-HOUR = 12
-
-# Parse emails from "display name <some@email.com>"
-DISPLAY_NAME_EMAIL_RE = re.compile("<([^>]+)>")
 
 """
 REVIEW RECOMMENDATIONS FROM OJS
@@ -126,16 +120,10 @@ def import_article_metadata(article_dict, journal, client):
     # Add keywords
     keywords = article_dict.get('keywords')
     if keywords:
-        for i, keyword in enumerate(keywords):
-            if keyword:
-                keyword = strip_tags(keyword)
-                word, _ = submission_models.Keyword.objects.get_or_create(
-                    word=keyword)
-                submission_models.KeywordArticle.objects.update_or_create(
-                    keyword=word,
-                    article=article,
-                    defaults={"order": i},
-                )
+        imports_keywords.set_article_keywords(
+            article,
+            (strip_tags(keyword) for keyword in keywords if keyword),
+        )
 
     # Add authors
     emails = set()
@@ -299,16 +287,15 @@ def import_review_assignment(client, article, review, review_form, decision):
 
 
     # Parse the dates
-    date_requested = timezone.make_aware(
-        dateparser.parse(review.get('date_requested')).replace(hour=HOUR)
+    date_requested = dates.get_aware_datetime_at_noon(
+        review.get('date_requested'),
     )
-    date_due = timezone.make_aware(
-        dateparser.parse(review.get('date_due')).replace(hour=HOUR))
-    date_complete = timezone.make_aware(
-        dateparser.parse(review.get('date_complete')).replace(hour=HOUR)) if review.get(
+    date_due = dates.get_aware_datetime_at_noon(review.get('date_due'))
+    date_complete = dates.get_aware_datetime_at_noon(
+        review.get('date_complete')) if review.get(
         'date_complete') else None
-    date_confirmed = timezone.make_aware(
-        dateparser.parse(review.get('date_confirmed')).replace(hour=HOUR)) if review.get(
+    date_confirmed = dates.get_aware_datetime_at_noon(
+        review.get('date_confirmed')) if review.get(
         'date_confirmed') else None
     date_declined = None
     date_accepted = date_confirmed
@@ -383,7 +370,7 @@ def import_editorial_decision(client, article_dict, article, revision=None):
 
     # Article has been accepted
     if decision_code == "1":
-        article.date_accepted = timezone.make_aware(dateparser.parse(
+        article.date_accepted = timezone.make_aware(dates.parse(
             article_dict["latest_editor_decision"]["dateDecided"]
         ))
 
@@ -400,7 +387,7 @@ def import_editorial_decision(client, article_dict, article, revision=None):
                 article_dict["latest_editor_decision"]["editor"],
             )
             return
-        date_decided = timezone.make_aware(dateparser.parse(
+        date_decided = timezone.make_aware(dates.parse(
             article_dict["latest_editor_decision"]["dateDecided"]
         ))
         request, c = review_models.RevisionRequest.objects.update_or_create(
@@ -732,8 +719,8 @@ def import_publication(article_dict, article, client):
     """
     pub_data = article_dict.get("publication", {})
     if pub_data.get('date_published'):
-        article.date_published = timezone.make_aware(
-            dateparser.parse(pub_data.get('date_published')).replace(hour=HOUR)
+        article.date_published = dates.get_aware_datetime_at_noon(
+            pub_data.get('date_published'),
         )
         article.save()
     if pub_data and pub_data.get("number"):
@@ -992,8 +979,8 @@ def create_workflow_log(article, stage):
 def get_or_create_article(article_dict, journal):
     """Get or create article, looking up by OJS ID or DOI"""
     created = False
-    date_started = timezone.make_aware(
-        dateparser.parse(article_dict.get('date_submitted')).replace(hour=HOUR))
+    date_started = dates.get_aware_datetime_at_noon(
+        article_dict.get('date_submitted'))
 
     doi = article_dict.get("doi")
     ojs_id = article_dict["ojs_id"]
@@ -1201,42 +1188,60 @@ def get_or_create_collection(collection_data, journal):
     return collection
 
 
-def scrape_editor_assignments(client, ojs_id, article):
+def scrape_editor_assignments(client, ojs_id, article, page_cache=None):
     """ Imports editor assignments by scraping them
 
     Not required since ojs-janeway v1.1
-    Expected html structure
-    <form action="{url}/setEditorFlags">
-        <table>
-        <tr valign="top">
-            <td>(Section )Editor</td>
-            <td><a href="{emailink}">{editor_name}</td>
-    [...]
+    :param client: An OJSJanewayClient
+    :param ojs_id: The OJS ID of the article
+    :param article: The imported Article
+    :param page_cache: Optional scraper.PageCache for the submission page
     """
-    url = client.journal_url + client.SUBMISSION_PATH % ojs_id
-    resp = client.fetch(url)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.content, "html.parser")
-    form = soup.find(
-        "form", {"action": re.compile("setEditorFlags$")})
-    rows = form.find_all("tr", {"valign": "top"})
-    for row in rows:
-        # Parse assigned role
-        role_c, mailto_c, *_, date_c, _ = row.find_all("td")
-        role_name = ROLES_PRETTY.get(role_c.text)
+    scrape_all_editor_assignments(
+        client, {ojs_id: article}, page_cache=page_cache, workers=1,
+    )
+
+
+def scrape_all_editor_assignments(
+    client, articles, page_cache=None, workers=scraper.SCRAPE_WORKERS,
+):
+    """ Imports the editor assignments of many articles by scraping them
+    The submission pages are fetched concurrently, and each one is parsed
+    and imported as soon as it arrives.
+    :param client: An OJSJanewayClient
+    :param articles: A dict of OJS ID to the imported Article
+    :param page_cache: Optional scraper.PageCache for the submission pages
+    :param workers: Number of pages fetched at the same time
+    """
+    articles_by_url = {
+        client.journal_url + client.SUBMISSION_PATH % ojs_id: article
+        for ojs_id, article in articles.items()
+    }
+    for url, content in scraper.iter_pages(
+        client, articles_by_url, page_cache, workers,
+    ):
+        import_scraped_editors(
+            scraper.parse_editor_assignments(content), articles_by_url[url],
+        )
+
+
+def import_scraped_editors(scraped_editors, article):
+    """ Imports the editor assignments of an article
+    :param scraped_editors: A list of scraper.ScrapedEditor
+    :param article: The imported Article
+    """
+    for scraped in scraped_editors:
+        role_name = ROLES_PRETTY.get(scraped.role)
 
         # get editor account
-        mailto_url = mailto_c.find("a")["href"]
-        display_name = get_query_param(mailto_url, "to[]")[0]
-        editor_email = DISPLAY_NAME_EMAIL_RE.findall(display_name)[0]
-        editor, _ = get_or_create_account({"email": editor_email}, update=False)
+        editor, _ = get_or_create_account(
+            {"email": scraped.email}, update=False,
+        )
         editor.add_account_role("author", article.journal)
 
         # Get assignment date
         try:
-            date_assigned = timezone.make_aware(
-                dateparser.parse(date_c.text)
-            )
+            date_assigned = timezone.make_aware(dates.parse(scraped.date))
         except ValueError:
             date_assigned = article.date_submitted
         review_models.EditorAssignment.objects.update_or_create(
@@ -1251,8 +1256,7 @@ def scrape_editor_assignments(client, ojs_id, article):
 
 def attempt_to_make_timezone_aware(datetime):
     if datetime:
-        dt = dateparser.parse(datetime)
-        return timezone.make_aware(dt.replace(hour=HOUR))
+        return dates.get_aware_datetime_at_noon(datetime)
     else:
         return None
 
@@ -1285,6 +1289,50 @@ def get_query_param(url, param):
     return query_dict.get(param)
 
 
+def get_file_urls(article_dict, review=True, copyediting=True, galleys=True):
+    """ Lists the URLs of the files of an article that the importers fetch
+    :param article_dict: An article object from the Janeway OJS plugin
+    :param review: Include the files imported by import_review_data
+    :param copyediting: Include the files imported by import_copyediting
+    :param galleys: Include the galley files imported by import_typesetting
+    :return: A list of URLs, without duplicates
+    """
+    file_jsons = []
+    urls = []
+    if review:
+        file_jsons.extend(
+            article_dict.get(key) for key in (
+                "manuscript_file", "review_file", "editor_file",
+                "author_revision",
+            )
+        )
+        file_jsons.extend(article_dict.get("supp_files") or [])
+        for review_dict in article_dict.get("reviews") or []:
+            if review_dict.get("review_file"):
+                file_jsons.append(review_dict["review_file"])
+            elif review_dict.get("review_file_url"):
+                urls.append(review_dict["review_file_url"])
+    if copyediting:
+        copyediting_dict = article_dict.get("copyediting") or {}
+        for signoff in ("initial", "author", "final"):
+            file_jsons.append((copyediting_dict.get(signoff) or {}).get("file"))
+        file_jsons.extend(
+            copyediting_dict.get(key)
+            for key in ("initial_file", "author_file", "final_file")
+        )
+    if galleys:
+        layout = article_dict.get("layout") or {}
+        for galley_dict in layout.get("galleys") or []:
+            if galley_dict.get("file") and galley_dict["file"] != "None":
+                file_jsons.append(galley_dict["file"])
+
+    urls.extend(
+        file_json["url"] for file_json in file_jsons
+        if isinstance(file_json, dict) and file_json.get("url")
+    )
+    return list(dict.fromkeys(urls))
+
+
 def import_file(client, file_json, article, label, file_name=None, owner=None):
     """ Imports an OJS file from the provided JSON metadata"""
     if not file_json or not file_json["url"]:
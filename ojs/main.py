@@ -1,9 +1,19 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from itertools import chain
+import logging
+import os
+import threading
 
+from django.db import connection
+
+from identifiers import models as identifiers_models
 from submission import models as submission_models
 
+from plugins.imports import instrumentation, keywords as imports_keywords
 from plugins.imports.ojs import importers
-from plugins.imports.ojs import clients, ojs3_importers
+from plugins.imports.ojs import clients, ojs3_importers, scraper
 from plugins.imports.ojs.importers import (
     calculate_article_stage,
     create_workflow_log,
@@ -22,6 +32,8 @@ from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+JOURNAL_LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
 
 def import_article(ojs_client, journal, ojs_id, galleys=True):
     article_dict = ojs_client.get_article(ojs_id)
@@ -34,15 +46,59 @@ def import_article(ojs_client, journal, ojs_id, galleys=True):
         import_publication(article_dict, article, ojs_client)
 
 
-def import_published_articles(ojs_client, journal, galleys=True):
+def prefetch_article_files(ojs_client, article_dicts, workers=1, **kinds):
+    """ Yields each article with a client that serves its files
+
+    With more than one worker, the files of the next articles are fetched
+    concurrently while the caller imports the current one. The articles are
+    still yielded, and so imported, one at a time and in order.
+    :param ojs_client: An OJSJanewayClient
+    :param article_dicts: An iterable of article objects from OJS
+    :param workers: Number of files fetched at the same time, which is also
+        the number of articles whose files are fetched ahead
+    :param kinds: Which kinds of files are fetched, see get_file_urls
+    :return: A generator of (article dict, client) tuples
+    """
+    if workers <= 1:
+        for article_dict in article_dicts:
+            yield article_dict, ojs_client
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        ahead = deque()
+        for article_dict in article_dicts:
+            ahead.append((
+                article_dict,
+                clients.PrefetchedFilesClient(
+                    ojs_client,
+                    importers.get_file_urls(article_dict, **kinds),
+                    executor,
+                ),
+            ))
+            if len(ahead) > workers:
+                yield ahead.popleft()
+        while ahead:
+            yield ahead.popleft()
+
+
+def typesetting_plugin_galleys(journal):
+    """ Whether import_typesetting imports galleys when it isn't asked to,
+    which it does for journals with the typesetting plugin in the workflow
+    """
+    return journal.element_in_workflow("Typesetting Plugin")
+
+
+def import_published_articles(ojs_client, journal, galleys=True, workers=1):
     articles = ojs_client.get_articles("published")
-    for article_dict in articles:
-        article, created = import_article_metadata(article_dict, journal, ojs_client)
+    for article_dict, client in prefetch_article_files(
+        ojs_client, articles, workers, galleys=galleys,
+    ):
+        article, created = import_article_metadata(article_dict, journal, client)
 
-        import_review_data(article_dict, article, ojs_client)
-        import_copyediting(article_dict, article, ojs_client)
-        import_typesetting(article_dict, article, ojs_client, galleys)
-        import_publication(article_dict, article, ojs_client)
+        import_review_data(article_dict, article, client)
+        import_copyediting(article_dict, article, client)
+        import_typesetting(article_dict, article, client, galleys)
+        import_publication(article_dict, article, client)
 
         stage = calculate_article_stage(article_dict, article)
         article.stage = stage
@@ -51,17 +107,20 @@ def import_published_articles(ojs_client, journal, galleys=True):
         logger.info("Imported article with article ID %d" % article.pk)
 
 
-def import_in_progress_articles(ojs_client, journal):
+def import_in_progress_articles(ojs_client, journal, workers=1):
     """ imports all articles in review or being edited"""
     in_review = ojs_client.get_articles("in_review")
     in_editing = ojs_client.get_articles("in_editing")
     seen = set()
-    for article_dict in chain(in_review, in_editing):
-        article, created = import_article_metadata(article_dict, journal, ojs_client)
+    for article_dict, client in prefetch_article_files(
+        ojs_client, chain(in_review, in_editing), workers,
+        galleys=typesetting_plugin_galleys(journal),
+    ):
+        article, created = import_article_metadata(article_dict, journal, client)
 
-        import_review_data(article_dict, article, ojs_client)
-        import_copyediting(article_dict, article, ojs_client)
-        import_typesetting(article_dict, article, ojs_client)
+        import_review_data(article_dict, article, client)
+        import_copyediting(article_dict, article, client)
+        import_typesetting(article_dict, article, client)
 
         stage = calculate_article_stage(article_dict, article)
         article.stage = stage
@@ -71,12 +130,14 @@ def import_in_progress_articles(ojs_client, journal):
         seen.add(article_dict["ojs_id"])
 
 
-def import_unassigned_articles(ojs_client, journal):
+def import_unassigned_articles(ojs_client, journal, workers=1):
     articles = ojs_client.get_articles("unassigned")
-    for article_dict in articles:
-        article, created  = import_article_metadata(article_dict, journal, ojs_client)
+    for article_dict, client in prefetch_article_files(
+        ojs_client, articles, workers, copyediting=False, galleys=False,
+    ):
+        article, created  = import_article_metadata(article_dict, journal, client)
 
-        import_review_data(article_dict, article, ojs_client)
+        import_review_data(article_dict, article, client)
 
         calculate_article_stage(article_dict, article)
         article.stage = submission_models.STAGE_UNASSIGNED
@@ -85,12 +146,14 @@ def import_unassigned_articles(ojs_client, journal):
         logger.info("Imported article with article ID %d" % article.pk)
 
 
-def import_in_review_articles(ojs_client, journal):
+def import_in_review_articles(ojs_client, journal, workers=1):
     articles = ojs_client.get_articles("in_review")
-    for article_dict in articles:
-        article, created = import_article_metadata(article_dict, journal, ojs_client)
+    for article_dict, client in prefetch_article_files(
+        ojs_client, articles, workers, copyediting=False, galleys=False,
+    ):
+        article, created = import_article_metadata(article_dict, journal, client)
 
-        import_review_data(article_dict, article, ojs_client)
+        import_review_data(article_dict, article, client)
 
         calculate_article_stage(article_dict, article)
         article.stage = submission_models.STAGE_UNDER_REVIEW
@@ -98,14 +161,17 @@ def import_in_review_articles(ojs_client, journal):
 
         logger.info("Imported article with article ID %d" % article.pk)
 
-def import_in_editing_articles(ojs_client, journal):
+def import_in_editing_articles(ojs_client, journal, workers=1):
     articles = ojs_client.get_articles("in_editing")
-    for article_dict in articles:
-        article, created = import_article_metadata(article_dict, journal, ojs_client)
+    for article_dict, client in prefetch_article_files(
+        ojs_client, articles, workers,
+        galleys=typesetting_plugin_galleys(journal),
+    ):
+        article, created = import_article_metadata(article_dict, journal, client)
 
-        import_review_data(article_dict, article, ojs_client)
-        import_copyediting(article_dict, article, ojs_client)
-        import_typesetting(article_dict, article, ojs_client)
+        import_review_data(article_dict, article, client)
+        import_copyediting(article_dict, article, client)
+        import_typesetting(article_dict, article, client)
 
         stage = calculate_article_stage(article_dict, article)
         if (
@@ -122,6 +188,34 @@ def import_in_editing_articles(ojs_client, journal):
         logger.info("Imported article with article ID %d" % article.pk)
 
 
+def scrape_editor_assignments(
+    ojs_client, journal, page_cache_dir=None, workers=None,
+):
+    """ Imports the editor assignments of the journal's imported articles
+    by scraping their OJS submission pages, for installs whose plugin
+    predates ojs-janeway v1.1
+    :param ojs_client: An OJSJanewayClient
+    :param journal: The Journal the articles were imported into
+    :param page_cache_dir: Optional directory where the pages are cached,
+        so that later runs parse them without downloading them again
+    :param workers: Number of pages fetched at the same time, defaults to
+        scraper.SCRAPE_WORKERS
+    """
+    articles = {
+        identifier.identifier: identifier.article
+        for identifier in identifiers_models.Identifier.objects.filter(
+            id_type="ojs_id",
+            article__journal=journal,
+        ).select_related("article")
+    }
+    page_cache = scraper.PageCache(page_cache_dir) if page_cache_dir else None
+    importers.scrape_all_editor_assignments(
+        ojs_client, articles,
+        page_cache=page_cache,
+        workers=workers or scraper.SCRAPE_WORKERS,
+    )
+
+
 def import_issues(ojs_client, journal):
     for issue_dict in ojs_client.get_issues():
         issue = import_issue_metadata(issue_dict, ojs_client, journal)
@@ -184,61 +278,238 @@ def import_ojs3_articles(
         articles = [client.get_article(ojs_id)]
     else:
         articles = client.get_articles()
-    for d in articles:
-        try:
-            ojs3_importers.import_article(
-                client, journal, d,
-                editorial=editorial, galleys=galleys,
-            )
-        except Exception as e:
-            if raise_on_exc:
-                raise
-            logger.error("Article Import Failed: %s", e)
-            logger.exception(e)
-
-
-def import_ojs3_issues(client, journal, issue_id=None):
+    with instrumentation.track(
+        'import_ojs3_articles',
+    ) as run, ojs3_importers.journal_cache(journal), \
+            imports_keywords.keyword_cache():
+        for d in articles:
+            try:
+                with run.item(d.get("id")):
+                    ojs3_importers.import_article(
+                        client, journal, d,
+                        editorial=editorial, galleys=galleys,
+                    )
+            except Exception as e:
+                if raise_on_exc:
+                    raise
+                logger.error("Article Import Failed: %s", e)
+                logger.exception(e)
+
+
+def import_ojs3_issues(client, journal, issue_id=None, workers=1):
+    """ Imports the published issues of an OJS 3 journal
+    :param client: An OJS3APIClient
+    :param journal: The Journal to import the issues into
+    :param issue_id: Optional OJS ID of the only issue to import
+    :param workers: Number of issues imported at the same time
+    """
     if issue_id:
         issues = [client.get_issue(issue_id)]
     else:
         issues = client.get_issues()
-    for issue_dict in issues:
-        ojs3_importers.import_issue(client, journal, issue_dict)
+    _import_ojs3_issues(client, journal, issues, workers)
 
 
-def import_ojs3_unpublished_issues(client, journal):
+def import_ojs3_unpublished_issues(client, journal, workers=1):
     issues = client.get_issues(unpublished=True)
-    for issue_dict in issues:
-        ojs3_importers.import_issue(client, journal, issue_dict)
+    _import_ojs3_issues(client, journal, issues, workers)
+
+
+def _import_ojs3_issues(client, journal, issues, workers):
+    with instrumentation.track('import_ojs3_issues') as run:
+        if workers > 1:
+            issues = list(issues)
+            run.total = len(issues)
+            # Sections are shared between issues so they are imported up
+            # front, this way concurrent issues don't race to create them.
+            for section_dict in {
+                section_dict["id"]: section_dict
+                for issue_dict in issues
+                for section_dict in issue_dict["sections"]
+            }.values():
+                ojs3_importers.update_or_create_section(
+                    journal, section_dict["id"], section_dict,
+                )
+            import_in_thread = instrumentation.bind_current_run(
+                _import_ojs3_issue_in_thread,
+            )
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Consuming the results re-raises the first failure
+                list(executor.map(
+                    lambda issue_dict: import_in_thread(
+                        client, journal, issue_dict, run,
+                    ),
+                    issues,
+                ))
+        else:
+            with ojs3_importers.journal_cache(journal), \
+                    imports_keywords.keyword_cache():
+                for issue_dict in issues:
+                    with run.item(issue_dict["id"]):
+                        ojs3_importers.import_issue(client, journal, issue_dict)
+
+
+def _import_ojs3_issue_in_thread(client, journal, issue_dict, run):
+    try:
+        with run.item(issue_dict["id"]), \
+                ojs3_importers.journal_cache(journal), \
+                imports_keywords.keyword_cache():
+            return ojs3_importers.import_issue(client, journal, issue_dict)
+    finally:
+        # Each thread gets its own database connection, close it so we
+        # don't leave them hanging around once the import finishes.
+        connection.close()
 
 
 def import_ojs3_journals(
     client, journal_acronym=None, include_content=True, update_journals=True,
-    galleys=True,
+    galleys=True, workers=1, log_dir=None,
 ):
-    journals = client.get_journals(journal_acronym)
-    for journal_dict in journals:
+    """ Imports the journals of an OJS 3 install and, optionally, their content
+    :param client: An OJS3APIClient for the site
+    :param journal_acronym: Optional path of the only journal to import
+    :param include_content: Import the users, articles, issues and metrics of
+        each journal
+    :param update_journals: Whether existing journal metadata is updated
+    :param galleys: Whether article galleys are imported
+    :param workers: Number of journals whose content is imported at the
+        same time
+    :param log_dir: Optional directory where the log of each journal's
+        content import is written, as <journal path>.log
+    :return: A dict of journal path to the exception that stopped the import
+        of its content, for those journals that failed
+    """
+    journals = []
+    for journal_dict in client.get_journals(journal_acronym):
         logger.set_prefix(journal_dict["urlPath"])
         logger.info("Importing journal %s", journal_dict["urlPath"])
         journal = ojs3_importers.import_journal_metadata(
             client, journal_dict, update_journal_data=update_journals)
-        if include_content:
-            journal_client = clients.OJS3APIClient(
-                journal_dict["url"],
-                **client._auth_dict,
+        journals.append((journal_dict, journal))
+
+    if not include_content:
+        return {}
+
+    # Journals on the same install share the login of the site client
+    journal_clients = [
+        client.for_journal(journal_dict["url"])
+        for journal_dict, _ in journals
+    ]
+
+    # Accounts are shared between journals, so users are imported before
+    # any journal runs concurrently, this way they don't race to create them.
+    errors = {}
+    for (journal_dict, journal), journal_client in zip(
+        journals, journal_clients,
+    ):
+        try:
+            with journal_log(log_dir, journal_dict["urlPath"]):
+                import_ojs3_users(journal_client, journal, workers=workers)
+        except Exception as e:
+            logger.exception("Error importing users: %s", journal)
+            errors[journal_dict["urlPath"]] = e
+
+    pending = [
+        (journal_dict, journal, journal_client)
+        for (journal_dict, journal), journal_client
+        in zip(journals, journal_clients)
+        if journal_dict["urlPath"] not in errors
+    ]
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(
+                lambda args: _import_ojs3_journal_in_thread(
+                    *args, galleys=galleys, log_dir=log_dir,
+                ),
+                pending,
             )
-            try:
-                import_ojs3_users(journal_client, journal)
-                import_ojs3_articles(journal_client, journal, galleys)
-                import_ojs3_issues(journal_client, journal)
-                import_ojs3_metrics(journal_client, journal)
-            except Exception as e:
-                logger.exception("Error importing articles: %s", journal)
+            results = list(results)
+    else:
+        results = [
+            _import_ojs3_journal_content(
+                journal_dict, journal, journal_client,
+                galleys=galleys, log_dir=log_dir,
+            )
+            for journal_dict, journal, journal_client in pending
+        ]
+
+    for (journal_dict, _, _), error in zip(pending, results):
+        if error:
+            errors[journal_dict["urlPath"]] = error
+    logger.info(
+        "Imported the content of %s journals, %s failed: %s",
+        len(journals), len(errors), ", ".join(errors),
+    )
+    return errors
 
 
-def import_ojs3_users(client, journal):
-    for user_dict in client.get_users():
-        ojs3_importers.import_user(user_dict, journal)
+def _import_ojs3_journal_content(
+    journal_dict, journal, client, galleys=True, log_dir=None,
+):
+    """ Imports the articles, issues and metrics of a journal
+    Failures are returned rather than raised so that one broken journal
+    does not stop the rest of the site from being imported.
+    """
+    logger.set_prefix(journal_dict["urlPath"])
+    try:
+        with journal_log(log_dir, journal_dict["urlPath"]):
+            logger.info("Importing content of journal %s", journal)
+            import_ojs3_articles(client, journal, galleys=galleys)
+            import_ojs3_issues(client, journal)
+            import_ojs3_metrics(client, journal)
+            logger.info("Imported content of journal %s", journal)
+    except Exception as e:
+        logger.exception("Error importing articles: %s", journal)
+        return e
+    return None
+
+
+def _import_ojs3_journal_in_thread(*args, **kwargs):
+    try:
+        return _import_ojs3_journal_content(*args, **kwargs)
+    finally:
+        # Each thread gets its own database connection, close it so we
+        # don't leave them hanging around once the import finishes.
+        connection.close()
+
+
+@contextmanager
+def journal_log(log_dir, name):
+    """ Copies the log records of the calling thread to <log_dir>/<name>.log
+    :param log_dir: The directory of the log, nothing is copied when None
+    :param name: The name of the log file, without extension
+    """
+    if not log_dir:
+        yield
+        return
+    os.makedirs(log_dir, exist_ok=True)
+    handler = logging.FileHandler(os.path.join(log_dir, "%s.log" % name))
+    handler.setFormatter(logging.Formatter(JOURNAL_LOG_FORMAT))
+    thread_id = threading.get_ident()
+    handler.addFilter(lambda record: record.thread == thread_id)
+    root_logger = logging.getLogger()
+    root_logger.addHandler(handler)
+    try:
+        yield
+    finally:
+        root_logger.removeHandler(handler)
+        handler.close()
+
+
+def import_ojs3_users(client, journal, workers=1):
+    """ Imports the users of an OJS 3 journal in bulk
+    :param client: An OJS3APIClient
+    :param journal: The Journal to import the users into
+    :param workers: Number of users whose details are fetched at the same
+        time
+    """
+    if workers > 1:
+        user_dicts = client.get_users(workers=workers)
+    else:
+        user_dicts = client.get_users()
+    with instrumentation.track('import_ojs3_users'):
+        created, updated = ojs3_importers.import_users(user_dicts, journal)
+    logger.info("Imported %s new and %s existing users", created, updated)
 
 
 def import_ojs3_metrics(client, journal, ojs_ids=None):
@@ -1,10 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import bs4
 from bs4 import BeautifulSoup
 
+from django.db import connection, transaction
 from django.utils.html import strip_tags
 from django.core.files.base import ContentFile
 
-from plugins.imports import common, models
+from plugins.imports import (
+    common,
+    instrumentation,
+    keywords as imports_keywords,
+    models,
+)
 from plugins.imports.ojs.importers import GALLEY_TYPES
 from plugins.imports.ojs import importers
 from plugins.imports import utils
@@ -13,6 +21,9 @@ from journal import models as journal_models
 from submission import models as submission_models
 from utils import shared
 from identifiers import models as ident_models
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 
 def import_users(xml_content, journal):
@@ -69,26 +80,139 @@ def import_users(xml_content, journal):
     return accounts
 
 
-def import_issues(xml_content, journal, owner, stage):
+def import_issues(xml_content, journal, owner, stage, workers=1):
+    """ Imports every issue found in an OJS native XML export
+    :param xml_content: The native XML export
+    :param journal: The Journal to import the issues into
+    :param owner: The Account that will own any new articles
+    :param stage: The stage new articles are placed on
+    :param workers: Number of issues to import concurrently
+    :return: A tuple of articles imported, articles updated and a list of
+        (issue, exception) pairs for those issues that failed to import
+    """
     souped_xml = bs4.BeautifulSoup(xml_content, 'lxml')
 
     # find each of the import sections we need
     issue_soup = souped_xml.findAll('issue')
 
+    # Sections, accounts, licences and keywords are shared between issues
+    # so they are imported up front, this way concurrent issues only read
+    # them rather than racing to create the same rows.
     for issue in issue_soup:
-        section_soup = issue.findAll('section')
-        article_soup = issue.findAll('article')
+        import_sections(issue.findAll('section'), journal)
+    accounts = import_shared_records(
+        souped_xml.findAll('publication'), journal,
+    )
 
-        issue = import_issue(issue, journal)
-        import_sections(section_soup, journal)
-        articles_imported, articles_updated = import_articles(
-            article_soup,
+    articles_imported = list()
+    articles_updated = list()
+    errors = list()
+
+    with instrumentation.track(
+        'native.import_issues',
+        total=len(souped_xml.findAll('article')),
+    ):
+        if workers > 1:
+            import_in_thread = instrumentation.bind_current_run(
+                _import_issue_in_thread,
+            )
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(
+                    lambda soup: import_in_thread(
+                        soup, journal, owner, stage, accounts,
+                    ),
+                    issue_soup,
+                )
+                results = list(results)
+        else:
+            results = [
+                _import_issue_and_articles(
+                    soup, journal, owner, stage, accounts,
+                )
+                for soup in issue_soup
+            ]
+
+    for soup, (imported, updated, error) in zip(issue_soup, results):
+        articles_imported.extend(imported)
+        articles_updated.extend(updated)
+        if error:
+            volume = common.get_text_or_none(soup, 'volume')
+            number = common.get_text_or_none(soup, 'number')
+            errors.append((f'Vol. {volume} No. {number}', error))
+
+    return articles_imported, articles_updated, errors
+
+
+def import_shared_records(publication_soup, journal):
+    """ Creates the records that the articles of different issues share
+    Accounts are created and updated here, so importing the articles of an
+    issue only links them, never writes to them.
+    :param publication_soup: The publication elements of the export
+    :param journal: The Journal the issues are imported into
+    :return: A dict of lowercased author email to Account
+    """
+    accounts = {}
+    keywords = []
+    for publication in publication_soup:
+        get_license(
+            common.get_text_or_none(publication, 'licenseurl'),
             journal,
-            owner,
-            stage,
-            issue,
         )
-        return articles_imported, articles_updated
+        get_section(publication, journal)
+        keywords.extend(
+            strip_tags(keyword) for keyword in get_keywords(publication)
+            if keyword
+        )
+        for author in get_authors(publication):
+            if author.get('email'):
+                account, _ = importers.get_or_create_account(
+                    author, update=True,
+                )
+                if account:
+                    accounts[get_email_key(author['email'])] = account
+
+    imports_keywords.intern(keywords)
+    return accounts
+
+
+def get_email_key(email):
+    return importers.clean_email(email).lower()
+
+
+def _import_issue_and_articles(issue_soup, journal, owner, stage, accounts):
+    """ Imports a single issue and its articles in its own transaction
+    Failures are returned rather than raised so that one broken issue does
+    not stop the rest of the export from being imported.
+    :param accounts: A dict of lowercased author email to Account, as
+        returned by import_shared_records
+    """
+    try:
+        with imports_keywords.keyword_cache(), transaction.atomic():
+            issue = import_issue(issue_soup, journal)
+            imported, updated = import_articles(
+                issue_soup.findAll('article'),
+                journal,
+                owner,
+                stage,
+                issue,
+                accounts,
+            )
+    except Exception as e:
+        logger.exception(e)
+        return [], [], e
+
+    return imported, updated, None
+
+
+def _import_issue_in_thread(issue_soup, journal, owner, stage, accounts):
+    try:
+        return _import_issue_and_articles(
+            issue_soup, journal, owner, stage, accounts,
+        )
+    finally:
+        # Each thread gets its own database connection, close it so we
+        # don't leave them hanging around once the import finishes.
+        connection.close()
 
 
 def import_issue(issue_soup, journal):
@@ -172,97 +296,122 @@ def get_article(identifiers, journal):
         article = submission_models.Article.get_article(
             journal,
             'ojs_id',
-            id,
+            ojs_id,
         )
     return article
 
 
-def import_articles(article_soup, journal, owner, stage, issue):
+def import_articles(article_soup, journal, owner, stage, issue, accounts):
     articles_imported = list()
     articles_updated = list()
     for article in article_soup:
-        publication_soup = article.find('publication')
+        with instrumentation.item(article.attrs.get('id')):
+            article_obj, created = import_article(
+                article, journal, owner, stage, issue, accounts,
+            )
+        if created:
+            articles_imported.append(article_obj)
+        else:
+            articles_updated.append(article_obj)
 
-        article_dict = {
-            'title': get_title(article),
-            'abstract': common.get_text_or_none(article, 'abstract'),
-            'license': get_license(
-                common.get_text_or_none(publication_soup, 'licenseurl'),
-                journal,
-            ),
-            'date_submitted': utils.get_aware_datetime(
-                article.attrs.get('date_submitted')
-            ),
-            'rights': common.get_text_or_none(article, 'copyrightholder'),
-            'page_numbers': common.get_text_or_none(article, 'pages'),
-            'date_published': utils.get_aware_datetime(
-                publication_soup.attrs.get('date_published'),
-            ),
-            'section': get_section(publication_soup, journal),
-        }
+    return articles_imported, articles_updated
 
-        identifiers = get_identifiers(publication_soup)
-        keywords = get_keywords(publication_soup)
-        author_data = get_authors(publication_soup)
 
-        article_obj = get_article(
-            identifiers,
+def import_article(article, journal, owner, stage, issue, accounts):
+    publication_soup = article.find('publication')
+
+    article_dict = {
+        'title': get_title(article),
+        'abstract': common.get_text_or_none(article, 'abstract'),
+        'license': get_license(
+            common.get_text_or_none(publication_soup, 'licenseurl'),
             journal,
-        )
+        ),
+        'date_submitted': utils.get_aware_datetime(
+            article.attrs.get('date_submitted')
+        ),
+        'rights': common.get_text_or_none(article, 'copyrightholder'),
+        'page_numbers': common.get_text_or_none(article, 'pages'),
+        'date_published': utils.get_aware_datetime(
+            publication_soup.attrs.get('date_published'),
+        ),
+        'section': get_section(publication_soup, journal),
+    }
+
+    identifiers = get_identifiers(publication_soup)
+    keywords = get_keywords(publication_soup)
+    author_data = get_authors(publication_soup)
+
+    article_obj = get_article(
+        identifiers,
+        journal,
+    )
 
-        if article_obj:
-            submission_models.Article.objects.filter(
-                pk=article_obj.pk,
-            ).update(
-                **article_dict,
-            )
-            articles_updated.append(
-                article_obj,
-            )
-        else:
-            article_obj = submission_models.Article.objects.create(
-                journal=journal,
-                owner=owner,
-                title=article_dict.get('title'),
-                abstract=article_dict.get('abstract'),
-                section=article_dict.get('section'),
-                rights=article_dict.get('rights'),
-                license=article_dict.get('license'),
-                page_numbers=article_dict.get('page_numbers'),
-                date_submitted=article_dict.get('date_submitted'),
-                date_published=article_dict.get('date_published'),
-                stage=stage,
-                is_import=True,
-            )
+    if article_obj:
+        submission_models.Article.objects.filter(
+            pk=article_obj.pk,
+        ).update(
+            **article_dict,
+        )
+        created = False
+    else:
+        article_obj = submission_models.Article.objects.create(
+            journal=journal,
+            owner=owner,
+            title=article_dict.get('title'),
+            abstract=article_dict.get('abstract'),
+            section=article_dict.get('section'),
+            rights=article_dict.get('rights'),
+            license=article_dict.get('license'),
+            page_numbers=article_dict.get('page_numbers'),
+            date_submitted=article_dict.get('date_submitted'),
+            date_published=article_dict.get('date_published'),
+            stage=stage,
+            is_import=True,
+        )
+        created = True
 
-            articles_imported.append(
-                article_obj,
-            )
-        set_article_issue(article_obj, issue)
-        set_article_keywords(article_obj, keywords)
-        set_article_identifiers(article_obj, identifiers)
+    set_article_issue(article_obj, issue)
+    set_article_keywords(article_obj, keywords)
+    set_article_identifiers(article_obj, identifiers)
+    with instrumentation.phase('files'):
         create_submission_files(article_obj, article)
         create_galleys(article_obj, publication_soup)
 
-        emails = set()
-        for author in sorted(author_data, key=lambda x: x.get('sequence', 1)):
-            author_record, _ = importers.get_or_create_account(
-                author,
-                update=True,
-            )
-            article_obj.authors.add(author_record)
-            order, _ = submission_models.ArticleAuthorOrder.objects.get_or_create(
-                article=article_obj,
-                author=author_record,
-            )
-            order.order = author.get("sequence", 999)
-            importers.create_frozen_record(
-                author_record,
-                article_obj,
-                emails,
+    with instrumentation.phase('authors'):
+        import_article_authors(article_obj, author_data, accounts)
+
+    return article_obj, created
+
+
+def import_article_authors(article_obj, author_data, accounts):
+    """ Links the authors of an article to their accounts
+    :param accounts: A dict of lowercased author email to Account, the
+        accounts are created by import_shared_records so that no account is
+        created within the transaction of an issue
+    """
+    emails = set()
+    for author in sorted(author_data, key=lambda x: x.get('sequence', 1)):
+        author_record = None
+        if author.get('email'):
+            author_record = accounts.get(get_email_key(author['email']))
+        if author_record is None:
+            logger.warning(
+                "No account for author %s of article %s",
+                author.get('email'), article_obj.pk,
             )
-
-    return articles_imported, articles_updated
+            continue
+        article_obj.authors.add(author_record)
+        order, _ = submission_models.ArticleAuthorOrder.objects.get_or_create(
+            article=article_obj,
+            author=author_record,
+        )
+        order.order = author.get("sequence", 999)
+        importers.create_frozen_record(
+            author_record,
+            article_obj,
+            emails,
+        )
 
 
 def get_section(publication_soup, journal):
@@ -275,11 +424,12 @@ def get_section(publication_soup, journal):
         return ojs3_section_link.section
     except models.OJS3Section.DoesNotExist:
         # grab the default article section
-        return submission_models.Section.objects.get_or_create(
+        section, _ = submission_models.Section.objects.get_or_create(
             name='Article',
             plural='Articles',
             journal=journal,
         )
+        return section
 
 
 def get_license(license_url, journal):
@@ -345,17 +495,10 @@ def set_article_issue(article, issue):
 
 def set_article_keywords(article, keywords):
     if keywords:
-        for i, keyword in enumerate(keywords):
-            if keyword:
-                keyword = strip_tags(keyword)
-                word, _ = submission_models.Keyword.objects.get_or_create(
-                    word=keyword,
-                )
-                submission_models.KeywordArticle.objects.update_or_create(
-                    keyword=word,
-                    article=article,
-                    defaults={"order": i},
-                )
+        imports_keywords.set_article_keywords(
+            article,
+            (strip_tags(keyword) for keyword in keywords if keyword),
+        )
 
 
 def set_article_identifiers(article, identifiers):
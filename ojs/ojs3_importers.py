@@ -1,11 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import timedelta
+from itertools import islice
+import threading
 
 from bs4 import BeautifulSoup
-from dateutil import parser as dateparser
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
 from django.core.management import call_command
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.functions import Lower
 from django.template.defaultfilters import linebreaksbr
 from django.utils import timezone
 from django.utils.html import strip_tags
@@ -24,7 +28,14 @@ from utils.logger import get_logger
 from utils import setting_handler
 
 from plugins.typesetting import plugin_settings as typesetting_settings
-from plugins.imports import models
+from plugins.imports import (
+    dates,
+    frozen_authors,
+    instrumentation,
+    keywords as imports_keywords,
+    models,
+)
+from plugins.imports.ojs import clients
 
 # Submission stages
 STATUS_QUEUED = 1
@@ -68,6 +79,15 @@ WORKFLOW_STAGE_MAP = {
 WORKFLOW_STAGE_MAP[WORKFLOW_STAGE_ID_EXTERNAL_REVIEW] = WORKFLOW_STAGE_MAP[
         WORKFLOW_STAGE_ID_INTERNAL_REVIEW]
 
+# Number of workflow logs buffered by a journal_cache before writing them
+WORKFLOW_LOG_BATCH_SIZE = 500
+
+# Number of requests made at the same time when prefetching an issue
+ISSUE_FETCH_WORKERS = 4
+
+# Number of users written to the database at a time by import_users
+USER_BATCH_SIZE = 500
+
 #R ole IDs
 ROLE_JOURNAL_MANAGER = 16
 ROLE_SECTION_EDITOR = 17
@@ -145,23 +165,36 @@ GALLEY_TYPES = {
 
 
 def import_article(client, journal, article_dict, editorial=False, galleys=True):
-    pub_article_dict = get_pub_article_dict(article_dict, client)
+    with instrumentation.phase('publication'):
+        pub_article_dict = get_pub_article_dict(article_dict, client)
     article_dict["publication"] = pub_article_dict
-    article = import_article_metadata(article_dict, journal, client)
+    with instrumentation.phase('metadata'):
+        article = import_article_metadata(article_dict, journal, client)
     if not article:
         return
-    import_author_assignments(article, article_dict)
+    with instrumentation.phase('authors'):
+        import_author_assignments(article, article_dict)
     if galleys:
-        import_article_galleys(pub_article_dict, journal, client, article)
+        with instrumentation.phase('galleys'):
+            import_article_galleys(pub_article_dict, journal, client, article)
     if editorial:
-        import_manuscripts(client, article, article_dict)
-        import_editor_assignments(article, article_dict)
+        # Every editorial step lists the submission's files, serve them all
+        # from a single listing
+        client = clients.SubmissionFileInventory(client, article_dict["id"])
+        with instrumentation.phase('manuscripts'):
+            import_manuscripts(client, article, article_dict)
+        with instrumentation.phase('editors'):
+            import_editor_assignments(article, article_dict)
         if article_dict["reviewAssignments"] or article_dict["reviewRounds"]:
-            import_reviews(client, article, article_dict)
-        import_copyedits(client, article, article_dict)
-        import_production(client, article, article_dict)
+            with instrumentation.phase('reviews'):
+                import_reviews(client, article, article_dict)
+        with instrumentation.phase('copyediting'):
+            import_copyedits(client, article, article_dict)
+        with instrumentation.phase('production'):
+            import_production(client, article, article_dict)
         add_to_projected_issue(article, article_dict)
-    set_stage(article, article_dict)
+    with instrumentation.phase('stage'):
+        set_stage(article, article_dict)
 
     return article
 
@@ -238,18 +271,123 @@ def import_editor_assignments(article, article_dict):
             }
         )
 
-def import_issue(client, journal, issue_dict):
+def fetch_issue_cover(client, issue_dict):
+    """ Fetches the cover image of an issue, if it has one
+    :return: django.core.files.base.ContentFile or None
+    """
+    if not issue_dict["coverImageUrl"].values():
+        return None
+    url = delocalise(issue_dict["coverImageUrl"])
+    if not url:
+        return None
+    django_file = client.fetch_file(url)
+    if not django_file:
+        url = delocalise(issue_dict["coverImageUrl"], lang_code="nl")
+        django_file = client.fetch_file(url)
+    return django_file
+
+
+def fetch_issue_galley(client, issue_dict):
+    """ Fetches the last galley of an issue, if it has any
+    :return: A tuple of the OJS galley ID and a ContentFile, or Nones
+    """
+    if not issue_dict["galleys"]:
+        return None, None
+    galley_id = issue_dict["galleys"][-1].get("id")
+    return galley_id, client.get_issue_galley(issue_dict["id"], galley_id)
+
+
+def prefetch_issue(client, issue_dict, workers=ISSUE_FETCH_WORKERS):
+    """ Fetches the remote data of an issue concurrently
+
+    The publication of each article listed in the issue is stored on its
+    article dict, under "publication", as the importers expect it.
+    :param client: An OJS3APIClient
+    :param issue_dict: An issue object from OJS
+    :param workers: Number of requests made at the same time
+    :return: A tuple of the cover ContentFile and of the galley ID and
+        galley ContentFile
+    """
+    get_publication = instrumentation.bind_current_run(
+        lambda article_dict: get_pub_article_dict(article_dict, client),
+    )
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        cover = executor.submit(
+            instrumentation.bind_current_run(fetch_issue_cover),
+            client, issue_dict,
+        )
+        galley = executor.submit(
+            instrumentation.bind_current_run(fetch_issue_galley),
+            client, issue_dict,
+        )
+        publications = executor.map(get_publication, issue_dict["articles"])
+        for article_dict, publication in zip(
+            issue_dict["articles"], publications,
+        ):
+            article_dict["publication"] = publication
+        return cover.result(), galley.result()
+
+
+def set_article_orderings(issue, ordered_articles):
+    """ Writes the order of the articles in an issue in bulk
+    :param issue: An instance of journal.models.Issue
+    :param ordered_articles: A list of (order, Article) tuples
+    """
+    existing = {
+        (ordering.article_id, ordering.section_id): ordering
+        for ordering in journal_models.ArticleOrdering.objects.filter(
+            issue=issue,
+        )
+    }
+    to_create = []
+    to_update = []
+    for order, article in ordered_articles:
+        ordering = existing.get((article.pk, article.section_id))
+        if ordering is None:
+            to_create.append(
+                journal_models.ArticleOrdering(
+                    issue=issue,
+                    article=article,
+                    section=article.section,
+                    order=order,
+                )
+            )
+        elif ordering.order != order:
+            ordering.order = order
+            to_update.append(ordering)
+
+    if to_update:
+        journal_models.ArticleOrdering.objects.bulk_update(
+            to_update, ["order"],
+        )
+    if to_create:
+        journal_models.ArticleOrdering.objects.bulk_create(to_create)
+
+
+def import_issue(client, journal, issue_dict, workers=ISSUE_FETCH_WORKERS):
+    """ Imports an issue, its sections, cover, galley and article orderings
+    :param client: An OJS3APIClient
+    :param journal: The Journal the issue belongs to
+    :param issue_dict: An issue object from OJS
+    :param workers: Number of requests made at the same time while fetching
+        the publications, cover and galley of the issue
+    :return: The imported Issue
+    """
     issue, c = get_or_create_issue(issue_dict, journal)
     if c:
         logger.info("Created Issue %s from OJS ID %s", issue, issue_dict["id"])
     else:
         logger.info("Updating Issue %s from OJS ID %s", issue, issue_dict["id"])
 
+    cover_file, (galley_id, galley_file) = prefetch_issue(
+        client, issue_dict, workers,
+    )
+
     for section_dict in issue_dict["sections"]:
         section = import_section(section_dict, issue, client)
 
+    ordered_articles = []
     for order, article_dict in enumerate(issue_dict["articles"]):
-        article_dict["publication"] = get_pub_article_dict(article_dict, client)
         article, c = get_or_create_article(article_dict, journal)
         if c:
             logger.warning("Issue has new article, will re-import: %s", article)
@@ -259,57 +397,43 @@ def import_issue(client, journal, issue_dict):
             article.primary_issue = issue
             if not article.date_published:
                 article.date_published = issue.date
-            article.save()
             if not article.section:
                 logger.warning("No section for article %s" % article)
                 article.section, _ = sm_models.Section.objects.get_or_create(
                     name="Article",
                     journal=article.journal
                 )
-                article.save()
-            issue.articles.add(article)
-            journal_models.ArticleOrdering.objects.update_or_create(
-                section=article.section,
+            article.save()
+            ordered_articles.append((order, article))
+
+    if ordered_articles:
+        issue.articles.add(*(article for _, article in ordered_articles))
+        set_article_orderings(issue, ordered_articles)
+
+    if cover_file:
+        issue.cover_image.save(cover_file.name or "cover.graphic", cover_file)
+        issue.large_image.save(cover_file.name or "cover.graphic", cover_file)
+
+    if galley_file:
+        logger.info("Importing Issue galley %s into %s", galley_id, issue)
+        try:
+            issue_galley = journal_models.IssueGalley.objects.get(
                 issue=issue,
-                article=article,
-                defaults={"order": order}
             )
-    if issue_dict["coverImageUrl"].values():
-        url = delocalise(issue_dict["coverImageUrl"])
-        if url:
-            django_file = client.fetch_file(url)
-            if not django_file:
-                url = delocalise(issue_dict["coverImageUrl"], lang_code="nl")
-                django_file = client.fetch_file(url)
-            if django_file:
-                issue.cover_image.save(
-                    django_file.name or "cover.graphic", django_file)
-                issue.large_image.save(
-                    django_file.name or "cover.graphic", django_file)
-
-    if issue_dict["galleys"]:
-        galley_id = issue_dict["galleys"][-1].get("id")
-        django_file = client.get_issue_galley(issue_dict["id"], galley_id)
-        if django_file:
-            logger.info("Importing Issue galley %s into %s", galley_id, issue)
-            try:
-                issue_galley = journal_models.IssueGalley.objects.get(
-                    issue=issue,
-                )
-                issue_galley.replace_file(django_file)
-            except journal_models.IssueGalley.DoesNotExist:
-                issue_galley = journal_models.IssueGalley(
-                    issue=issue,
-                )
-                file_obj = core_files.save_file(
-                    DummyRequest(journal=journal),
-                    django_file,
-                    label=issue.issue_title,
-                    public=True,
-                    path_parts=(journal_models.IssueGalley.FILES_PATH, issue.pk),
-                )
-                issue_galley.file = file_obj
-                issue_galley.save()
+            issue_galley.replace_file(galley_file)
+        except journal_models.IssueGalley.DoesNotExist:
+            issue_galley = journal_models.IssueGalley(
+                issue=issue,
+            )
+            file_obj = core_files.save_file(
+                DummyRequest(journal=journal),
+                galley_file,
+                label=issue.issue_title,
+                public=True,
+                path_parts=(journal_models.IssueGalley.FILES_PATH, issue.pk),
+            )
+            issue_galley.file = file_obj
+            issue_galley.save()
 
     issue.save()
     if issue_dict.get("isCurrent"):
@@ -362,10 +486,8 @@ def import_article_metadata(article_dict, journal, client):
 
     article.page_numbers = article_dict["publication"]["pages"]
     if article_dict["publication"].get("datePublished"):
-        date_published = timezone.make_aware(
-            dateparser.parse(
-                article_dict["publication"]['datePublished']).replace(hour=12
-            )
+        date_published = dates.get_aware_datetime_at_noon(
+            article_dict["publication"]['datePublished'],
         )
         article.date_published = date_published
         article.stage = sm_models.STAGE_PUBLISHED
@@ -395,20 +517,13 @@ def import_article_metadata(article_dict, journal, client):
     keywords = delocalise(article_dict["publication"]["keywords"])
     if keywords:
         logger.debug("Importing Keywords %s", keywords)
-        for i, keyword in enumerate(keywords):
-            if keyword:
-                keyword = strip_tags(keyword)
-                word, _ = sm_models.Keyword.objects.get_or_create(
-                    word=keyword)
-                sm_models.KeywordArticle.objects.update_or_create(
-                    keyword=word,
-                    article=article,
-                    defaults={"order": i},
-                )
+        imports_keywords.set_article_keywords(
+            article,
+            (strip_tags(keyword) for keyword in keywords if keyword),
+        )
 
     # Add authors
-    for author in article_dict["publication"]["authors"]:
-        create_frozen_record(author, article)
+    import_frozen_authors(article, article_dict["publication"]["authors"])
 
     return article
 
@@ -471,9 +586,7 @@ def import_article_galleys(publication, journal, client, article=None):
 def import_reviews(client, article, article_dict):
     create_workflow_log(article, sm_models.STAGE_UNASSIGNED)
     logger.info("Importing peer reviews")
-    default_form = review_models.ReviewForm.objects.filter(
-        journal=article.journal,
-    ).first()
+    default_form = get_default_review_form(article.journal)
     for round_dict in article_dict["reviewRounds"]:
         round, c = review_models.ReviewRound.objects.get_or_create(
             article=article,
@@ -580,8 +693,8 @@ def import_production(client, article, article_dict):
             prod_ready_files.append(prod_ready_file)
 
     if prod_ready_files:
-        typesetting_plugin = article.journal.element_in_workflow(
-            "Typesetting Plugin")
+        typesetting_plugin = element_in_workflow(
+            article.journal, "Typesetting Plugin")
         if typesetting_plugin:
             stage = typesetting_settings.STAGE
             create_workflow_log( article, typesetting_settings.STAGE)
@@ -715,6 +828,232 @@ def import_user_roles(user_dict, account, journal):
             account.add_account_role(ROLES_MAP[group["roleId"]], journal)
 
 
+def import_users(user_dicts, journal, batch_size=USER_BATCH_SIZE):
+    """ Imports OJS users in bulk, with the same result as calling
+    import_user for each of them
+    :param user_dicts: An iterable of user objects from OJS
+    :param journal: The Journal the users are imported into
+    :param batch_size: Number of users written to the database at a time
+    :return: A tuple of the number of accounts created and updated
+    """
+    created = updated = 0
+    user_dicts = iter(user_dicts)
+    batch = list(islice(user_dicts, batch_size))
+    while batch:
+        batch_created, batch_updated = _import_user_batch(batch, journal)
+        created += batch_created
+        updated += batch_updated
+        batch = list(islice(user_dicts, batch_size))
+    return created, updated
+
+
+def _import_user_batch(user_dicts, journal):
+    # Users sharing an email address are imported as the first of them
+    users_by_email = {}
+    for user_dict in user_dicts:
+        if len(user_dict["email"]) >= 48:
+            continue
+        users_by_email.setdefault(user_dict["email"].lower(), []).append(
+            user_dict,
+        )
+    if not users_by_email:
+        return 0, 0
+
+    accounts = {
+        account.lower_email: account
+        for account in core_models.Account.objects.annotate(
+            lower_email=Lower("email"),
+        ).filter(lower_email__in=users_by_email)
+    }
+    new_emails = [email for email in users_by_email if email not in accounts]
+    core_models.Account.objects.bulk_create(
+        [
+            core_models.Account(
+                email=users_by_email[email][0]["email"],
+                username=email,
+                first_name=delocalise(users_by_email[email][0]["givenName"]),
+                last_name=delocalise(users_by_email[email][0]["familyName"]),
+                # Accounts that already exist in Janeway are left active
+                is_active=users_by_email[email][0]["disabled"] is not True,
+            )
+            for email in new_emails
+        ],
+        batch_size=USER_BATCH_SIZE,
+    )
+    # Not every database backend sets the PK of bulk created objects
+    if new_emails:
+        accounts.update({
+            account.lower_email: account
+            for account in core_models.Account.objects.annotate(
+                lower_email=Lower("email"),
+            ).filter(lower_email__in=new_emails)
+        })
+    for email in new_emails:
+        logger.info("Imported new OJS3 user: %s", accounts.get(email))
+
+    countries = {
+        user_dict["country"]
+        for user_dict in user_dicts if user_dict["country"]
+    }
+    countries_by_name = {}
+    for country in core_models.Country.objects.filter(name__in=countries):
+        countries_by_name.setdefault(country.name, country)
+
+    changed = []
+    update_fields = set()
+    interests_by_account = {}
+    roles = set()
+    ojs_accounts = set()
+    for email, email_user_dicts in users_by_email.items():
+        account = accounts.get(email)
+        if not account:
+            continue
+        user_dict = email_user_dicts[0]
+        fields = _get_account_updates(account, user_dict, countries_by_name)
+        if fields:
+            changed.append(account)
+            update_fields.update(fields)
+        interests_by_account[account] = {
+            interest["interest"]
+            for user_dict in email_user_dicts
+            for interest in user_dict["interests"]
+        }
+        for user_dict in email_user_dicts:
+            roles.add((account.pk, "author"))
+            for group in user_dict["groups"]:
+                if group["roleId"] in ROLES_MAP:
+                    roles.add((account.pk, ROLES_MAP[group["roleId"]]))
+            ojs_accounts.add((account.pk, user_dict["id"]))
+
+    if changed:
+        core_models.Account.objects.bulk_update(
+            changed, sorted(update_fields), batch_size=USER_BATCH_SIZE,
+        )
+    add_interests(interests_by_account)
+    add_account_roles(roles, journal)
+    link_ojs_accounts(ojs_accounts, journal)
+
+    return len(new_emails), len(users_by_email) - len(new_emails)
+
+
+def _get_account_updates(account, user_dict, countries_by_name):
+    """ Applies the details of an OJS user to its account
+    :return: A list of the account fields that changed
+    """
+    fields = []
+    if user_dict["biography"] and not account.biography:
+        account.biography = delocalise(user_dict["biography"])
+        fields.append("biography")
+    if user_dict["signature"] and not account.signature:
+        account.signature = delocalise(user_dict["signature"])
+        fields.append("signature")
+    if user_dict["orcid"] and not account.orcid:
+        account.orcid = user_dict["orcid"].split("orcid.org/")[-1] or None
+        fields.append("orcid")
+    if user_dict["country"]:
+        country = countries_by_name.get(user_dict["country"])
+        if account.country_id != (country.pk if country else None):
+            account.country = country
+            fields.append("country")
+    return fields
+
+
+def add_interests(interests_by_account):
+    """ Adds interests to many accounts, creating the missing interests
+    :param interests_by_account: A dict of Account to a set of interest names
+    """
+    names = {
+        name for interests in interests_by_account.values()
+        for name in interests
+    }
+    if not names:
+        return
+    interests = {}
+    for interest in core_models.Interest.objects.filter(name__in=names):
+        interests.setdefault(interest.name, interest)
+    core_models.Interest.objects.bulk_create(
+        [core_models.Interest(name=name) for name in names - set(interests)],
+    )
+    for interest in core_models.Interest.objects.filter(
+        name__in=names - set(interests),
+    ):
+        interests.setdefault(interest.name, interest)
+
+    through = core_models.Account.interest.through
+    account_field = core_models.Account.interest.field.m2m_field_name()
+    interest_field = core_models.Account.interest.field.m2m_reverse_field_name()
+    existing = set(
+        through.objects.filter(
+            **{account_field + "__in": interests_by_account},
+        ).values_list(account_field, interest_field)
+    )
+    through.objects.bulk_create([
+        through(**{
+            account_field + "_id": account.pk,
+            interest_field + "_id": interests[name].pk,
+        })
+        for account, names in interests_by_account.items()
+        for name in names
+        if (account.pk, interests[name].pk) not in existing
+    ])
+
+
+def add_account_roles(roles, journal):
+    """ Gives many accounts roles on a journal, ignoring those they have
+    :param roles: An iterable of (Account ID, role slug) tuples
+    :param journal: The Journal the roles are given on
+    """
+    roles = set(roles)
+    if not roles:
+        return
+    roles_by_slug = {
+        role.slug: role
+        for role in core_models.Role.objects.filter(
+            slug__in={slug for _, slug in roles},
+        )
+    }
+    for slug in {slug for _, slug in roles} - set(roles_by_slug):
+        logger.warning("Role %s doesn't exist, not assigning it", slug)
+    existing = set(
+        core_models.AccountRole.objects.filter(
+            journal=journal,
+            user_id__in={account_id for account_id, _ in roles},
+        ).values_list("user_id", "role__slug")
+    )
+    core_models.AccountRole.objects.bulk_create([
+        core_models.AccountRole(
+            user_id=account_id,
+            role=roles_by_slug[slug],
+            journal=journal,
+        )
+        for account_id, slug in roles
+        if slug in roles_by_slug and (account_id, slug) not in existing
+    ])
+
+
+def link_ojs_accounts(ojs_accounts, journal):
+    """ Records the OJS IDs of many accounts
+    :param ojs_accounts: An iterable of (Account ID, OJS user ID) tuples
+    :param journal: The Journal the OJS users belong to
+    """
+    ojs_accounts = set(ojs_accounts)
+    if not ojs_accounts:
+        return
+    existing = set(
+        models.OJSAccount.objects.filter(
+            journal=journal,
+            account_id__in={account_id for account_id, _ in ojs_accounts},
+        ).values_list("account_id", "ojs_id")
+    )
+    new_links = [
+        models.OJSAccount(journal=journal, account_id=account_id, ojs_id=ojs_id)
+        for account_id, ojs_id in ojs_accounts
+        if (account_id, int(ojs_id)) not in existing
+    ]
+    models.OJSAccount.objects.bulk_create(new_links)
+    logger.debug("Linked %s users with their OJS IDs", len(new_links))
+
+
 def import_file(file_json, client, article, label=None, file_name=None, owner=None):
     if not label:
         label = file_json.get("label", "file")
@@ -792,7 +1131,7 @@ def get_or_create_article(article_dict, journal):
     if not article_dict['dateSubmitted']:
         return None, created
     date_started = timezone.make_aware(
-        dateparser.parse(article_dict['dateSubmitted'])
+        dates.parse(article_dict['dateSubmitted'])
     )
 
     doi = (
@@ -884,46 +1223,53 @@ def update_or_create_section(journal, ojs_section_id, section_dict=None):
     return imported, created
 
 
-def create_frozen_record(author, article):
-    """ Creates a frozen record for the article from author metadata
+def get_frozen_author_values(author, accounts):
+    """ Builds the frozen record of an author from its metadata
 
     We create frozen records directly from the author data in OJS, since the
     same email address can be shared across multiple authors in OJS3. We then
     link the account to the frozen record if one exists for the given email
     :param author: an author object from OJS
-    :param article: an instance of submission.models.Article
+    :param accounts: A dict of lowercased email to Account
+    :return: A dict of FrozenAuthor field values
     """
-    account = None
-    frozen_dict = {
-        'article': article,
+    account = frozen_authors.get_account(accounts, author["email"])
+    # Frozen authors are matched to existing rows by position, so the frozen
+    # email and ORCID are always set, to clear those of any previous author
+    values = {
+        'author': account,
         'first_name': delocalise(author["givenName"]),
         'last_name': delocalise(author["familyName"]),
         'institution': delocalise(author["affiliation"]) or '',
         'order': author["seq"],
+        'frozen_email': None,
+        'frozen_orcid': None,
     }
-    frozen, created = sm_models.FrozenAuthor.objects.get_or_create(
-        **frozen_dict)
-    if created:
-        logger.debug("Added Frozen Author %s", frozen_dict)
-    else:
-        logger.debug("Updated Frozen Author %s", frozen_dict)
-
-    if author["email"]:
-        try:
-            account = core_models.Account.objects.get(
-                email__iexact=author["email"])
-            frozen.account = account
-            frozen.save()
-        except core_models.Account.DoesNotExist:
-            logger.info("No account matching %s" % author["email"])
-            frozen.frozen_email = author["email"]
+    if author["email"] and not account:
+        logger.info("No account matching %s" % author["email"])
+        values['frozen_email'] = author["email"]
 
     if author["orcid"]:
         if not account or not account.orcid:
-            frozen.frozen_orcid = author["orcid"].rsplit("/")[-1]
+            values['frozen_orcid'] = author["orcid"].rsplit("/")[-1]
 
-    frozen.save()
-    return frozen, created
+    return values
+
+
+def import_frozen_authors(article, authors):
+    """ Reconciles the frozen authors of the article with those in OJS
+    :param article: an instance of submission.models.Article
+    :param authors: A list of author objects from OJS
+    """
+    accounts = frozen_authors.resolve_accounts(
+        author["email"] for author in authors
+    )
+    frozen_authors.reconcile({
+        article: [
+            get_frozen_author_values(author, accounts)
+            for author in sorted(authors, key=lambda author: author["seq"])
+        ],
+    })
 
 
 def import_journal_metadata(client, journal_dict, update_journal_data=False):
@@ -1125,15 +1471,18 @@ def get_localised(localised, prefix=None):
 
 def attempt_to_make_timezone_aware(datetime):
     if datetime:
-        dt = dateparser.parse(datetime)
         # We use 12 to avoid changing the date when the time is 00:00 with no tz
-        return timezone.make_aware(dt.replace(hour=12))
+        return dates.get_aware_datetime_at_noon(datetime)
     else:
         return None
 
 
 def handle_review_comment(article, review_obj, form, comment, public=True):
-    element = form.elements.filter(kind="textarea").first()
+    cache = get_journal_cache(article.journal_id)
+    if form and cache:
+        element = cache.get_textarea_element(form)
+    else:
+        element = form.elements.filter(kind="textarea").first()
     if element:
         soup = BeautifulSoup(comment, "html.parser")
         for tag in soup.find_all(["br", "p"]):
@@ -1165,7 +1514,140 @@ def handle_review_comment(article, review_obj, form, comment, public=True):
     return review_obj
 
 
+class JournalCache():
+    """ Lookups that don't change for the length of an import of a journal
+
+    Workflow elements, the default review form and the textarea element of
+    review forms are fetched once per journal, and workflow logs are kept in
+    a buffer that is written in bulk once it holds batch_size logs.
+    """
+    def __init__(self, journal, batch_size=WORKFLOW_LOG_BATCH_SIZE):
+        self.journal = journal
+        self.batch_size = batch_size
+        self.workflow_logs = []
+        self._workflow_elements = None
+        self._elements_in_workflow = {}
+        self._default_review_form = None
+        self._default_review_form_loaded = False
+        self._textarea_elements = {}
+
+    def get_workflow_element(self, stage):
+        if self._workflow_elements is None:
+            self._workflow_elements = {
+                element.stage: element
+                for element in core_models.WorkflowElement.objects.filter(
+                    journal=self.journal,
+                )
+            }
+        try:
+            return self._workflow_elements[stage]
+        except KeyError:
+            raise core_models.WorkflowElement.DoesNotExist(
+                "No workflow element for stage %s" % stage
+            )
+
+    def element_in_workflow(self, element_name):
+        if element_name not in self._elements_in_workflow:
+            self._elements_in_workflow[element_name] = (
+                self.journal.element_in_workflow(element_name)
+            )
+        return self._elements_in_workflow[element_name]
+
+    def get_default_review_form(self):
+        if not self._default_review_form_loaded:
+            self._default_review_form = review_models.ReviewForm.objects.filter(
+                journal=self.journal,
+            ).first()
+            self._default_review_form_loaded = True
+        return self._default_review_form
+
+    def get_textarea_element(self, form):
+        if form.pk not in self._textarea_elements:
+            self._textarea_elements[form.pk] = form.elements.filter(
+                kind="textarea",
+            ).first()
+        return self._textarea_elements[form.pk]
+
+    def add_workflow_log(self, article, stage):
+        element = self.get_workflow_element(stage)
+        self.workflow_logs.append((article, element))
+        if len(self.workflow_logs) >= self.batch_size:
+            self.flush_workflow_logs()
+
+    def flush_workflow_logs(self):
+        """ Creates the buffered workflow logs that don't exist yet"""
+        logs = {
+            (article.pk, element.pk): (article, element)
+            for article, element in self.workflow_logs
+        }
+        self.workflow_logs = []
+        if not logs:
+            return
+        existing = set(
+            core_models.WorkflowLog.objects.filter(
+                article_id__in={article_id for article_id, _ in logs},
+                element__journal=self.journal,
+            ).values_list("article_id", "element_id")
+        )
+        core_models.WorkflowLog.objects.bulk_create([
+            core_models.WorkflowLog(article=article, element=element)
+            for key, (article, element) in logs.items()
+            if key not in existing
+        ])
+
+
+_journal_caches = threading.local()
+
+
+@contextmanager
+def journal_cache(journal, batch_size=WORKFLOW_LOG_BATCH_SIZE):
+    """ Caches the journal lookups of the articles imported in the block
+    and writes their workflow logs in bulk, at the latest when it exits
+    :param journal: The Journal articles are imported into
+    :param batch_size: Number of workflow logs buffered before writing them
+    """
+    previous = getattr(_journal_caches, "current", None)
+    cache = JournalCache(journal, batch_size)
+    _journal_caches.current = cache
+    try:
+        yield cache
+    finally:
+        _journal_caches.current = previous
+        cache.flush_workflow_logs()
+
+
+def get_journal_cache(journal_id):
+    """ Returns the cache of the current block if it is for this journal"""
+    cache = getattr(_journal_caches, "current", None)
+    if cache and cache.journal.pk == journal_id:
+        return cache
+    return None
+
+
+def get_default_review_form(journal):
+    cache = get_journal_cache(journal.pk)
+    if cache:
+        return cache.get_default_review_form()
+    return review_models.ReviewForm.objects.filter(journal=journal).first()
+
+
+def element_in_workflow(journal, element_name):
+    cache = get_journal_cache(journal.pk)
+    if cache:
+        return cache.element_in_workflow(element_name)
+    return journal.element_in_workflow(element_name)
+
+
 def create_workflow_log(article, stage):
+    """ Logs that the article went through the workflow stage, unless it is
+    logged already. Within a journal_cache block the log is buffered and
+    written in bulk.
+    """
+    cache = get_journal_cache(article.journal_id)
+    if cache:
+        cache.add_workflow_log(article, stage)
+        return
+
     element = core_models.WorkflowElement.objects.get(
         journal=article.journal,
         stage=stage,
@@ -0,0 +1,160 @@
+"""
+Scrapes the HTML pages of OJS installs without the Janeway plugin.
+
+Pages are fetched concurrently and yielded as each one arrives, with only a
+few in flight at a time, so they can be parsed and imported while the rest
+download. When a PageCache is used the raw pages are stored on disk keyed by
+their URL, so that they can be parsed again offline without downloading them
+a second time. Parsing uses lxml with XPath expressions compiled once for the
+module.
+"""
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import hashlib
+import os
+import re
+import tempfile
+from urllib import parse as urlparse
+
+from lxml import etree
+import requests
+
+from utils.logger import get_logger
+
+from plugins.imports import instrumentation
+
+logger = get_logger(__name__)
+
+# Number of pages fetched at the same time
+SCRAPE_WORKERS = 8
+
+# Parse emails from "display name <some@email.com>"
+DISPLAY_NAME_EMAIL_RE = re.compile("<([^>]+)>")
+
+REGEXP_NAMESPACES = {"re": "http://exslt.org/regular-expressions"}
+EDITOR_ROWS = etree.XPath(
+    '//form[re:test(@action, "setEditorFlags$")]//tr[@valign="top"]',
+    namespaces=REGEXP_NAMESPACES,
+)
+CELLS = etree.XPath("./td")
+LINKS = etree.XPath(".//a/@href")
+TEXT = etree.XPath("string()")
+
+ScrapedEditor = namedtuple("ScrapedEditor", ["role", "email", "date"])
+
+
+class PageCache():
+    """ Raw pages stored in a directory, keyed by their URL"""
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def get_path(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, "%s.html" % key)
+
+    def get(self, url):
+        """ Returns the cached content of a page, or None"""
+        try:
+            with open(self.get_path(url), "rb") as page_file:
+                return page_file.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, url, content):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write to a temporary file first, so that a run that stops part
+        # way never leaves a truncated page in the cache
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir)
+        with os.fdopen(fd, "wb") as page_file:
+            page_file.write(content)
+        os.replace(temp_path, self.get_path(url))
+
+
+def fetch_page(client, url, page_cache=None):
+    """ Fetches a page, storing it in the cache if one is given
+    :return: A tuple of the URL and the page content, which is None if the
+        page failed to download
+    """
+    try:
+        response = client.fetch(url)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        logger.warning("Unable to fetch %s: %s", url, e)
+        return url, None
+    if page_cache:
+        page_cache.set(url, response.content)
+    return url, response.content
+
+
+def iter_pages(client, urls, page_cache=None, workers=SCRAPE_WORKERS):
+    """ Yields many pages, from the cache when they are in it
+    Pages are yielded as soon as they are fetched rather than in order, and
+    no more than twice as many as there are workers are held at a time.
+    :param client: An OJS client
+    :param urls: An iterable of page URLs
+    :param page_cache: Optional PageCache
+    :param workers: Number of pages fetched at the same time
+    :return: A generator of (URL, page content) tuples, pages that fail to
+        download are logged and left out
+    """
+    fetch = instrumentation.bind_current_run(fetch_page)
+    pending = set()
+
+    def completed(return_when=FIRST_COMPLETED):
+        nonlocal pending
+        done, pending = wait(pending, return_when=return_when)
+        for future in done:
+            url, content = future.result()
+            if content is not None:
+                yield url, content
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for url in dict.fromkeys(urls):
+            content = page_cache.get(url) if page_cache else None
+            if content is not None:
+                yield url, content
+                continue
+            pending.add(executor.submit(fetch, client, url, page_cache))
+            if len(pending) >= workers * 2:
+                yield from completed()
+        while pending:
+            yield from completed()
+
+
+def parse_editor_assignments(content):
+    """ Parses the editors assigned on an OJS editor submission page
+
+    Expected html structure
+    <form action="{url}/setEditorFlags">
+        <table>
+        <tr valign="top">
+            <td>(Section )Editor</td>
+            <td><a href="{emailink}">{editor_name}</td>
+    [...]
+    :param content: The HTML of the page
+    :return: A list of ScrapedEditor with the role and assignment date as
+        displayed on the page
+    """
+    editors = []
+    tree = etree.HTML(content)
+    if tree is None:
+        return editors
+    for row in EDITOR_ROWS(tree):
+        cells = CELLS(row)
+        if len(cells) < 4:
+            continue
+        role_cell, mailto_cell, date_cell = cells[0], cells[1], cells[-2]
+        links = LINKS(mailto_cell)
+        if not links:
+            continue
+        query = urlparse.parse_qs(urlparse.urlsplit(links[0]).query)
+        display_names = query.get("to[]") or [""]
+        emails = DISPLAY_NAME_EMAIL_RE.findall(display_names[0])
+        if not emails:
+            continue
+        editors.append(ScrapedEditor(
+            role=str(TEXT(role_cell)),
+            email=emails[0],
+            date=str(TEXT(date_cell)),
+        ))
+    return editors
@@ -0,0 +1,129 @@
+"""
+Paginated previews of uploaded CSVs.
+
+The upload is read once to build a summary of its headers, row count, row
+types and first page of rows, which is cached for as long as the file is
+unchanged. The first page is served from the summary and later pages read
+only as far into the file as they need to, so the confirmation page of a
+large upload renders a page of rows rather than the whole file.
+"""
+import csv
+import os
+from collections import Counter
+from itertools import islice
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+
+from plugins.imports.templatetags import row_identifier
+
+PREVIEW_PAGE_SIZE = 50
+PREVIEW_CACHE_TIMEOUT = 60 * 60
+PREVIEW_CACHE_KEY = 'imports_preview_{name}_{mtime}_{size}_{dict_rows}'
+
+
+def open_reader(csv_file, dict_rows):
+    """
+    :return: A tuple of the headers and a reader over the remaining rows
+    """
+    if dict_rows:
+        reader = csv.DictReader(csv_file)
+        return reader.fieldnames or [], reader
+    reader = csv.reader(csv_file)
+    return next(reader, []), reader
+
+
+def summarise(path, dict_rows=False):
+    """
+    Reads a CSV once and summarises it
+    :param path: Path to the CSV
+    :param dict_rows: Read rows as dicts keyed by header, as the update
+        import does, and identify the type of each row
+    :return: A dict of the headers, row count, count of each row type and
+        the first page of rows
+    """
+    row_count = 0
+    row_types = Counter()
+    first_rows = list()
+    with open(path, 'r', encoding='utf-8-sig') as csv_file:
+        headers, reader = open_reader(csv_file, dict_rows)
+        for row in reader:
+            if row_count < PREVIEW_PAGE_SIZE:
+                first_rows.append(row)
+            if dict_rows:
+                row_types[row_identifier.identify(row)] += 1
+            row_count += 1
+
+    return {
+        'headers': headers,
+        'row_count': row_count,
+        'row_types': dict(row_types),
+        'first_rows': first_rows,
+    }
+
+
+def get_summary(path, dict_rows=False):
+    """ Returns the summary of a CSV, from the cache if it is unchanged"""
+    stat = os.stat(path)
+    cache_key = PREVIEW_CACHE_KEY.format(
+        name=os.path.basename(path),
+        mtime=stat.st_mtime_ns,
+        size=stat.st_size,
+        dict_rows=dict_rows,
+    )
+    summary = cache.get(cache_key)
+    if summary is None:
+        summary = summarise(path, dict_rows)
+        cache.set(cache_key, summary, PREVIEW_CACHE_TIMEOUT)
+    return summary
+
+
+class PreviewRows(object):
+    """
+    The rows of a summarised CSV as a sequence that Paginator can slice,
+    reading the file only when a page past the first one is requested
+    """
+    def __init__(self, path, summary, dict_rows=False):
+        self.path = path
+        self.summary = summary
+        self.dict_rows = dict_rows
+
+    def __len__(self):
+        return self.summary['row_count']
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+
+        start, stop, _ = index.indices(len(self))
+        first_rows = self.summary['first_rows']
+        if stop <= len(first_rows):
+            return first_rows[start:stop]
+
+        with open(self.path, 'r', encoding='utf-8-sig') as csv_file:
+            _, reader = open_reader(csv_file, self.dict_rows)
+            return list(islice(reader, start, stop))
+
+
+def get_preview(path, page_number=1, dict_rows=False):
+    """
+    Returns a page of a CSV preview
+    :param path: Path to the CSV
+    :param page_number: The page requested, out of range values return the
+        nearest page
+    :param dict_rows: Read rows as dicts keyed by header
+    :return: A tuple of the summary dict and a Page of rows
+    """
+    summary = get_summary(path, dict_rows)
+    paginator = Paginator(
+        PreviewRows(path, summary, dict_rows),
+        PREVIEW_PAGE_SIZE,
+    )
+    return summary, paginator.get_page(page_number)
+
+
+def get_query_string(request):
+    """ The query string of the request without its page, for page links"""
+    query = request.GET.copy()
+    query.pop('page', None)
+    return query.urlencode()
@@ -0,0 +1,126 @@
+import csv
+
+from django.test import TestCase
+
+from identifiers import models as id_models
+from plugins.imports import utils
+from plugins.imports.benchmarks import corpora, runner
+from plugins.imports.benchmarks.fake_ojs3 import FakeOJS3Corpus, FakeOJS3Server
+from plugins.imports.benchmarks.ojs3_stub import OJS3StubServer
+from plugins.imports.ojs import clients
+from submission import models as submission_models
+from utils.testing import helpers
+
+
+class TestBenchmarkCorpora(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.journal, *_ = helpers.create_journals()
+        helpers.create_roles(['editor', 'author'])
+        cls.owner = helpers.create_user('benchmark@example.com')
+
+    def test_update_csv_imports_every_article(self):
+        csv_string = corpora.generate_update_csv(
+            self.journal.code, articles=3, authors=2,
+        )
+        reader = csv.DictReader(csv_string.splitlines())
+        utils.update_article_metadata(reader, owner=self.owner)
+
+        articles = submission_models.Article.objects.filter(
+            journal=self.journal,
+        )
+        self.assertEqual(articles.count(), 3)
+        self.assertEqual(articles.first().frozenauthor_set.count(), 2)
+
+    def test_stub_server_replays_ojs3_responses(self):
+        with OJS3StubServer() as server:
+            server.responses = corpora.generate_ojs3_responses(
+                server.url, articles=3,
+            )
+            client = clients.OJS3APIClient(server.url)
+            submissions = list(client.get_articles())
+
+        self.assertEqual([s['id'] for s in submissions], [1, 2, 3])
+
+    def test_ojs3_scenario_imports_articles(self):
+        result = runner.run_scenario(
+            'ojs3', self.journal, self.owner, runner.CorpusSize(2, 1),
+        )
+
+        self.assertEqual(result['failed'], 0)
+        self.assertGreater(result['queries_per_article'], 0)
+        # Scenarios roll back what they import
+        self.assertFalse(
+            id_models.Identifier.objects.filter(id_type='ojs_id').exists()
+        )
+
+    def test_compare_reports_regressions(self):
+        baseline = {
+            'articles': 10, 'authors': 3, 'seconds_per_article': 0.1,
+            'queries_per_article': 20, 'peak_rss_mb': 100,
+        }
+        result = dict(baseline, queries_per_article=30, peak_rss_mb=110)
+
+        self.assertEqual(
+            runner.compare(result, baseline, tolerance=0.2),
+            [('queries_per_article', 20, 30)],
+        )
+
+    def test_missing_baselines(self):
+        baselines = runner.load_baselines()
+        self.assertEqual(set(baselines), set(runner.SCENARIOS))
+
+        results = [
+            {'scenario': 'jats'},
+            {'scenario': 'ojs3'},
+            {'scenario': 'unknown'},
+        ]
+        baselines['ojs3'] = dict(baselines['ojs3'], queries_per_article=20)
+        self.assertEqual(
+            runner.missing_baselines(results, baselines),
+            ['jats', 'unknown'],
+        )
+
+
+class TestFakeOJS3Server(TestCase):
+
+    def test_client_pages_through_submissions(self):
+        corpus = FakeOJS3Corpus(articles=45, users=0)
+        with FakeOJS3Server(corpus) as server:
+            client = clients.OJS3APIClient(server.journal_url())
+            submissions = list(client.get_articles())
+
+        self.assertEqual(len(submissions), 45)
+        self.assertEqual(server.requests['submissions'], 3)
+        self.assertEqual(server.requests['submission'], 45)
+
+    def test_issues_hold_their_articles(self):
+        corpus = FakeOJS3Corpus(articles=10, issues=3)
+        with FakeOJS3Server(corpus) as server:
+            client = clients.OJS3APIClient(server.journal_url())
+            issues = list(client.get_issues())
+
+        self.assertEqual(
+            [len(issue['articles']) for issue in issues],
+            [4, 4, 2],
+        )
+
+    def test_journals_are_listed_from_contexts(self):
+        corpus = FakeOJS3Corpus(journals=2)
+        with FakeOJS3Server(corpus) as server:
+            client = clients.OJS3APIClient(server.journal_url())
+            journals = list(client.get_journals())
+
+        self.assertEqual(
+            [journal['url'] for journal in journals],
+            [server.journal_url(path) for path in corpus.journal_paths],
+        )
+
+    def test_error_rate(self):
+        with FakeOJS3Server(error_rate=1) as server:
+            client = clients.OJS3APIClient(server.journal_url())
+            with self.assertRaises(Exception):
+                client.get_user(1)
+
+        self.assertEqual(server.requests['error'], 1)
@@ -0,0 +1,90 @@
+from datetime import date, datetime, timezone as dt_timezone
+from unittest import mock
+
+from dateutil import parser as dateutil_parser
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from plugins.imports import dates
+
+
+@override_settings(USE_TZ=True, TIME_ZONE='UTC')
+class TestDates(SimpleTestCase):
+
+    def setUp(self):
+        dates.clear_caches()
+
+    def test_parse_matches_dateutil(self):
+        for date_string in (
+            '2021-10-25',
+            '2021-10-25 10:25',
+            '2021-10-25T10:25:25',
+            '2021-10-25T10:25:25+00:00',
+            '2021-10-25T10:25:25-05:00',
+            '25 October 2021',
+            'Oct 25, 2021 10:25 AM',
+        ):
+            self.assertEqual(
+                dates.parse(date_string),
+                dateutil_parser.parse(date_string),
+            )
+
+    def test_iso_strings_skip_dateutil(self):
+        with mock.patch.object(dateutil_parser, 'parse') as dateutil_parse:
+            dates.parse('2021-10-25T10:25:25+00:00')
+            dates.parse('2021-10-25')
+        dateutil_parse.assert_not_called()
+
+    def test_parse_is_cached(self):
+        first = dates.parse('25 October 2021')
+        second = dates.parse('25 October 2021')
+        self.assertIs(first, second)
+        self.assertEqual(dates.parse.cache_info().hits, 1)
+
+    def test_parse_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            dates.parse('Not a date')
+
+    def test_get_aware_datetime_uses_noon_if_no_time(self):
+        self.assertEqual(
+            dates.get_aware_datetime('2021-10-25'),
+            datetime(2021, 10, 25, 12, tzinfo=dt_timezone.utc),
+        )
+        self.assertEqual(
+            dates.get_aware_datetime('2021-10-25', use_noon_if_no_time=False),
+            datetime(2021, 10, 25, tzinfo=dt_timezone.utc),
+        )
+
+    def test_get_aware_datetime_keeps_offset(self):
+        self.assertEqual(
+            dates.get_aware_datetime('2021-10-25T10:25:25-05:00'),
+            datetime(2021, 10, 25, 15, 25, 25, tzinfo=dt_timezone.utc),
+        )
+
+    def test_get_aware_datetime_is_cached_per_timezone(self):
+        tz = dt_timezone.utc
+        dates.get_aware_datetime('2021-10-25', tz=tz)
+        dates.get_aware_datetime('2021-10-25', tz=tz)
+        with timezone.override('America/New_York'):
+            local = dates.get_aware_datetime('2021-10-25')
+        self.assertEqual(local.hour, 12)
+        self.assertEqual(local.utcoffset().total_seconds(), -4 * 60 * 60)
+        cache_info = dates._get_aware_datetime.cache_info()
+        self.assertEqual((cache_info.hits, cache_info.misses), (1, 2))
+
+    def test_get_aware_datetime_at_noon(self):
+        self.assertEqual(
+            dates.get_aware_datetime_at_noon('2021-10-25 00:00:00'),
+            datetime(2021, 10, 25, 12, tzinfo=dt_timezone.utc),
+        )
+
+    def test_parse_datetime_or_date(self):
+        self.assertEqual(
+            dates.parse_datetime_or_date('2021-10-25'),
+            date(2021, 10, 25),
+        )
+        self.assertEqual(
+            dates.parse_datetime_or_date('2021-10-25T10:25:25'),
+            datetime(2021, 10, 25, 10, 25, 25),
+        )
+        self.assertIsNone(dates.parse_datetime_or_date(''))
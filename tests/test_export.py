@@ -1,4 +1,9 @@
+import io
+import zipfile
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from plugins.imports import utils, export, views
 from submission import models as submission_models
@@ -127,3 +132,40 @@ class TestExport(TestCase):
 
 
         self.assertEqual(2, lines)
+
+    def test_export_query_count_does_not_grow_with_articles(self):
+        run_import(dict_from_csv_string(CSV_DATA_1), owner=self.test_user)
+        articles = submission_models.Article.objects.filter(
+            journal__code='TST',
+        ).order_by('pk')
+
+        with CaptureQueriesContext(connection) as one_article:
+            export.export_using_import_format(articles[:1])
+        with CaptureQueriesContext(connection) as all_articles:
+            export.export_using_import_format(articles)
+
+        self.assertGreater(articles.count(), 1)
+        self.assertEqual(
+            len(one_article.captured_queries),
+            len(all_articles.captured_queries),
+        )
+
+    def test_stream_export_zip_matches_csv_export(self):
+        article_1 = submission_models.Article.objects.get(id=1)
+        filepath, _csv_name = export.export_using_import_format([article_1])
+        with open(filepath, 'r') as export_csv:
+            expected = dict_from_csv_string(export_csv.read())
+
+        response = export.stream_export_response(
+            article_1.journal,
+            submission_models.Article.objects.filter(pk=article_1.pk),
+        )
+        zip_file = zipfile.ZipFile(
+            io.BytesIO(b''.join(response.streaming_content)),
+        )
+        streamed = dict_from_csv_string(
+            zip_file.read('article_data.csv').decode('utf-8'),
+        )
+
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertEqual(expected, streamed)
@@ -0,0 +1,149 @@
+from django.test import TestCase
+
+from core import models as core_models
+from submission import models as sm_models
+from utils.testing import helpers
+
+from plugins.imports import frozen_authors
+from plugins.imports.ojs import ojs3_importers
+
+
+def author_values(last_name, order, account=None):
+    return {
+        'author': account,
+        'first_name': 'Test',
+        'last_name': last_name,
+        'institution': 'Test Institution',
+        'order': order,
+    }
+
+
+def ojs3_author(last_name, seq, email=None, orcid=None):
+    return {
+        'givenName': {'en_US': 'Test'},
+        'familyName': {'en_US': last_name},
+        'affiliation': {'en_US': 'Test Institution'},
+        'seq': seq,
+        'email': email,
+        'orcid': orcid,
+    }
+
+
+class TestFrozenAuthors(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.journal, _ = helpers.create_journals()
+        cls.article = helpers.create_article(cls.journal)
+        cls.account = helpers.create_user('Frozen.Author@example.com')
+
+    def frozen_last_names(self):
+        return list(
+            sm_models.FrozenAuthor.objects.filter(
+                article=self.article,
+            ).order_by('order').values_list('last_name', flat=True)
+        )
+
+    def test_resolve_accounts_ignores_case(self):
+        accounts = frozen_authors.resolve_accounts(
+            ['frozen.author@EXAMPLE.com', '', None],
+        )
+        self.assertEqual(
+            frozen_authors.get_account(accounts, 'FROZEN.author@example.com'),
+            self.account,
+        )
+
+    def test_resolve_accounts_creates_missing_accounts(self):
+        accounts = frozen_authors.resolve_accounts(
+            ['new.author@example.com'],
+            create_defaults={
+                'new.author@example.com': {
+                    'first_name': 'New',
+                    'last_name': 'Author',
+                },
+            },
+        )
+        self.assertTrue(
+            core_models.Account.objects.filter(
+                email='new.author@example.com',
+            ).exists()
+        )
+        self.assertIn('new.author@example.com', accounts)
+
+    def test_reconcile_creates_updates_and_deletes(self):
+        frozen_authors.reconcile({
+            self.article: [
+                author_values('First', 1, self.account),
+                author_values('Second', 2),
+                author_values('Third', 3),
+            ],
+        })
+        self.assertEqual(
+            self.frozen_last_names(), ['First', 'Second', 'Third'],
+        )
+
+        counts = frozen_authors.reconcile({
+            self.article: [
+                author_values('First', 1, self.account),
+                author_values('Renamed', 2),
+            ],
+        })
+        self.assertEqual(counts, (0, 1, 1))
+        self.assertEqual(self.frozen_last_names(), ['First', 'Renamed'])
+        self.assertEqual(
+            sm_models.FrozenAuthor.objects.get(last_name='First').author,
+            self.account,
+        )
+
+    def test_reconcile_unchanged_authors_makes_no_writes(self):
+        authors = {self.article: [author_values('First', 1)]}
+        frozen_authors.reconcile(authors)
+
+        with self.assertNumQueries(1):
+            counts = frozen_authors.reconcile(authors)
+        self.assertEqual(counts, (0, 0, 0))
+
+    def test_reconcile_clears_values_of_replaced_ojs3_authors(self):
+        ojs3_importers.import_frozen_authors(self.article, [
+            ojs3_author(
+                'First', 1,
+                email='no.account@example.com',
+                orcid='https://orcid.org/0000-0002-1825-0097',
+            ),
+        ])
+        frozen = sm_models.FrozenAuthor.objects.get(article=self.article)
+        self.assertEqual(frozen.frozen_email, 'no.account@example.com')
+        self.assertEqual(frozen.frozen_orcid, '0000-0002-1825-0097')
+
+        ojs3_importers.import_frozen_authors(self.article, [
+            ojs3_author('Second', 1, email=self.account.email),
+        ])
+        frozen = sm_models.FrozenAuthor.objects.get(article=self.article)
+        self.assertEqual(frozen.last_name, 'Second')
+        self.assertEqual(frozen.author, self.account)
+        self.assertIsNone(frozen.frozen_email)
+        self.assertIsNone(frozen.frozen_orcid)
+
+    def test_reconcile_resets_person_fields_of_reused_rows(self):
+        frozen_authors.reconcile({
+            self.article: [
+                dict(
+                    author_values('First', 1, self.account),
+                    middle_name='Middle',
+                    name_suffix='Jr',
+                    department='Department',
+                    frozen_biography='Biography',
+                ),
+            ],
+        })
+
+        frozen_authors.reconcile({
+            self.article: [author_values('Second', 1)],
+        })
+        frozen = sm_models.FrozenAuthor.objects.get(article=self.article)
+        self.assertEqual(frozen.last_name, 'Second')
+        self.assertIsNone(frozen.author)
+        for field in (
+            'middle_name', 'name_suffix', 'department', 'frozen_biography',
+        ):
+            self.assertFalse(getattr(frozen, field), field)
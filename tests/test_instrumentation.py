@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+
+from django.test import TestCase
+
+from plugins.imports import instrumentation
+from submission import models as submission_models
+
+
+class TestInstrumentation(TestCase):
+
+    def test_track_counts_items_phases_and_queries(self):
+        with instrumentation.track('test_run', total=2) as run:
+            for i in range(2):
+                with run.item(i):
+                    with instrumentation.phase('lookup'):
+                        list(submission_models.Article.objects.all())
+                    instrumentation.record_http_request()
+
+        summary = run.summary()
+        self.assertEqual(summary['processed'], 2)
+        self.assertEqual(summary['total'], 2)
+        self.assertEqual(summary['queries'], 2)
+        self.assertEqual(summary['http_requests'], 2)
+        self.assertEqual(summary['phases']['lookup']['count'], 2)
+        self.assertEqual(summary['phases']['lookup']['queries'], 2)
+
+    def test_nested_track_reuses_current_run(self):
+        with instrumentation.track('outer') as outer:
+            with instrumentation.track('inner', total=5) as inner:
+                with instrumentation.item():
+                    pass
+
+        self.assertIs(outer, inner)
+        self.assertEqual(outer.total, 5)
+        self.assertEqual(outer.processed, 1)
+
+    def test_failed_items_are_counted(self):
+        with instrumentation.track('failing') as run:
+            with self.assertRaises(ValueError):
+                with run.item():
+                    raise ValueError
+
+        self.assertEqual(run.failed, 1)
+
+    def test_helpers_are_noops_without_a_run(self):
+        with instrumentation.item(), instrumentation.phase('nothing'):
+            instrumentation.record_http_request()
+        self.assertIsNone(instrumentation.current_run())
+
+    def test_summary_is_written_to_json(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'summary.json')
+            with instrumentation.track('summary', summary_path=path):
+                with instrumentation.item():
+                    pass
+            with open(path, 'r') as summary_file:
+                summary = json.load(summary_file)
+
+        self.assertEqual(summary['run'], 'summary')
+        self.assertEqual(summary['processed'], 1)
+
+    def test_query_log_reports_duplicates(self):
+        with instrumentation.log_queries() as query_log:
+            for _ in range(3):
+                list(submission_models.Article.objects.filter(pk=1))
+            list(submission_models.Article.objects.filter(pk=2))
+
+        self.assertEqual(len(query_log), 4)
+        (sql, count), = query_log.most_repeated()
+        self.assertEqual(count, 4)
+        (_sql, _params, duplicate_count), = query_log.duplicates()
+        self.assertEqual(duplicate_count, 3)
+        self.assertIn('3 x', query_log.report())
@@ -0,0 +1,64 @@
+from datetime import timedelta
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from plugins.imports import jobs, models
+
+
+def failing_handler(job, progress):
+    raise ValueError('Broken upload')
+
+
+class TestJobs(TestCase):
+
+    def make_temp_file(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(lambda: os.path.exists(path) and os.unlink(path))
+        return path
+
+    def test_reclaim_stale_jobs(self):
+        path = self.make_temp_file()
+        stale_job = jobs.enqueue(models.ImportJob.JATS, path=path)
+        running_job = jobs.enqueue(models.ImportJob.JATS)
+        models.ImportJob.objects.filter(pk=stale_job.pk).update(
+            status=models.ImportJob.RUNNING,
+            started=timezone.now() - timedelta(hours=2),
+            heartbeat=timezone.now() - timedelta(hours=1),
+        )
+        models.ImportJob.objects.filter(pk=running_job.pk).update(
+            status=models.ImportJob.RUNNING,
+            started=timezone.now() - timedelta(hours=2),
+            heartbeat=timezone.now(),
+        )
+
+        reclaimed = jobs.reclaim_stale_jobs()
+
+        self.assertEqual(reclaimed, [stale_job])
+        stale_job.refresh_from_db()
+        self.assertEqual(stale_job.status, models.ImportJob.FAILED)
+        self.assertTrue(stale_job.is_finished)
+        self.assertEqual(len(stale_job.errors), 1)
+        self.assertFalse(os.path.exists(path))
+        running_job.refresh_from_db()
+        self.assertEqual(running_job.status, models.ImportJob.RUNNING)
+
+    def test_failed_jobs_remove_their_file(self):
+        path = self.make_temp_file()
+        jobs.enqueue(models.ImportJob.JATS, path=path)
+        job = jobs.claim_next_job()
+        self.assertIsNotNone(job.heartbeat)
+
+        with mock.patch.dict(
+            jobs.JOB_HANDLERS, {models.ImportJob.JATS: failing_handler},
+        ):
+            jobs.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, models.ImportJob.FAILED)
+        self.assertEqual(job.errors, ['Broken upload'])
+        self.assertFalse(os.path.exists(path))
@@ -0,0 +1,74 @@
+from django.test import TestCase
+
+from submission import models as sm_models
+from utils.testing import helpers
+
+from plugins.imports import keywords
+
+
+class TestKeywords(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.journal, _ = helpers.create_journals()
+        cls.article = helpers.create_article(cls.journal)
+        cls.existing = sm_models.Keyword.objects.create(word='existing')
+
+    def article_words(self):
+        return list(
+            sm_models.KeywordArticle.objects.filter(
+                article=self.article,
+            ).order_by('order', 'pk').values_list('keyword__word', flat=True)
+        )
+
+    def test_intern_creates_missing_keywords(self):
+        keyword_ids = keywords.intern(['existing', 'new', '', 'new'])
+
+        self.assertEqual(keyword_ids['existing'], self.existing.pk)
+        self.assertEqual(
+            sm_models.Keyword.objects.get(word='new').pk,
+            keyword_ids['new'],
+        )
+        self.assertEqual(sm_models.Keyword.objects.filter(word='new').count(), 1)
+
+    def test_intern_caches_committed_keywords(self):
+        with keywords.keyword_cache():
+            with self.captureOnCommitCallbacks(execute=True):
+                keywords.intern(['existing'])
+
+            with self.assertNumQueries(0):
+                keyword_ids = keywords.intern(['existing'])
+        self.assertEqual(keyword_ids, {'existing': self.existing.pk})
+
+    def test_cache_only_lasts_for_the_block(self):
+        with keywords.keyword_cache():
+            with self.captureOnCommitCallbacks(execute=True):
+                keywords.intern(['existing'])
+
+        # Another process could have deleted or merged the keyword since
+        with self.assertNumQueries(1):
+            keywords.intern(['existing'])
+
+    def test_deleted_keywords_are_forgotten(self):
+        keyword = sm_models.Keyword.objects.create(word='deleted')
+        with keywords.keyword_cache():
+            with self.captureOnCommitCallbacks(execute=True):
+                keywords.intern(['deleted'])
+            keyword.delete()
+
+            keyword_ids = keywords.intern(['deleted'])
+        self.assertNotEqual(keyword_ids['deleted'], keyword.pk)
+
+    def test_set_article_keywords_orders_keywords(self):
+        keywords.set_article_keywords(self.article, ['one', 'two', 'existing'])
+        keywords.set_article_keywords(self.article, ['existing', 'one'])
+
+        self.assertEqual(self.article_words(), ['existing', 'one', 'two'])
+
+    def test_set_article_keywords_replace(self):
+        keywords.set_article_keywords(self.article, ['one', 'two', 'existing'])
+        keywords.set_article_keywords(
+            self.article, ['two', 'three'], replace=True,
+        )
+
+        self.assertEqual(self.article_words(), ['two', 'three'])
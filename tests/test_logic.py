@@ -0,0 +1,120 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from comms.models import NewsItem
+from plugins.imports import logic, models
+from utils.testing import helpers
+
+
+def make_post(post_id, title, tags):
+    return SimpleNamespace(
+        id=post_id,
+        title=title,
+        content='<p>{}</p>'.format(title),
+        date=timezone.now(),
+        terms=[SimpleNamespace(name=tag) for tag in tags],
+    )
+
+
+class TestWordPressLogic(SimpleTestCase):
+
+    def test_get_all_posts_fetches_every_page(self):
+        all_posts = list(range(25))
+
+        def get_posts(details, increment, offset):
+            return all_posts[offset:offset + increment]
+
+        with mock.patch.object(logic, 'get_posts', side_effect=get_posts):
+            posts = logic.get_all_posts(None, increment=10, workers=2)
+
+        self.assertEqual(posts, all_posts)
+
+    def test_rehost_images_downloads_each_url_once(self):
+        news_items = [
+            mock.Mock(body='<img src="https://example.com/a.png?w=100"/>'),
+            mock.Mock(
+                body='<img src="https://example.com/a.png"/>'
+                     '<img src="https://example.com/b.png"/>'
+            ),
+        ]
+
+        def download(source, session):
+            if source.endswith('b.png'):
+                return None
+            return '/media/a.png'
+
+        with mock.patch.object(
+            logic, 'download_and_store_image', side_effect=download,
+        ) as download_and_store_image:
+            logic.rehost_images(news_items)
+
+        self.assertEqual(download_and_store_image.call_count, 2)
+        self.assertIn('src="/media/a.png"', news_items[0].body)
+        self.assertIn('src="/media/a.png"', news_items[1].body)
+        # Images that fail to download keep their original source
+        self.assertIn('src="https://example.com/b.png"', news_items[1].body)
+        for news_item in news_items:
+            news_item.save.assert_called_once()
+
+
+class TestImportPosts(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.journal, _ = helpers.create_journals()
+        cls.user = helpers.create_user('wordpress@example.com')
+        cls.content_type = ContentType.objects.get_for_model(cls.journal)
+
+    def import_posts(self, post_ids, posts):
+        import_object = models.WordPressImport.objects.create(
+            url='https://example.com',
+            username='user',
+            password='password',
+            user=self.user,
+        )
+        logic.import_posts(
+            post_ids, posts, self.content_type, self.journal.pk, import_object,
+        )
+
+    def test_import_posts(self):
+        posts = [
+            make_post('1', 'First', ['news', 'events']),
+            make_post('2', 'Second', ['news']),
+            make_post('3', 'Not selected', []),
+        ]
+        self.import_posts(['1', '2'], posts)
+
+        news_items = NewsItem.objects.filter(
+            content_type=self.content_type,
+            object_id=self.journal.pk,
+        )
+        self.assertEqual(
+            sorted(news_items.values_list('title', flat=True)),
+            ['First', 'Second'],
+        )
+        self.assertEqual(
+            sorted(
+                news_items.get(title='First').tags.values_list(
+                    'text', flat=True,
+                )
+            ),
+            ['events', 'news'],
+        )
+        self.assertFalse(models.WordPressImport.objects.exists())
+
+    def test_import_posts_updates_tags_of_existing_items(self):
+        self.import_posts(['1'], [make_post('1', 'First', ['news', 'old'])])
+        self.import_posts(['1'], [make_post('1', 'First', ['news', 'new'])])
+
+        news_item = NewsItem.objects.get(
+            content_type=self.content_type,
+            object_id=self.journal.pk,
+        )
+        self.assertEqual(
+            sorted(news_item.tags.values_list('text', flat=True)),
+            ['new', 'news'],
+        )
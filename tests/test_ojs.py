@@ -0,0 +1,179 @@
+import tempfile
+import threading
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+import requests
+
+from plugins.imports.ojs import importers, scraper
+from plugins.imports.ojs import main as ojs_main
+
+
+def file_json(url):
+    return {"url": url}
+
+
+ARTICLE_DICT = {
+    "ojs_id": 1,
+    "manuscript_file": file_json("http://ojs/manuscript"),
+    "review_file": file_json("http://ojs/manuscript"),
+    "editor_file": None,
+    "author_revision": file_json("http://ojs/revision"),
+    "supp_files": [file_json("http://ojs/supp")],
+    "reviews": [
+        {"review_file": file_json("http://ojs/review")},
+        {"review_file_url": "http://ojs/review-url"},
+    ],
+    "copyediting": {
+        "initial": {"file": file_json("http://ojs/copyedit")},
+        "author": {},
+        "final": None,
+        "initial_file": None,
+        "author_file": file_json("http://ojs/author-copyedit"),
+        "final_file": None,
+    },
+    "layout": {
+        "galleys": [
+            {"label": "PDF", "file": file_json("http://ojs/pdf")},
+            {"label": "XML", "file": "None"},
+        ],
+    },
+}
+
+
+class FileServingClient():
+    """ Serves files by URL and records the threads that fetched them"""
+    journal_url = "http://ojs"
+
+    def __init__(self):
+        self.fetched = []
+
+    def fetch_file(self, url, filename=None, extension=None, exc_mimes=None):
+        self.fetched.append((url, threading.current_thread()))
+        return ContentFile(url.encode(), name=url.rsplit("/", 1)[-1])
+
+
+class OJSFilePrefetch(SimpleTestCase):
+
+    def test_get_file_urls(self):
+        self.assertEqual(
+            importers.get_file_urls(ARTICLE_DICT),
+            [
+                "http://ojs/review-url",
+                "http://ojs/manuscript",
+                "http://ojs/revision",
+                "http://ojs/supp",
+                "http://ojs/review",
+                "http://ojs/copyedit",
+                "http://ojs/author-copyedit",
+                "http://ojs/pdf",
+            ],
+        )
+        self.assertEqual(
+            importers.get_file_urls(
+                ARTICLE_DICT, review=False, galleys=False,
+            ),
+            ["http://ojs/copyedit", "http://ojs/author-copyedit"],
+        )
+
+    def test_prefetch_article_files(self):
+        client = FileServingClient()
+        article_dicts = [dict(ARTICLE_DICT, ojs_id=i) for i in range(3)]
+
+        imported = []
+        for article_dict, article_client in ojs_main.prefetch_article_files(
+            client, article_dicts, workers=2,
+        ):
+            imported.append(article_dict["ojs_id"])
+            self.assertEqual(article_client.journal_url, "http://ojs")
+            for _ in range(2):
+                # Files can be requested more than once
+                django_file = article_client.fetch_file("http://ojs/pdf")
+                self.assertEqual(django_file.name, "pdf")
+                self.assertEqual(django_file.read(), b"http://ojs/pdf")
+
+        self.assertEqual(imported, [0, 1, 2])
+        self.assertEqual(len(client.fetched), 3 * 8)
+        self.assertNotIn(
+            threading.current_thread(),
+            {thread for _, thread in client.fetched},
+        )
+
+
+EDITOR_PAGE = b"""
+<html><body>
+<form action="http://ojs/index.php/test/editor/setEditorFlags">
+<table>
+<tr valign="top">
+    <td>Section Editor</td>
+    <td><a href="http://ojs/index.php/test/user/email?to[]=Test%20Editor%20%3Ceditor%40example.com%3E">Test Editor</a></td>
+    <td>2020-01-02</td>
+    <td>Delete</td>
+</tr>
+<tr valign="top"><td colspan="4">No email</td></tr>
+</table>
+</form>
+</body></html>
+"""
+
+
+class PageServingClient():
+    """ Serves pages by URL and records the URLs requested"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.fetched = []
+
+    def fetch(self, url):
+        self.fetched.append(url)
+        response = requests.Response()
+        response.status_code = 200 if url in self.pages else 404
+        response._content = self.pages.get(url, b"")
+        response.url = url
+        return response
+
+
+class OJSScraper(SimpleTestCase):
+
+    def test_parse_editor_assignments(self):
+        self.assertEqual(
+            scraper.parse_editor_assignments(EDITOR_PAGE),
+            [scraper.ScrapedEditor(
+                role="Section Editor",
+                email="editor@example.com",
+                date="2020-01-02",
+            )],
+        )
+        self.assertEqual(scraper.parse_editor_assignments(b""), [])
+
+    def test_iter_pages_uses_cache(self):
+        client = PageServingClient({"http://ojs/1": EDITOR_PAGE})
+        with tempfile.TemporaryDirectory() as cache_dir:
+            page_cache = scraper.PageCache(cache_dir)
+            pages = scraper.iter_pages(
+                client, ["http://ojs/1", "http://ojs/2"], page_cache,
+            )
+            self.assertEqual(list(pages), [("http://ojs/1", EDITOR_PAGE)])
+            self.assertEqual(page_cache.get("http://ojs/1"), EDITOR_PAGE)
+            self.assertIsNone(page_cache.get("http://ojs/2"))
+
+            pages = scraper.iter_pages(client, ["http://ojs/1"], page_cache)
+            self.assertEqual(list(pages), [("http://ojs/1", EDITOR_PAGE)])
+            self.assertEqual(
+                sorted(client.fetched), ["http://ojs/1", "http://ojs/2"],
+            )
+
+    def test_iter_pages_yields_pages_as_they_are_fetched(self):
+        urls = ["http://ojs/%s" % i for i in range(10)]
+        client = PageServingClient({url: url.encode() for url in urls})
+
+        pages = scraper.iter_pages(client, urls, workers=2)
+        url, content = next(pages)
+
+        self.assertEqual(content, url.encode())
+        # Only a few pages are fetched ahead of those consumed
+        self.assertLessEqual(len(client.fetched), 4)
+        self.assertEqual(
+            sorted(dict([(url, content)] + list(pages))),
+            sorted(urls),
+        )
@@ -1,13 +1,21 @@
 from io import StringIO
+import os
+import tempfile
+from unittest import mock
 
-from django.test import TestCase
+import requests
+from django.test import SimpleTestCase, TestCase
 from django.core.files.base import ContentFile
 
 from core import models as core_models
+from journal import models as journal_models
 from identifiers import models as id_models
+from submission import models as sm_models
 from utils.testing import helpers
 
-from plugins.imports import ojs
+from plugins.imports import models, ojs
+from plugins.imports.ojs import clients, ojs3_importers
+from plugins.imports.ojs import main as ojs_main
 
 
 
@@ -39,6 +47,86 @@ class OJS3ImportUsers(TestCase):
             ).exists()
         )
 
+    def make_user_dict(self, ojs_id, email, interests=()):
+        return dict(
+            MockOJS3Client.USER_DICT,
+            id=ojs_id,
+            email=email,
+            interests=[{"interest": interest} for interest in interests],
+        )
+
+    def test_import_users_in_bulk(self):
+        existing = helpers.create_user("existing@example.com")
+        user_dicts = [
+            self.make_user_dict(1, "Existing@example.com", ["history"]),
+            self.make_user_dict(2, "new@example.com", ["history", "art"]),
+            self.make_user_dict(3, "NEW@example.com", ["music"]),
+        ]
+
+        created, updated = ojs3_importers.import_users(
+            user_dicts, self.journal, batch_size=2,
+        )
+
+        self.assertEqual((created, updated), (1, 2))
+        new_account = core_models.Account.objects.get(
+            email__iexact="new@example.com",
+        )
+        self.assertEqual(
+            sorted(new_account.interest.values_list("name", flat=True)),
+            ["art", "history", "music"],
+        )
+        self.assertEqual(
+            set(
+                models.OJSAccount.objects.filter(
+                    journal=self.journal,
+                ).values_list("ojs_id", "account")
+            ),
+            {(1, existing.pk), (2, new_account.pk), (3, new_account.pk)},
+        )
+        for account in (existing, new_account):
+            self.assertEqual(
+                set(
+                    core_models.AccountRole.objects.filter(
+                        user=account, journal=self.journal,
+                    ).values_list("role__slug", flat=True)
+                ),
+                {"author", "editor"},
+            )
+
+    def test_import_users_disabled(self):
+        existing = helpers.create_user("active@example.com")
+        user_dicts = [
+            dict(self.make_user_dict(1, "active@example.com"), disabled=True),
+            dict(self.make_user_dict(2, "disabled@example.com"), disabled=True),
+        ]
+
+        ojs3_importers.import_users(user_dicts, self.journal)
+
+        existing.refresh_from_db()
+        self.assertTrue(existing.is_active)
+        self.assertFalse(
+            core_models.Account.objects.get(
+                email="disabled@example.com",
+            ).is_active
+        )
+
+    def test_import_users_twice(self):
+        user_dicts = [self.make_user_dict(1, "twice@example.com", ["art"])]
+        ojs3_importers.import_users(user_dicts, self.journal)
+        created, updated = ojs3_importers.import_users(user_dicts, self.journal)
+
+        self.assertEqual((created, updated), (0, 1))
+        self.assertEqual(
+            models.OJSAccount.objects.filter(journal=self.journal).count(), 1,
+        )
+        self.assertEqual(
+            core_models.AccountRole.objects.filter(
+                user__email="twice@example.com",
+            ).count(),
+            2,
+        )
+
+
 class OJS3ImportArticles(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -339,3 +427,369 @@ class MockOJS3Client():
 
     def fetch_file(self, *args, **kwargs):
         return ContentFile(b'test')
+
+
+class CountingOJS3Client(clients.OJS3APIClient):
+    """ Serves a fixed list of submission files and counts the listings"""
+    FILES = [
+        {"id": 1, "fileStage": 2, "assocId": None, "reviewRoundId": None},
+        {"id": 2, "fileStage": 4, "assocId": None, "reviewRoundId": 7},
+        {"id": 3, "fileStage": 4, "assocId": None, "reviewRoundId": 8},
+        {"id": 4, "fileStage": 5, "assocId": 30, "reviewRoundId": 7},
+        {"id": 5, "fileStage": 15, "assocId": None, "reviewRoundId": 8},
+        {"id": 6, "fileStage": 11, "assocId": None, "reviewRoundId": None},
+    ]
+
+    def __init__(self):
+        super().__init__("http://localhost/journal")
+        self.listings = []
+
+    def get_submission_files(self, submission_id, per_page=20, **query_params):
+        self.listings.append(query_params)
+        return iter(self.FILES)
+
+
+class OJS3SubmissionFileInventory(SimpleTestCase):
+
+    def ids(self, files):
+        return [f["id"] for f in files]
+
+    def test_files_are_listed_once(self):
+        client = CountingOJS3Client()
+        inventory = clients.SubmissionFileInventory(client, 100)
+
+        self.assertEqual(self.ids(inventory.get_manuscript_files(100)), [1])
+        self.assertEqual(
+            self.ids(inventory.get_review_files(100, round_ids=[8])), [3],
+        )
+        self.assertEqual(
+            self.ids(inventory.get_review_files(
+                100, round_ids=[8], revisions=True,
+            )),
+            [5],
+        )
+        self.assertEqual(
+            self.ids(inventory.get_review_files(100, review_ids=[30])), [4],
+        )
+        self.assertEqual(self.ids(inventory.get_prod_ready_files(100)), [6])
+        self.assertEqual(inventory.get_copyediting_files(100), [])
+        self.assertEqual(client.listings, [{}])
+
+    def test_rounds_are_requested_when_files_have_none(self):
+        client = CountingOJS3Client()
+        client.FILES = [{"id": 2, "fileStage": 4, "assocId": None}]
+        inventory = clients.SubmissionFileInventory(client, 100)
+
+        list(inventory.get_review_files(100, round_ids=[7]))
+
+        self.assertEqual(
+            client.listings,
+            [{}, {"reviewRoundIds": "7", "fileStages": 4}],
+        )
+
+
+class OJS3JournalCache(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.journal, *_ = helpers.create_journals()
+        for stage, name in (
+            (sm_models.STAGE_UNASSIGNED, "review"),
+            (sm_models.STAGE_EDITOR_COPYEDITING, "copyediting"),
+        ):
+            core_models.WorkflowElement.objects.get_or_create(
+                journal=cls.journal,
+                stage=stage,
+                defaults={
+                    "element_name": name,
+                    "handshake_url": name,
+                    "jump_url": name,
+                },
+            )
+        cls.article = helpers.create_article(cls.journal)
+
+    def test_workflow_logs_are_buffered(self):
+        stages = (
+            sm_models.STAGE_UNASSIGNED,
+            sm_models.STAGE_EDITOR_COPYEDITING,
+            sm_models.STAGE_UNASSIGNED,
+        )
+        with ojs3_importers.journal_cache(self.journal):
+            # A single query loads every workflow element of the journal
+            with self.assertNumQueries(1):
+                for stage in stages:
+                    ojs3_importers.create_workflow_log(self.article, stage)
+            self.assertFalse(
+                core_models.WorkflowLog.objects.filter(
+                    article=self.article,
+                ).exists()
+            )
+
+        self.assertEqual(
+            sorted(
+                core_models.WorkflowLog.objects.filter(
+                    article=self.article,
+                ).values_list("element__stage", flat=True)
+            ),
+            sorted({sm_models.STAGE_UNASSIGNED, sm_models.STAGE_EDITOR_COPYEDITING}),
+        )
+
+    def test_existing_workflow_logs_are_not_duplicated(self):
+        ojs3_importers.create_workflow_log(
+            self.article, sm_models.STAGE_UNASSIGNED,
+        )
+        with ojs3_importers.journal_cache(self.journal, batch_size=1):
+            ojs3_importers.create_workflow_log(
+                self.article, sm_models.STAGE_UNASSIGNED,
+            )
+
+        self.assertEqual(
+            core_models.WorkflowLog.objects.filter(
+                article=self.article,
+            ).count(),
+            1,
+        )
+
+
+class PrefetchingOJS3Client():
+    """ Serves publications, covers and issue galleys without a server"""
+    def get_publication(self, submission_id, publication_id):
+        return {"id": publication_id, "submissionId": submission_id}
+
+    def fetch_file(self, url, *args, **kwargs):
+        if "nl" in url:
+            return ContentFile(b"cover", name="cover.png")
+        return None
+
+    def get_issue_galley(self, issue_id, galley_id):
+        return ContentFile(b"galley", name="galley.pdf")
+
+
+class OJS3ImportIssues(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.journal, *_ = helpers.create_journals()
+        cls.issue = helpers.create_issue(cls.journal)
+        section = sm_models.Section.objects.create(
+            journal=cls.journal, name="Articles",
+        )
+        cls.articles = [
+            helpers.create_article(cls.journal) for _ in range(3)
+        ]
+        for article in cls.articles:
+            article.section = section
+            article.save()
+
+    def test_prefetch_issue(self):
+        issue_dict = {
+            "id": 1,
+            "articles": [
+                {"id": i, "currentPublicationId": i + 100} for i in range(5)
+            ],
+            "coverImageUrl": {
+                "en_US": "http://ojs/en.png",
+                "nl_NL": "http://ojs/nl.png",
+            },
+            "galleys": [{"id": 2}, {"id": 3}],
+        }
+
+        cover, (galley_id, galley) = ojs3_importers.prefetch_issue(
+            PrefetchingOJS3Client(), issue_dict, workers=3,
+        )
+
+        self.assertEqual(
+            [d["publication"]["id"] for d in issue_dict["articles"]],
+            [100, 101, 102, 103, 104],
+        )
+        self.assertEqual(cover.name, "cover.png")
+        self.assertEqual(galley_id, 3)
+        self.assertEqual(galley.name, "galley.pdf")
+
+    def test_set_article_orderings(self):
+        ojs3_importers.set_article_orderings(
+            self.issue, list(enumerate(self.articles)),
+        )
+        reordered = list(enumerate(reversed(self.articles)))
+        with self.assertNumQueries(2):
+            ojs3_importers.set_article_orderings(self.issue, reordered)
+
+        self.assertEqual(
+            list(
+                journal_models.ArticleOrdering.objects.filter(
+                    issue=self.issue,
+                ).order_by("order").values_list("article", flat=True)
+            ),
+            [article.pk for article in reversed(self.articles)],
+        )
+
+
+class SiteOJS3Client():
+    """ Lists journals of a site and hands out per journal clients"""
+    JOURNALS = [
+        {"urlPath": "one", "url": "http://ojs/one"},
+        {"urlPath": "two", "url": "http://ojs/two"},
+        {"urlPath": "three", "url": "http://ojs/three"},
+    ]
+
+    def get_journals(self, journal_acronym=None):
+        return self.JOURNALS
+
+    def for_journal(self, journal_url):
+        return journal_url
+
+
+class OJS3ImportJournals(SimpleTestCase):
+
+    def import_journals(self, **kwargs):
+        def import_articles(client, journal, galleys=True):
+            if journal == "two":
+                raise ValueError("Broken journal")
+
+        with mock.patch.object(
+            ojs3_importers, "import_journal_metadata",
+            side_effect=lambda client, d, **kwargs: d["urlPath"],
+        ), mock.patch.object(
+            ojs_main, "import_ojs3_users",
+        ) as import_users, mock.patch.object(
+            ojs_main, "import_ojs3_articles", side_effect=import_articles,
+        ), mock.patch.object(
+            ojs_main, "import_ojs3_issues",
+        ) as import_issues, mock.patch.object(
+            ojs_main, "import_ojs3_metrics",
+        ), mock.patch.object(ojs_main, "connection"):
+            errors = ojs_main.import_ojs3_journals(SiteOJS3Client(), **kwargs)
+        return errors, import_users, import_issues
+
+    def test_failed_journals_do_not_stop_the_others(self):
+        for workers in (1, 3):
+            errors, import_users, import_issues = self.import_journals(
+                workers=workers,
+            )
+            self.assertEqual(list(errors), ["two"])
+            self.assertEqual(import_users.call_count, 3)
+            self.assertEqual(
+                sorted(call.args[0] for call in import_issues.call_args_list),
+                ["http://ojs/one", "http://ojs/three"],
+            )
+
+    def test_journal_logs(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+
+        self.import_journals(workers=3, log_dir=temp_dir.name)
+
+        with open(os.path.join(temp_dir.name, "two.log")) as log_file:
+            log = log_file.read()
+        self.assertIn("Broken journal", log)
+        with open(os.path.join(temp_dir.name, "one.log")) as log_file:
+            self.assertNotIn("Broken journal", log_file.read())
+
+
+class LoginCountingClient(clients.OJS3APIClient):
+    """ Logs in without a server, counting the logins"""
+    def login(self, username=None, password=None):
+        self.session.cookies.set(
+            "OJSSID", "session-id", domain="localhost", path="/",
+        )
+        self.logins.append(self.journal_url)
+        self.logged_in()
+
+
+def make_response(status_code, location=None):
+    response = requests.Response()
+    response.status_code = status_code
+    if location:
+        response.headers["Location"] = location
+    return response
+
+
+class OJSClientSessions(SimpleTestCase):
+
+    def setUp(self):
+        LoginCountingClient.logins = []
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.cookie_dir = os.path.join(temp_dir.name, "cookies")
+
+    def make_client(self, pool, journal_url="http://localhost/one"):
+        return LoginCountingClient(
+            journal_url, "user", "password", session_pool=pool,
+        )
+
+    def test_clients_of_an_install_share_the_session(self):
+        pool = clients.SessionPool()
+        client = self.make_client(pool)
+        other_client = client.for_journal("http://localhost/two")
+
+        self.assertIs(client.session, other_client.session)
+        self.assertTrue(other_client.authenticated)
+        self.assertEqual(LoginCountingClient.logins, ["http://localhost/one"])
+
+    def test_saved_cookies_skip_the_login(self):
+        self.make_client(clients.SessionPool(cookie_dir=self.cookie_dir))
+        cookie_file, = os.listdir(self.cookie_dir)
+        self.assertEqual(
+            os.stat(os.path.join(self.cookie_dir, cookie_file)).st_mode & 0o777,
+            0o600,
+        )
+
+        with mock.patch.object(
+            requests.Session, "request", return_value=make_response(200),
+        ) as request:
+            client = self.make_client(
+                clients.SessionPool(cookie_dir=self.cookie_dir),
+            )
+            client.for_journal("http://localhost/two")
+
+        # The saved cookies are checked once, on first use
+        request.assert_called_once()
+        self.assertEqual(
+            request.call_args[0][1], "http://localhost/one/user/profile",
+        )
+        self.assertEqual(len(LoginCountingClient.logins), 1)
+        self.assertEqual(client.session.cookies["OJSSID"], "session-id")
+
+    def test_expired_saved_cookies_log_in_again(self):
+        self.make_client(clients.SessionPool(cookie_dir=self.cookie_dir))
+        redirected = make_response(200)
+        redirected.history = [
+            make_response(302, location="http://localhost/one/login"),
+        ]
+
+        with mock.patch.object(
+            requests.Session, "request", return_value=redirected,
+        ):
+            client = self.make_client(
+                clients.SessionPool(cookie_dir=self.cookie_dir),
+            )
+
+        self.assertTrue(client.authenticated)
+        self.assertEqual(len(LoginCountingClient.logins), 2)
+
+    def test_saved_cookies_are_keyed_by_credentials(self):
+        self.make_client(clients.SessionPool(cookie_dir=self.cookie_dir))
+
+        # Another password neither reuses nor overwrites the saved session
+        LoginCountingClient(
+            "http://localhost/one", "user", "other password",
+            session_pool=clients.SessionPool(cookie_dir=self.cookie_dir),
+        )
+
+        self.assertEqual(len(LoginCountingClient.logins), 2)
+        self.assertEqual(len(os.listdir(self.cookie_dir)), 2)
+
+    def test_expired_sessions_log_in_again(self):
+        client = self.make_client(clients.SessionPool())
+        redirect = make_response(302, location="http://localhost/one/login")
+        redirected = make_response(200)
+        redirected.history = [redirect]
+
+        for expired in (make_response(401), redirected):
+            with mock.patch.object(
+                client.session, "request",
+                side_effect=[expired, make_response(200)],
+            ) as request:
+                response = client.fetch("http://localhost/one/api/v1/issues")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(request.call_count, 2)
+
+        self.assertEqual(len(LoginCountingClient.logins), 3)
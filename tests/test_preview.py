@@ -0,0 +1,61 @@
+import os
+import tempfile
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from plugins.imports import preview
+
+CSV_STRING = (
+    'Janeway ID,Article title,Author surname\n'
+    '1,Updated,Person1\n'
+    ',New,Person2\n'
+    ',,Person3\n'
+)
+
+
+class TestPreview(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = os.path.join(temp_dir.name, 'upload.csv')
+
+    def write_csv(self, csv_string):
+        with open(self.path, 'w') as csv_file:
+            csv_file.write(csv_string)
+
+    def test_summarise_identifies_row_types(self):
+        self.write_csv(CSV_STRING)
+        summary = preview.summarise(self.path, dict_rows=True)
+        self.assertEqual(
+            summary['headers'], ['Janeway ID', 'Article title', 'Author surname'],
+        )
+        self.assertEqual(summary['row_count'], 3)
+        self.assertEqual(
+            summary['row_types'],
+            {'Update': 1, 'New Article': 1, 'Author': 1},
+        )
+
+    def test_pages_past_the_first_are_read_from_the_file(self):
+        rows = ['{0},Title {0}'.format(i) for i in range(120)]
+        self.write_csv('ID,Title\n' + '\n'.join(rows) + '\n')
+
+        summary, page = preview.get_preview(self.path, page_number=3)
+
+        self.assertEqual(summary['headers'], ['ID', 'Title'])
+        self.assertEqual(len(summary['first_rows']), preview.PREVIEW_PAGE_SIZE)
+        self.assertEqual(page.paginator.num_pages, 3)
+        self.assertEqual(
+            list(page),
+            [[str(i), 'Title {}'.format(i)] for i in range(100, 120)],
+        )
+
+    def test_summary_is_cached_until_the_file_changes(self):
+        self.write_csv(CSV_STRING)
+        first_summary = preview.get_summary(self.path)
+        self.assertEqual(preview.get_summary(self.path), first_summary)
+
+        self.write_csv(CSV_STRING + ',Another,Person4\n')
+        self.assertEqual(preview.get_summary(self.path)['row_count'], 4)
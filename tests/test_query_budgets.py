@@ -0,0 +1,314 @@
+import csv
+
+from django.test import TestCase
+
+from journal import models as journal_models
+from plugins.imports import instrumentation, jats, utils
+from plugins.imports.benchmarks import corpora
+from plugins.imports.ojs import ojs3_importers
+from submission import models as submission_models
+from utils.testing import helpers
+
+# Generated keywords repeat every 50 articles, so article indexes that are
+# this far apart get the same keywords
+KEYWORD_CYCLE = 50
+
+# The most queries the largest run of each hot path may make. The scaling
+# checks catch a query per item, these catch a constant number of queries
+# added to a path. They were set from the code paths with some headroom,
+# lower them when a change makes a path cheaper
+QUERY_BUDGETS = {
+    'update_article_metadata_keywords': 150,
+    'update_article_metadata_authors': 200,
+    'update_article_metadata_articles': 650,
+    'update_article_keywords': 100,
+    'update_article_authors': 150,
+    'import_author': 15,
+    'jats_save_article': 120,
+    'ojs3_import_article_metadata_authors': 150,
+    'ojs3_import_article_metadata_keywords': 150,
+}
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Each run of a hot path must stay within the budget declared for it in
+    QUERY_BUDGETS. As a budget can't catch a query per author or keyword
+    unless it is exact, these tests also import the same item with more
+    authors or keywords and compare the number of queries each import runs.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.journal, *_ = helpers.create_journals()
+        journal_models.IssueType.objects.get_or_create(
+            journal=cls.journal,
+            code='issue',
+        )
+        helpers.create_roles(['editor', 'author'])
+        cls.owner = helpers.create_user('budget@example.com')
+
+    def count_queries(self, run, size, index):
+        with instrumentation.log_queries() as query_log:
+            run(size, index)
+        return query_log
+
+    def measure(self, run, sizes):
+        """
+        Runs an import once for each size, after one warm up run with the
+        largest size so that shared rows such as issues, licences and
+        keywords already exist
+        :param run: A callable taking a size and the index of the run, which
+            it uses to import a distinct item
+        :return: A list of (size, QueryLog) tuples
+        """
+        run(max(sizes), 0)
+        return [
+            (size, self.count_queries(run, size, index))
+            for index, size in enumerate(sizes, 1)
+        ]
+
+    def format_logs(self, logs):
+        return '\n'.join(
+            'Size {}: {}'.format(size, query_log.report())
+            for size, query_log in logs
+        )
+
+    def assertWithinBudget(self, budget, logs):
+        """
+        Fails if any run made more queries than the budget of its hot path
+        :param budget: A key of QUERY_BUDGETS
+        :param logs: A list of (size, QueryLog) tuples
+        """
+        for _size, query_log in logs:
+            self.assertLessEqual(
+                len(query_log),
+                QUERY_BUDGETS[budget],
+                'Over the {} query budget\n{}'.format(
+                    budget, self.format_logs(logs),
+                ),
+            )
+
+    def assertFixedQueries(self, run, budget, sizes=(3, 6)):
+        """
+        Fails if importing more of the items that are written in bulk runs
+        more queries, listing the statements that were repeated the most
+        """
+        logs = self.measure(run, sizes)
+        self.assertWithinBudget(budget, logs)
+        counts = [len(query_log) for _size, query_log in logs]
+        if len(set(counts)) > 1:
+            self.fail(
+                'Query count grows with the number of items: {}\n{}'.format(
+                    counts, self.format_logs(logs),
+                )
+            )
+
+    def assertLinearQueries(self, run, budget, sizes=(2, 4, 6)):
+        """
+        Fails if each extra item costs more queries than the one before it,
+        for items that are written one at a time
+        """
+        logs = self.measure(run, sizes)
+        self.assertWithinBudget(budget, logs)
+        costs = set()
+        for (small, small_log), (large, large_log) in zip(logs, logs[1:]):
+            costs.add((len(large_log) - len(small_log)) / (large - small))
+        if len(costs) > 1:
+            self.fail(
+                'Queries per item grow with the number of items: {}\n'
+                '{}'.format(sorted(costs), self.format_logs(logs))
+            )
+
+    def import_csv(self, articles=1, authors=3, keywords=3, start=0):
+        csv_string = corpora.generate_update_csv(
+            self.journal.code,
+            articles=articles,
+            authors=authors,
+            keywords=keywords,
+            start=start,
+        )
+        utils.update_article_metadata(
+            csv.DictReader(csv_string.splitlines()), owner=self.owner,
+        )
+        return csv_string
+
+
+class TestUpdateImportQueryBudgets(QueryBudgetTestCase):
+
+    def test_update_article_metadata_keywords(self):
+        self.assertFixedQueries(
+            lambda keywords, index: self.import_csv(
+                keywords=keywords, start=index * KEYWORD_CYCLE,
+            ),
+            'update_article_metadata_keywords',
+        )
+
+    def test_update_article_metadata_authors(self):
+        self.assertLinearQueries(
+            lambda authors, index: self.import_csv(
+                authors=authors, start=index * KEYWORD_CYCLE,
+            ),
+            'update_article_metadata_authors',
+        )
+
+    def test_update_article_metadata_articles(self):
+        self.assertLinearQueries(
+            lambda articles, index: self.import_csv(
+                articles=articles, start=index * KEYWORD_CYCLE,
+            ),
+            'update_article_metadata_articles',
+        )
+        self.assertEqual(
+            submission_models.Article.objects.filter(
+                journal=self.journal,
+            ).count(),
+            6 + 2 + 4 + 6,
+        )
+
+    def update_article(self, authors=3, keywords=3, start=0):
+        csv_string = self.import_csv(
+            authors=authors, keywords=keywords, start=start,
+        )
+        article = submission_models.Article.objects.get(
+            journal=self.journal,
+            title='Synthetic article {}'.format(start),
+        )
+        rows = list(csv.DictReader(csv_string.splitlines()))
+        rows[0]['Janeway ID'] = str(article.pk)
+        prepared_row, = utils.prepare_reader_rows(rows)
+        _journal, article, _type, issue = utils.prep_update(
+            prepared_row['primary_row'],
+        )
+        return article, issue, prepared_row
+
+    def test_update_article_keywords(self):
+        updates = {}
+
+        def run(keywords, index):
+            article, issue, prepared_row = updates[index]
+            utils.update_article(article, issue, prepared_row, None)
+
+        for index, keywords in enumerate((6, 3, 6)):
+            updates[index] = self.update_article(
+                keywords=keywords, start=index * KEYWORD_CYCLE,
+            )
+        self.assertFixedQueries(run, 'update_article_keywords')
+
+    def test_update_article_authors(self):
+        updates = {}
+
+        def run(authors, index):
+            article, issue, prepared_row = updates[index]
+            utils.update_article(article, issue, prepared_row, None)
+
+        for index, authors in enumerate((6, 2, 4, 6)):
+            updates[index] = self.update_article(
+                authors=authors, start=index * KEYWORD_CYCLE,
+            )
+        self.assertLinearQueries(run, 'update_article_authors')
+
+    def test_import_author(self):
+        self.import_csv(authors=1)
+        article = submission_models.Article.objects.get(journal=self.journal)
+
+        logs = []
+        for order in range(6):
+            with instrumentation.log_queries() as query_log:
+                utils.import_author(
+                    [
+                        '', 'Given', '', 'Surname{}'.format(order), '',
+                        'Institution', '', '',
+                        'budget{}@example.com'.format(order), '', 'N', order,
+                    ],
+                    article,
+                )
+            logs.append((order, query_log))
+
+        # Each author costs the same, however many the article already has,
+        # the first one is a warm up run
+        logs = logs[1:]
+        self.assertWithinBudget('import_author', logs)
+        counts = [len(query_log) for _order, query_log in logs]
+        if len(set(counts)) > 1:
+            self.fail(
+                'Queries per author grow with the number of authors: '
+                '{}\n{}'.format(counts, self.format_logs(logs))
+            )
+
+
+class TestJATSQueryBudgets(QueryBudgetTestCase):
+
+    def save_article(self, size, index):
+        metadata = {
+            'journal': {},
+            'title': 'Budget article {}'.format(index),
+            'abstract': 'Abstract',
+            'date_published': corpora.START_DATE,
+            'date_submitted': None,
+            'rights': None,
+            'first_page': 1,
+            'last_page': 10,
+            'section_name': 'research-article',
+            'identifiers': {
+                'doi': '10.9999/budget.{}'.format(index),
+                'pubid': None,
+                'handle': None,
+            },
+            # The accounts of these authors are created by the warm up run,
+            # as creating an account is one query per author
+            'authors': [
+                {
+                    'first_name': 'Given',
+                    'last_name': 'Surname{}'.format(i),
+                    'email': 'jats{}@example.com'.format(i),
+                    'institution': 'Institution',
+                    'orcid': None,
+                    'correspondence': i == 0,
+                }
+                for i in range(size)
+            ],
+            'keywords': {'keyword {}'.format(i) for i in range(size)},
+            'license_url': 'https://creativecommons.org/licenses/by/4.0',
+            'license_text': None,
+            'volume': 1,
+            'issue': 1,
+            'issue_doi': None,
+        }
+        jats.save_article(metadata, self.journal, owner=self.owner)
+
+    def test_save_article(self):
+        self.assertFixedQueries(self.save_article, 'jats_save_article')
+
+
+class TestOJS3QueryBudgets(QueryBudgetTestCase):
+
+    def import_article_metadata(self, authors=3, keywords=3, index=0):
+        submission_id = 1 + index * KEYWORD_CYCLE
+        publication_id = 1000 + submission_id
+        article_dict = corpora.ojs3_submission(
+            submission_id, publication_id, corpora.START_DATE,
+        )
+        article_dict['publication'] = corpora.ojs3_publication(
+            'http://localhost', submission_id, publication_id,
+            corpora.START_DATE, authors, keywords=keywords,
+        )
+        ojs3_importers.import_article_metadata(
+            article_dict, self.journal, None,
+        )
+
+    def test_import_article_metadata_authors(self):
+        self.assertFixedQueries(
+            lambda authors, index: self.import_article_metadata(
+                authors=authors, index=index,
+            ),
+            'ojs3_import_article_metadata_authors',
+        )
+
+    def test_import_article_metadata_keywords(self):
+        self.assertFixedQueries(
+            lambda keywords, index: self.import_article_metadata(
+                keywords=keywords, index=index,
+            ),
+            'ojs3_import_article_metadata_keywords',
+        )
@@ -4,6 +4,9 @@ import io
 from itertools import chain
 import os
 import re
+import shutil
+from unittest import mock
+import uuid
 import zipfile
 
 
@@ -14,6 +17,7 @@ from django.utils.timezone import make_aware, utc
 from rest_framework import routers
 
 from core import models as core_models, logic as core_logic, plugin_loader
+from identifiers import models as id_models
 from journal import models as journal_models
 from plugins.imports import utils, export, views, plugin_settings
 from submission import models as submission_models
@@ -1096,42 +1100,37 @@ class TestImportAndUpdate(TestCase):
 
         self.assertEqual(csv_filename, csv_path.split('/')[-1])
 
-    def test_verify_headers(self):
-        csv_string = 'Inadequate,Headers\n' \
-                     'data, other data'
-        path_to_csv = os.path.join(
+    def test_prep_update_file_reuses_named_folder(self):
+        test_data_path = os.path.join(
             settings.BASE_DIR,
-            'plugins', 'imports', 'tests', 'test_data',
-            'test_verify_headers.csv',
+            'plugins',
+            'imports',
+            'tests',
+            'test_data',
+            'test_prep_update_file_with_csv',
         )
+        if not os.path.exists(test_data_path):
+            os.mkdir(test_data_path)
+
+        path_to_csv = os.path.join(test_data_path, 'reused_folder.csv')
         with open(path_to_csv, 'w') as fileobj:
-            fileobj.write(csv_string)
-        errors = []
-        errors = utils.verify_headers(path_to_csv, errors)
-        self.assertTrue(
-            'Expected headers not found' in errors[0]['error']
-        )
+            fileobj.write(CSV_DATA_1)
 
-    def test_validate_selected_char_fields(self):
-        csv_string = 'Article title,Stage,Language\n' \
-                     'title,Bad stage 1,zzz\n' \
-                     'title,Bad stage 2,Dinosaur\n'
-        path_to_csv = os.path.join(
-            settings.BASE_DIR,
-            'plugins', 'imports', 'tests', 'test_data',
-            'test_validate_selected_char_fields.csv',
+        folder_name = 'test_prep_update_file_{}'.format(uuid.uuid4())
+        csv_path, temp_folder_path, errors = utils.prep_update_file(
+            path_to_csv, folder_name=folder_name,
         )
-        with open(path_to_csv, 'w') as fileobj:
-            fileobj.write(csv_string)
-        errors = []
-        journal = self.journal_one
-        errors = utils.validate_selected_char_fields(path_to_csv, errors, journal)
-        error_messages = ".".join([msg['error'] for msg in errors])
-        self.assertTrue(
-            ('Unrecognized data in field Stage' in error_messages and
-             'Unrecognized data in field Language' in error_messages)
+        self.addCleanup(shutil.rmtree, temp_folder_path)
+        mtime = os.stat(csv_path).st_mtime_ns
+
+        second_csv_path, _, _ = utils.prep_update_file(
+            path_to_csv, folder_name=folder_name,
         )
 
+        self.assertEqual(errors, [])
+        self.assertEqual(second_csv_path, csv_path)
+        self.assertEqual(os.stat(second_csv_path).st_mtime_ns, mtime)
+
     def test_language_codes(self):
 
         csv_data_17 = dict_from_csv_string(CSV_DATA_1)
@@ -1199,3 +1198,69 @@ class TestImportAndUpdate(TestCase):
 
         self.assertEqual(rows[0][field_name], field_answer)
 
+
+
+class TestLoadArticleImages(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.journal_one, cls.journal_two = helpers.create_journals()
+        cls.article = helpers.create_article(cls.journal_one)
+        cls.identifier = id_models.Identifier.objects.create(
+            id_type='doi',
+            identifier='10.1234/images',
+            article=cls.article,
+        )
+        cls.request = HttpRequest()
+        cls.request.journal = cls.journal_one
+
+    def test_resolve_articles(self):
+        articles = utils.resolve_articles(
+            self.journal_one,
+            [
+                ('id', str(self.article.pk)),
+                ('doi', '10.1234/images'),
+                ('doi', '10.1234/missing'),
+            ],
+        )
+        self.assertEqual(
+            articles,
+            {
+                ('id', str(self.article.pk)): self.article,
+                ('doi', '10.1234/images'): self.article,
+            },
+        )
+
+    def test_load_article_images(self):
+        def fetch_article_image(article, url, session):
+            if url.endswith('broken.png'):
+                return None, 'unable to fetch {}'.format(url)
+            return {
+                'article_id': article.pk,
+                'mime_type': 'image/png',
+                'original_filename': 'hero.png',
+                'uuid_filename': 'hero-{}.png'.format(article.pk),
+            }, None
+
+        reader = [
+            ['id_type', 'id', 'url'],
+            ['doi', '10.1234/images', 'https://example.com/hero.png'],
+            ['doi', '10.1234/missing', 'https://example.com/hero.png'],
+            ['id', str(self.article.pk), 'https://example.com/broken.png'],
+        ]
+        with mock.patch.object(
+            utils, 'fetch_article_image', side_effect=fetch_article_image,
+        ):
+            errors = utils.load_article_images(self.request, reader)
+
+        self.assertEqual(
+            errors,
+            [
+                'Line 3: no article found with doi 10.1234/missing',
+                'Line 4: unable to fetch https://example.com/broken.png',
+            ],
+        )
+        self.article.refresh_from_db()
+        self.assertEqual(
+            self.article.large_image_file.original_filename, 'hero.png',
+        )
@@ -0,0 +1,181 @@
+import csv
+
+from django.test import TestCase
+
+from plugins.imports import validation
+from plugins.imports.benchmarks import corpora
+from plugins.imports.plugin_settings import UPDATE_CSV_HEADERS
+from submission import models as submission_models
+from utils.testing import helpers
+
+
+def csv_from_rows(rows):
+    lines = [','.join(UPDATE_CSV_HEADERS)]
+    for row in rows:
+        lines.append(
+            ','.join(row.get(header, '') for header in UPDATE_CSV_HEADERS)
+        )
+    return csv.DictReader(lines)
+
+
+class TestValidateUpdateRows(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.journal_one, cls.journal_two = helpers.create_journals()
+        cls.article = helpers.create_article(cls.journal_one)
+
+    def error_messages(self, errors):
+        return [error['error'] for error in errors]
+
+    def test_valid_csv_has_no_errors(self):
+        csv_string = corpora.generate_update_csv(
+            self.journal_one.code, articles=5, authors=3,
+        )
+        errors = validation.validate_update_rows(
+            csv.DictReader(csv_string.splitlines()),
+        )
+        self.assertEqual(errors, [])
+
+    def test_missing_headers(self):
+        reader = csv.DictReader(['Inadequate,Headers', 'data,other data'])
+        errors = validation.validate_update_rows(reader)
+        self.assertIn('Expected headers not found', errors[0]['error'])
+
+    def test_column_types(self):
+        reader = csv_from_rows([
+            {
+                'Article title': 'Title',
+                'Journal code': self.journal_one.code,
+                'Date published': 'Not a date',
+                'First page': 'i',
+                'Peer reviewed (Y/N)': 'Yes',
+                'Stage': 'Bad stage',
+                'Language': 'Dinosaur',
+            },
+        ])
+        messages = self.error_messages(validation.validate_update_rows(reader))
+        self.assertIn('Unparseable date in field Date published: Not a date', messages)
+        self.assertIn('Not a whole number in field First page: i', messages)
+        self.assertIn('Expected Y or N in field Peer reviewed (Y/N): Yes', messages)
+        self.assertIn('Unrecognized stage in field Stage: Bad stage', messages)
+        self.assertIn('Unrecognized language in field Language: Dinosaur', messages)
+
+    def test_values_are_stripped_as_they_are_imported(self):
+        # The importer only strips ASCII whitespace, so it would not read
+        # a flag followed by a non-breaking space as Y
+        reader = csv_from_rows([
+            {
+                'Article title': 'Title',
+                'Journal code': self.journal_one.code,
+                'Peer reviewed (Y/N)': ' Y ',
+                'Author is primary (Y/N)': 'Y\xa0',
+            },
+        ])
+        messages = self.error_messages(validation.validate_update_rows(reader))
+        self.assertEqual(
+            messages,
+            ['Expected Y or N in field Author is primary (Y/N): Y\xa0'],
+        )
+
+    def test_repeated_values_are_reported_once(self):
+        reader = csv_from_rows([
+            {
+                'Article title': 'Title {}'.format(i),
+                'Journal code': self.journal_one.code,
+                'Stage': 'Bad stage',
+            }
+            for i in range(3)
+        ])
+        errors = validation.validate_update_rows(reader)
+        self.assertEqual(
+            errors,
+            [{
+                'error': 'Unrecognized stage in field Stage: Bad stage',
+                'lines': '2, 3, 4',
+            }],
+        )
+
+    def test_unknown_journal_code(self):
+        reader = csv_from_rows([
+            {'Article title': 'Title', 'Journal code': 'NOPE'},
+        ])
+        errors = validation.validate_update_rows(reader)
+        self.assertEqual(
+            errors,
+            [{'error': 'No journal found with code NOPE', 'lines': '2'}],
+        )
+
+    def test_article_ids(self):
+        missing_id = str(
+            submission_models.Article.objects.order_by('-pk').first().pk + 1
+        )
+        reader = csv_from_rows([
+            {
+                'Janeway ID': missing_id,
+                'Article title': 'Title',
+                'Journal code': self.journal_one.code,
+            },
+            {
+                'Janeway ID': str(self.article.pk),
+                'Article title': 'Title',
+                'Journal code': self.journal_two.code,
+            },
+        ])
+        messages = self.error_messages(validation.validate_update_rows(reader))
+        self.assertIn(
+            'No article found with Janeway ID {}'.format(missing_id),
+            messages,
+        )
+        self.assertIn(
+            'Article {} belongs to journal {}, not {}'.format(
+                self.article.pk, self.journal_one.code, self.journal_two.code,
+            ),
+            messages,
+        )
+
+    def test_author_row_structure(self):
+        reader = csv_from_rows([
+            {'Author surname': 'Orphan'},
+            {'Article title': 'Title'},
+            {
+                'Author surname': 'Corporate',
+                'Author is corporate (Y/N)': 'Y',
+            },
+        ])
+        errors = validation.validate_update_rows(reader)
+        self.assertIn(
+            {'error': 'Author row found before any article row', 'lines': '2'},
+            errors,
+        )
+        self.assertIn(
+            {'error': 'Article row has no Journal code', 'lines': '3'},
+            errors,
+        )
+        self.assertIn(
+            {
+                'error': 'Corporate author has no Author institution',
+                'lines': '4',
+            },
+            errors,
+        )
+
+    def test_validation_queries(self):
+        reader = csv_from_rows([
+            {
+                'Janeway ID': str(self.article.pk),
+                'Article title': 'Title {}'.format(i),
+                'Journal code': self.journal_one.code,
+            }
+            for i in range(50)
+        ])
+        # One query for the journal codes and one for the article IDs
+        with self.assertNumQueries(2):
+            validation.validate_update_rows(reader)
+
+    def test_format_lines(self):
+        self.assertEqual(validation.format_lines([2, 3]), '2, 3')
+        self.assertEqual(
+            validation.format_lines(list(range(2, 15)), limit=3),
+            '2, 3, 4 and 10 more',
+        )
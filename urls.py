@@ -32,5 +32,9 @@ urlpatterns = [
         ),
     re_path(r'^articles/all/$', views.export_articles_all, name='import_export_articles_all'),
 
+    re_path(r'^jobs/(?P<job_id>\d+)/$', views.import_job, name='imports_job'),
+    re_path(r'^jobs/(?P<job_id>\d+)/status/$', views.import_job_status, name='imports_job_status'),
+    re_path(r'^jobs/(?P<job_id>\d+)/download/$', views.import_job_download, name='imports_job_download'),
+
     re_path(r'^api/', include(router.urls)),
 ]
@@ -1,24 +1,26 @@
 import cgi
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import csv
+import mimetypes
 import os
 import re
 import requests
+from requests.adapters import HTTPAdapter
 from urllib.parse import urlparse, unquote
 import uuid
 from zipfile import ZipFile
 from string import whitespace
 from datetime import timedelta
-from dateutil import parser as dateparser
 import shutil
 import glob
 
-from dateutil import parser as dateutil_parser
 from django.conf import settings
 from django.core.files.base import ContentFile
 from django.db import transaction
+from django.db.models import Q
 from django.template.defaultfilters import linebreaksbr
-from django.utils.dateparse import parse_datetime, parse_date
-from django.utils.timezone import is_aware, make_aware, now
+from django.utils.timezone import now
 
 from core import models as core_models, files, logic as core_logic, workflow, plugin_loader
 from identifiers import models as id_models
@@ -29,14 +31,22 @@ from submission import models as submission_models
 from utils import setting_handler
 from utils.logger import get_logger
 from utils.logic import get_current_request
-from plugins.imports import models
+from plugins.imports import (
+    dates,
+    instrumentation,
+    keywords as imports_keywords,
+    models,
+)
 from plugins.imports.templatetags import row_identifier
-from plugins.imports.plugin_settings import UPDATE_CSV_HEADERS
 
 logger = get_logger(__name__)
 
 
 TMP_PREFIX = "janeway-imports"
+# Number of article images downloaded at the same time
+ARTICLE_IMAGE_WORKERS = 8
+# Connect and read timeouts for article image downloads, in seconds
+ARTICLE_IMAGE_TIMEOUT = (5, 60)
 
 CSV_HEADER_ROW = "Article identifier, Article title,Section Name, Volume number, Issue number, Subtitle, Abstract, " \
     "publication stage, keywords, date/time accepted, date/time publishded , DOI, First Page, Last Page, Total pages, Is Peer Reviewed (Y/N), License URL," \
@@ -222,15 +232,23 @@ def import_submission_settings(request, reader):
         setting_handler.save_setting('general', 'reviewer_guidelines', journal, linebreaksbr(row[4]))
 
 
+def strip_row(row):
+    """
+    Strips the whitespace around the values of a CSV row. Rows are validated
+    and imported with the same stripped values.
+    """
+    return {
+        k: v.strip(whitespace) if isinstance(v, str) else None
+        for k, v in row.items()
+    }
+
+
 def prepare_reader_rows(reader):
     article_groups = []
 
     for i, row in enumerate(reader):
-        row_type = row_identifier.identify(row)
-
-        clean_row = {}
-        for k, v in row.items():
-            clean_row[k] = v.strip(whitespace) if isinstance(v, str) else None
+        clean_row = strip_row(row)
+        row_type = row_identifier.identify(clean_row)
 
         if row_type in ['Update', 'New Article']:
             article_groups.append(
@@ -239,7 +257,7 @@ def prepare_reader_rows(reader):
                     'primary_row': clean_row,
                     'author_rows': [],
                     'primary_row_number': i,
-                    'article_id': row.get(
+                    'article_id': clean_row.get(
                     'Janeway ID') if row_type == 'Update' else ''
                 }
             )
@@ -295,11 +313,14 @@ def prep_update(row):
 def update_article_metadata(reader, folder_path=None, owner=None, import_id=None, **kwargs):
     """
     Takes a dictreader and creates or updates article records.
+    Pass an on_progress callable to be told (processed, total) after
+    each article.
     """
     errors = []
     actions = {}
     return_articles = kwargs.get('return_articles')
     mock_import_stages = kwargs.get('mock_import_stages')
+    on_progress = kwargs.get('on_progress')
     csv_import = None
     prepared_reader_rows = prepare_reader_rows(reader)
     if import_id:
@@ -309,105 +330,123 @@ def update_article_metadata(reader, folder_path=None, owner=None, import_id=None
             logger.info("Created new Import: %s", import_id)
 
 
-    for prepared_row in prepared_reader_rows:
-        primary_row = prepared_row.get("primary_row")
-        journal, article, issue_type, issue = prep_update(primary_row)
-
-        if not journal:
-            errors.append(
-                {
-                    'row': prepared_row.get('primary_row_number'),
-                    'error': 'No journal found.',
-                }
-            )
-            continue
-
-        if article and article.journal != journal:
-            errors.append(
-                {
-                    'row': prepared_row.get('primary_row_number'),
-                    'error': 'article.journal ({}) and journal ({}) do not match.'.format(
-                        article.journal,
-                        journal
-                    ),
-                }
-            )
-            continue
-
-        if article:
-            try:
-                if article and csv_import:
-                    models.CSVImportUpdateArticle.objects.create(
-                        article=article,
-                        csv_import=csv_import,
-                        file_id=prepared_row["primary_row"].get(
-                            "File import identifier"
-                        ),
+    with instrumentation.track(
+        'update_article_metadata',
+        total=len(prepared_reader_rows),
+    ) as run, imports_keywords.keyword_cache():
+        for i, prepared_row in enumerate(prepared_reader_rows):
+            with run.item(prepared_row.get('primary_row_number')):
+                if on_progress:
+                    on_progress(i, len(prepared_reader_rows))
+                primary_row = prepared_row.get("primary_row")
+                with instrumentation.phase('prepare'):
+                    journal, article, issue_type, issue = prep_update(primary_row)
+
+                if not journal:
+                    errors.append(
+                        {
+                            'row': prepared_row.get('primary_row_number'),
+                            'error': 'No journal found.',
+                        }
                     )
-                article = update_article(article, issue, prepared_row, folder_path)
-                actions[article.pk] = f'Article {article.title} ({article.pk}) updated.'
-
-            except Exception as e:
-                import pdb;pdb.set_trace()
-                errors.append(
-                    {
-                        'article': primary_row.get('Article title'),
-                        'error': e,
-                    }
-                )
-        else:
-            try:
-                article = submission_models.Article.objects.create(
-                    journal=journal,
-                    title=primary_row.get('Article title'),
-                    article_agreement='Imported article',
-                    is_import=True,
-                )
-                if article and csv_import:
-                    models.CSVImportCreateArticle.objects.create(
-                        article=article,
-                        csv_import=csv_import,
-                        file_id=prepared_row["primary_row"].get(
-                            "File import identifier"
-                        ),
+                    continue
+
+                if article and article.journal != journal:
+                    errors.append(
+                        {
+                            'row': prepared_row.get('primary_row_number'),
+                            'error': 'article.journal ({}) and journal ({}) do not match.'.format(
+                                article.journal,
+                                journal
+                            ),
+                        }
                     )
-                article = update_article(article, issue, prepared_row, folder_path)
-                if owner:
-                    article.owner = owner
-                article.save()
-                proposed_stage = primary_row.get('Stage')
-                if mock_import_stages:
-                    import_stages = mock_import_stages
-                else:
-                    import_stages = IMPORT_STAGES
-
-                if proposed_stage in import_stages:
-                    article.stage = proposed_stage
+                    continue
+
+                if article:
+                    try:
+                        if article and csv_import:
+                            models.CSVImportUpdateArticle.objects.create(
+                                article=article,
+                                csv_import=csv_import,
+                                file_id=prepared_row["primary_row"].get(
+                                    "File import identifier"
+                                ),
+                            )
+                        with instrumentation.phase('update'):
+                            article = update_article(
+                                article, issue, prepared_row, folder_path,
+                            )
+                        actions[article.pk] = f'Article {article.title} ({article.pk}) updated.'
+
+                    except Exception as e:
+                        errors.append(
+                            {
+                                'article': primary_row.get('Article title'),
+                                'error': e,
+                            }
+                        )
                 else:
-                    article.stage = submission_models.STAGE_UNASSIGNED
-
-                article.save()
-                actions[article.pk] = f'Article {article.title} ({article.pk}) updated.'
-
-
-            except Exception as e:
-                errors.append(
-                    {
-                        'article': primary_row.get('Article title'),
-                        'error': e,
-                    }
-                )
-        if (primary_row and primary_row.get("PDF URI")):
-            try:
-                import_galley_from_uri( article, primary_row["PDF URI"])
-            except Exception as e:
-                errors.append({
-                        'article': primary_row.get('Article title'),
-                        'error': f'Failed to import PDF: {e}',
-                })
-
-        if primary_row:
-            import_custom_submission_fields(primary_row, article, errors)
+                    try:
+                        article = submission_models.Article.objects.create(
+                            journal=journal,
+                            title=primary_row.get('Article title'),
+                            article_agreement='Imported article',
+                            is_import=True,
+                        )
+                        if article and csv_import:
+                            models.CSVImportCreateArticle.objects.create(
+                                article=article,
+                                csv_import=csv_import,
+                                file_id=prepared_row["primary_row"].get(
+                                    "File import identifier"
+                                ),
+                            )
+                        with instrumentation.phase('create'):
+                            article = update_article(
+                                article, issue, prepared_row, folder_path,
+                            )
+                        if owner:
+                            article.owner = owner
+                        article.save()
+                        proposed_stage = primary_row.get('Stage')
+                        if mock_import_stages:
+                            import_stages = mock_import_stages
+                        else:
+                            import_stages = IMPORT_STAGES
+
+                        if proposed_stage in import_stages:
+                            article.stage = proposed_stage
+                        else:
+                            article.stage = submission_models.STAGE_UNASSIGNED
+
+                        article.save()
+                        actions[article.pk] = f'Article {article.title} ({article.pk}) updated.'
+
+
+                    except Exception as e:
+                        errors.append(
+                            {
+                                'article': primary_row.get('Article title'),
+                                'error': e,
+                            }
+                        )
+                if (primary_row and primary_row.get("PDF URI")):
+                    try:
+                        with instrumentation.phase('galley'):
+                            import_galley_from_uri(article, primary_row["PDF URI"])
+                    except Exception as e:
+                        errors.append({
+                                'article': primary_row.get('Article title'),
+                                'error': f'Failed to import PDF: {e}',
+                        })
+
+                if primary_row:
+                    with instrumentation.phase('custom_fields'):
+                        import_custom_submission_fields(primary_row, article, errors)
+
+    if on_progress:
+        on_progress(len(prepared_reader_rows), len(prepared_reader_rows))
 
     return errors, actions
 
@@ -551,23 +590,7 @@ def update_article(article, issue, prepared_row, folder_path):
 
 def update_keywords(keywords, article):
     new_keywords = [w.strip(whitespace) for w in keywords if w]
-
-    current_keywords = [str(kw) for kw in article.keywords.all()]
-    if (len(current_keywords) > 0) and (current_keywords != new_keywords):
-        article.keywords.clear()
-
-    for kw in new_keywords:
-        try:
-            keyword, c = submission_models.Keyword.objects.get_or_create(
-                word=kw
-            )
-        except submission_models.Keyword.MultipleObjectsReturned:
-            keyword = submission_models.Keyword.objects.filter(
-                word=kw
-            ).first()
-
-        article.keywords.add(keyword)
-
+    imports_keywords.set_article_keywords(article, new_keywords, replace=True)
     article.save()
 
 
@@ -638,60 +661,6 @@ def handle_file_import(row, article, folder_path):
                 article.data_figure_files.add(file)
 
 
-def verify_headers(path, errors):
-    with open(path, 'r', encoding='utf-8-sig') as verify_headers_file:
-        reader = csv.DictReader(verify_headers_file)
-        full_header_set = set(reader.fieldnames)
-    expected_headers = set(UPDATE_CSV_HEADERS)
-    relevant_header_set = set([h for h in full_header_set if h in expected_headers])
-    if relevant_header_set != expected_headers:
-        missing_headers = [h for h in expected_headers if h not in relevant_header_set]
-        errors.append({
-            'error': 'Expected headers not found: '+', '.join(
-                [h for h in missing_headers]
-            )
-        })
-    return errors
-
-
-def validate_selected_char_fields(path, errors, journal):
-    fields_to_validate = {}
-
-    # Stage
-    fields_to_validate['Stage'] = IMPORT_STAGES
-
-    # Language
-    language_choices = set()
-    for language_code, language_name in submission_models.LANGUAGE_CHOICES:
-        language_choices.add(language_code)
-        language_choices.add(language_name)
-    fields_to_validate['Language'] = language_choices
-
-    for field, choices in fields_to_validate.items():
-        errors = validate_char_field(path, errors, field, choices)
-    return errors
-
-
-def validate_char_field(path, errors, field, choices):
-    with open(path, 'r', encoding='utf-8-sig') as verify_char_file:
-        reader = csv.DictReader(verify_char_file)
-        proposed_values = set(
-            [row[field] for row in reader if row[field]]
-        )
-        unrecognized_values = []
-        for value in proposed_values:
-            if value not in choices:
-                unrecognized_values.append(value)
-        if unrecognized_values:
-            errors.append({
-                'error' : f'Unrecognized data in field {field}: '+', '.join(
-                    [v for v in unrecognized_values]
-                )
-            })
-
-    return errors
-
-
 def import_article_metadata(request, reader, id_type=None):
     headers = next(reader)  # skip headers
     errors = {}
@@ -793,12 +762,10 @@ def import_article_row(row, journal, issue_type, article=None):
         article.stage = stage
         sec_obj, created = submission_models.Section.objects.get_or_create(journal=journal, name=section)
         article.section = sec_obj
-        split_keywords = keywords.split("|")
-        for kw in split_keywords:
-            if kw.strip():
-                new_kw, _ = submission_models.Keyword.objects.get_or_create(
-                    word=kw)
-                article.keywords.add(new_kw)
+        imports_keywords.set_article_keywords(
+            article,
+            (kw for kw in keywords.split("|") if kw.strip()),
+        )
         if first_page and first_page.isdigit():
             article.first_page = first_page
         if last_page and last_page.isdigit():
@@ -934,6 +901,7 @@ def import_galley_from_uri(article, uri, figures_uri=None):
         django_file.name = os.path.basename(path)
     elif parsed.scheme in {"http", "https"}:
         response = requests.get(uri, headers=DEFAULT_REQUEST_HEADERS)
+        instrumentation.record_http_request()
         response.raise_for_status()
         filename = get_filename_from_headers(response)
         if not filename:
@@ -1002,42 +970,165 @@ def load_favicons(request):
         journal.save()
 
 
-def load_article_images(request, reader):
+def load_article_images(request, reader, workers=ARTICLE_IMAGE_WORKERS):
+    """
+    Sets the large image file of the articles listed in a CSV of
+    identifier type, identifier and image URL rows. Articles are resolved
+    together and images are downloaded concurrently.
+    :param request: HttpRequest with the journal of the articles
+    :param reader: csv.reader, the first row is the header
+    :param workers: Number of images downloaded at the same time
+    :return: A list of errors, one for each row that could not be loaded
+    """
     row_list = [row for row in reader]
     row_list.remove(row_list[0])
 
-    for row in row_list:
-        article = submission_models.Article.get_article(request.journal, row[0], row[1])
+    errors = []
+    rows = []
+    for line, row in enumerate(row_list, start=2):
+        if len(row) < 3 or not all(row[:3]):
+            errors.append(
+                'Line {}: expected an identifier type, identifier and '
+                'URL'.format(line)
+            )
+        else:
+            rows.append((line, row[0], row[1], row[2]))
 
-        image = requests.get(row[2], stream=True)
-        if image.status_code == 200:
+    articles = resolve_articles(
+        request.journal,
+        [(id_type, identifier) for _, id_type, identifier, _ in rows],
+    )
+    to_download = []
+    for line, id_type, identifier, url in rows:
+        article = articles.get((id_type, identifier))
+        if article:
+            to_download.append((line, article, url))
+        else:
+            errors.append('Line {}: no article found with {} {}'.format(
+                line, id_type, identifier,
+            ))
+
+    with requests.Session() as session:
+        adapter = HTTPAdapter(pool_maxsize=workers)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        instrumentation.count_session_requests(session)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            downloads = list(executor.map(
+                lambda download: fetch_article_image(
+                    download[1], download[2], session,
+                ),
+                to_download,
+            ))
+
+    new_files = []
+    for (line, article, url), (file_kwargs, error) in zip(
+        to_download, downloads,
+    ):
+        if error:
+            errors.append('Line {}: {}'.format(line, error))
+        else:
+            new_files.append(core_models.File(
+                label='Large Image File',
+                privacy='public',
+                **file_kwargs,
+            ))
+    core_models.File.objects.bulk_create(new_files)
 
-            content_disposition = image.headers['content-disposition']
-            filename = re.findall("filename=\"(.+)\"", content_disposition)[0]
+    # Not every database backend sets the PKs of bulk created objects
+    saved_files = core_models.File.objects.filter(
+        uuid_filename__in=[new_file.uuid_filename for new_file in new_files],
+    )
+    articles_by_pk = {article.pk: article for _, article, _ in to_download}
+    for saved_file in saved_files:
+        articles_by_pk[saved_file.article_id].large_image_file = saved_file
+    submission_models.Article.objects.bulk_update(
+        [articles_by_pk[saved_file.article_id] for saved_file in saved_files],
+        ['large_image_file'],
+    )
 
-            name, extension = os.path.splitext(filename)
-            uuid_filename = '{0}{1}'.format(uuid.uuid4(), extension)
+    return errors
 
-            directory = os.path.join(settings.BASE_DIR, 'files', 'articles', str(article.pk))
-            filepath = os.path.join(directory, uuid_filename)
 
-            if not os.path.exists(directory):
-                os.makedirs(directory)
+def resolve_articles(journal, identifiers):
+    """
+    Looks up articles by identifier, as Article.get_article does, with a
+    query for Janeway IDs and one for every other identifier type
+    :param journal: The Journal of the articles
+    :param identifiers: An iterable of (identifier type, identifier) pairs
+    :return: A dict of (identifier type, identifier) to Article
+    """
+    values_by_type = defaultdict(set)
+    for id_type, identifier in identifiers:
+        values_by_type[id_type].add(identifier)
+
+    articles = {}
+    article_pks = values_by_type.pop('id', set())
+    for article in submission_models.Article.objects.filter(
+        journal=journal,
+        pk__in=[pk for pk in article_pks if pk.isdigit()],
+    ):
+        articles[('id', str(article.pk))] = article
+
+    if values_by_type:
+        query = Q()
+        for id_type, values in values_by_type.items():
+            query |= Q(id_type=id_type, identifier__in=values)
+        for identifier in id_models.Identifier.objects.filter(
+            query,
+            article__journal=journal,
+        ).select_related('article'):
+            articles[(identifier.id_type, identifier.identifier)] = (
+                identifier.article
+            )
+
+    return articles
 
+
+def fetch_article_image(article, url, session):
+    """
+    Streams an image into the files directory of an article
+    :param article: The Article the image belongs to
+    :param url: The URL of the image
+    :param session: requests.Session to download with
+    :return: A tuple of keyword arguments for the File of the image, or
+        None, and an error message, or None
+    """
+    try:
+        with session.get(
+            url, stream=True, timeout=ARTICLE_IMAGE_TIMEOUT,
+        ) as response:
+            response.raise_for_status()
+            filename = (
+                get_filename_from_headers(response)
+                or os.path.basename(unquote(urlparse(url).path))
+                or 'image'
+            )
+            _name, extension = os.path.splitext(filename)
+            if not extension:
+                extension = mimetypes.guess_extension(
+                    response.headers.get('content-type', '').split(';')[0],
+                ) or ''
+                filename += extension
+            uuid_filename = '{0}{1}'.format(uuid.uuid4(), extension)
+
+            directory = os.path.join(
+                settings.BASE_DIR, 'files', 'articles', str(article.pk),
+            )
+            os.makedirs(directory, exist_ok=True)
+            filepath = os.path.join(directory, uuid_filename)
             with open(filepath, 'wb') as f:
-                for chunk in image:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
                     f.write(chunk)
+    except (requests.RequestException, OSError) as e:
+        return None, 'unable to fetch {}: {}'.format(url, e)
 
-            new_file = core_models.File.objects.create(
-                article_id=article.pk,
-                mime_type=files.file_path_mime(filepath),
-                original_filename=filename,
-                uuid_filename=uuid_filename,
-                label='Large Image File',
-                privacy='public',
-            )
-            article.large_image_file = new_file
-            article.save()
+    return {
+        'article_id': article.pk,
+        'mime_type': files.file_path_mime(filepath),
+        'original_filename': filename,
+        'uuid_filename': uuid_filename,
+    }, None
 
 
 def orcid_from_url(orcid_url):
@@ -1047,23 +1138,36 @@ def orcid_from_url(orcid_url):
         raise ValueError("%s is not a valid orcid URL" % orcid_url)
 
 
-def prep_update_file(path):
+def prep_update_file(path, folder_name=None):
+    """
+    Copies or extracts an uploaded update CSV or zip into a temp folder
+    :param path: Path to the upload
+    :param folder_name: Optional name of the temp folder. When a folder of
+        that name exists it is reused rather than copying or extracting the
+        upload again, so the CSV keeps the same path and modification time.
+    :return: A tuple of the CSV path, the temp folder path and a list of
+        errors
+    """
     errors = []
 
-    folder_name = str(uuid.uuid4())
+    folder_name = folder_name or str(uuid.uuid4())
     temp_folder_path = os.path.join(settings.BASE_DIR, 'files', 'temp', folder_name)
-    os.mkdir(temp_folder_path)
+    prepared = os.path.isdir(temp_folder_path)
+    if not prepared:
+        os.mkdir(temp_folder_path)
 
     if path.endswith('.csv'):
         csv_filename = path.split('/')[-1]
-        destination_csv_path = os.path.join(temp_folder_path, csv_filename)
-        csv_path = shutil.copyfile(path, destination_csv_path)
+        csv_path = os.path.join(temp_folder_path, csv_filename)
+        if not prepared:
+            shutil.copyfile(path, csv_path)
 
     elif path.endswith('.zip'):
 
-        with ZipFile(path, 'r') as zipObj:
-            # Extract all the contents of zip file in different directory
-            zipObj.extractall(temp_folder_path)
+        if not prepared:
+            with ZipFile(path, 'r') as zipObj:
+                # Extract all the contents of zip file in different directory
+                zipObj.extractall(temp_folder_path)
 
         destination_csv_wildcard = os.path.join(temp_folder_path, '*.csv')
 
@@ -1139,35 +1243,8 @@ def get_filename_from_headers(response):
 
 
 def datetime_parser(date_time_str):
-    if not date_time_str:
-        return
-
-    # Try ISO datetime
-    datetime_obj = parse_datetime(date_time_str)
-    # Try ISO Date
-    if not datetime_obj:
-        datetime_obj = parse_date(date_time_str)
-    # Try our best
-    if not datetime_obj:
-        datetime_obj = dateutil_parser.parse(date_time_str)
-
-    return datetime_obj
+    return dates.parse_datetime_or_date(date_time_str)
 
 
 def get_aware_datetime(unparsed_string, use_noon_if_no_time = True):
-
-    if use_noon_if_no_time and re.fullmatch(
-        '[0-9]{4}-[0-9]{2}-[0-9]{2}',
-        unparsed_string
-    ):
-        unparsed_string += ' 12:00'
-
-    try:
-        parsed_datetime = dateparser.parse(unparsed_string)
-    except ValueError:
-        raise
-
-    if is_aware(parsed_datetime):
-        return parsed_datetime
-    else:
-        return make_aware(parsed_datetime)
+    return dates.get_aware_datetime(unparsed_string, use_noon_if_no_time)
@@ -0,0 +1,195 @@
+"""
+Validation of Import / Export / Update CSVs before anything is imported.
+
+The CSV is read once. Values are gathered per column so that each distinct
+value is checked only once, however many rows repeat it, and journal codes
+and Janeway IDs are resolved with a query each. Nothing is written to the
+database, so the report can be shown before an import is queued.
+"""
+import csv
+from collections import defaultdict
+
+from journal import models as journal_models
+from submission import models as submission_models
+
+from plugins.imports import dates, utils
+from plugins.imports.plugin_settings import UPDATE_CSV_HEADERS
+from plugins.imports.templatetags import row_identifier
+
+# Data starts on the second line of the file, after the headers
+FIRST_LINE = 2
+
+DATE_FIELDS = ('Date accepted', 'Date published', 'Issue pub date')
+INTEGER_FIELDS = (
+    'Janeway ID',
+    'Article number',
+    'First page',
+    'Last page',
+    'Volume number',
+)
+BOOLEAN_FIELDS = (
+    'Peer reviewed (Y/N)',
+    'Author is primary (Y/N)',
+    'Author is corporate (Y/N)',
+)
+
+
+def get_language_choices():
+    choices = set()
+    for language_code, language_name in submission_models.LANGUAGE_CHOICES:
+        choices.add(language_code)
+        choices.add(language_name)
+    return choices
+
+
+def is_date(value):
+    try:
+        dates.get_aware_datetime(value)
+    except (ValueError, OverflowError):
+        return False
+    return True
+
+
+def is_integer(value):
+    try:
+        int(value)
+    except ValueError:
+        return False
+    return True
+
+
+def format_lines(lines, limit=10):
+    shown = ', '.join(str(line) for line in lines[:limit])
+    if len(lines) > limit:
+        shown += ' and {} more'.format(len(lines) - limit)
+    return shown
+
+
+def validate_update_csv(path):
+    """
+    Validates an update CSV without importing it
+    :param path: Path to the CSV file
+    :return: A list of errors, each a dict with an 'error' message and the
+        'lines' of the file it was found on
+    """
+    with open(path, 'r', encoding='utf-8-sig') as csv_file:
+        return validate_update_rows(csv.DictReader(csv_file))
+
+
+def validate_update_rows(reader):
+    """
+    Validates the rows of a csv.DictReader over an update CSV
+    :param reader: csv.DictReader
+    :return: A list of error dicts
+    """
+    errors = []
+    headers = set(reader.fieldnames or [])
+    missing_headers = [h for h in UPDATE_CSV_HEADERS if h not in headers]
+    if missing_headers:
+        errors.append({
+            'error': 'Expected headers not found: ' + ', '.join(missing_headers)
+        })
+
+    # column => value => lines the value appears on
+    values = defaultdict(lambda: defaultdict(list))
+    # Janeway ID => journal code given in the same row
+    article_journals = defaultdict(set)
+    structure_errors = defaultdict(list)
+    seen_article = False
+
+    for line, row in enumerate(reader, start=FIRST_LINE):
+        row = utils.strip_row({
+            key: value for key, value in row.items() if key in headers
+        })
+        row_type = row_identifier.identify(row)
+
+        if row_type == 'Author':
+            if not seen_article:
+                structure_errors[
+                    'Author row found before any article row'
+                ].append(line)
+        else:
+            seen_article = True
+            if not row.get('Journal code'):
+                structure_errors['Article row has no Journal code'].append(line)
+            if row_type == 'Update':
+                article_journals[row['Janeway ID']].add(row.get('Journal code'))
+
+        if (
+            row.get('Author is corporate (Y/N)') == 'Y'
+            and not row.get('Author institution')
+        ):
+            structure_errors[
+                'Corporate author has no Author institution'
+            ].append(line)
+
+        for field, value in row.items():
+            if value:
+                values[field][value].append(line)
+
+    for message, lines in structure_errors.items():
+        errors.append({'error': message, 'lines': format_lines(lines)})
+
+    checks = [
+        (DATE_FIELDS, is_date, 'Unparseable date'),
+        (INTEGER_FIELDS, is_integer, 'Not a whole number'),
+        (BOOLEAN_FIELDS, lambda value: value in {'Y', 'N'}, 'Expected Y or N'),
+        (('Stage',), lambda value: value in utils.IMPORT_STAGES,
+            'Unrecognized stage'),
+        (('Language',), get_language_choices().__contains__,
+            'Unrecognized language'),
+    ]
+    for fields, check, message in checks:
+        for field in fields:
+            for value, lines in values[field].items():
+                if not check(value):
+                    errors.append({
+                        'error': '{} in field {}: {}'.format(
+                            message, field, value,
+                        ),
+                        'lines': format_lines(lines),
+                    })
+
+    journal_codes = set(values['Journal code'])
+    known_codes = set(
+        journal_models.Journal.objects.filter(
+            code__in=journal_codes,
+        ).values_list('code', flat=True)
+    )
+    for code in sorted(journal_codes - known_codes):
+        errors.append({
+            'error': 'No journal found with code {}'.format(code),
+            'lines': format_lines(values['Journal code'][code]),
+        })
+
+    article_ids = {
+        int(article_id) for article_id in article_journals
+        if is_integer(article_id)
+    }
+    found_articles = dict(
+        submission_models.Article.objects.filter(
+            pk__in=article_ids,
+        ).values_list('pk', 'journal__code')
+    )
+    for article_id, codes in article_journals.items():
+        if not is_integer(article_id):
+            continue
+        lines = format_lines(values['Janeway ID'][article_id])
+        if int(article_id) not in found_articles:
+            errors.append({
+                'error': 'No article found with Janeway ID {}'.format(
+                    article_id,
+                ),
+                'lines': lines,
+            })
+        elif codes - {found_articles[int(article_id)]}:
+            errors.append({
+                'error': 'Article {} belongs to journal {}, not {}'.format(
+                    article_id,
+                    found_articles[int(article_id)],
+                    ', '.join(sorted(code or '' for code in codes)),
+                ),
+                'lines': lines,
+            })
+
+    return errors
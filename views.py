@@ -7,7 +7,7 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
 from django.urls import reverse
-from django.http import Http404
+from django.http import Http404, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.utils import translation
 
@@ -20,10 +20,13 @@ from plugins.imports import (
     export,
     forms,
     jats,
+    jobs,
     logic,
     models,
+    preview,
     serializers,
     utils,
+    validation,
 )
 from journal import models as journal_models
 from submission import models as submission_models
@@ -93,7 +96,12 @@ def import_action(request, filename):
         raise Http404()
 
     if request_type == 'update':
-        path, folder_path, errors = utils.prep_update_file(path)
+        # The folder is named after the upload so that later pages of the
+        # preview reuse it, and with it the cached summary of the CSV
+        path, folder_path, errors = utils.prep_update_file(
+            path,
+            folder_name='update_{}'.format(os.path.splitext(filename)[0]),
+        )
 
         if errors:
             # If we have any errors delete the temp folder and redirect back.
@@ -134,22 +142,21 @@ def import_action(request, filename):
         elif request_type == 'update':
 
             # Verify a few things to help user spot problems
-            errors = utils.verify_headers(path, errors)
-
-            errors = utils.validate_selected_char_fields(
-                path,
-                errors,
-                request.journal
-            )
+            errors = validation.validate_update_csv(path)
 
             if not errors:
-                with translation.override(settings.LANGUAGE_CODE):
-                    errors, actions = utils.update_article_metadata(
-                        reader,
-                        folder_path,
-                        owner=request.user,
-                        import_id=filename,
-                    )
+                file.close()
+                job = jobs.enqueue(
+                    models.ImportJob.UPDATE,
+                    owner=request.user,
+                    journal=request.journal,
+                    path=path,
+                    folder_path=folder_path,
+                    filename=filename,
+                )
+                return redirect(
+                    reverse('imports_job', kwargs={'job_id': job.pk})
+                )
 
         else:
             raise Http404
@@ -158,10 +165,19 @@ def import_action(request, filename):
             messages.add_message(request, messages.SUCCESS, 'Import complete')
             return redirect(reverse('imports_index'))
 
+    file.close()
+    summary, page = preview.get_preview(
+        path,
+        request.GET.get('page'),
+        dict_rows=request_type == 'update',
+    )
+
     template = 'import/editorial_import.html'
     context = {
         'filename': filename,
-        'reader': reader,
+        'summary': summary,
+        'page': page,
+        'query_string': preview.get_query_string(request),
         'errors': errors,
         'error_file': error_file,
         'type': request_type,
@@ -243,10 +259,17 @@ def article_images(request):
 
         return redirect(reverse('imports_index'))
 
+    summary = page = None
+    if filename:
+        file.close()
+        summary, page = preview.get_preview(path, request.GET.get('page'))
+
     template = 'import/article_images.html'
     context = {
         'filename': filename,
-        'reader': reader,
+        'summary': summary,
+        'page': page,
+        'query_string': preview.get_query_string(request),
     }
 
     return render(request, template, context)
@@ -314,32 +337,29 @@ def wordpress_posts(request, import_id):
         models.WordPressImport,
         pk=import_id,
     )
-    posts = list()
-    offset = 0
-    increment = 20
-
-    while True:
-        new_posts = logic.get_posts(import_object, increment, offset)
-        posts.extend(new_posts)
-        if len(new_posts) == 0:
-            break
-
-        offset = offset + increment
-        print(offset, posts)
+    posts = logic.get_cached_posts(
+        import_object,
+        refresh=bool(request.GET.get('refresh')),
+    )
 
     if request.POST:
-        ids_to_import = request.POST.getlist('post')
-        logic.import_posts(ids_to_import, posts, request, import_object)
+        job = jobs.enqueue(
+            models.ImportJob.WORDPRESS,
+            owner=request.user,
+            journal=request.journal,
+            import_id=import_object.pk,
+            post_ids=request.POST.getlist('post'),
+            content_type_id=request.model_content_type.pk,
+            object_id=request.site_type.pk,
+        )
         messages.add_message(
             request,
             messages.SUCCESS,
-            'Import complete, deleting details.'
+            'Import queued, details will be deleted once it completes.'
         )
 
         return redirect(
-            reverse(
-                'wordpress_xmlrpc_import'
-            )
+            reverse('imports_job', kwargs={'job_id': job.pk})
         )
 
     template = 'import/wordpress_posts.html'
@@ -430,22 +450,33 @@ def export_articles_all(request):
         )
         articles = articles.filter(stage__in=workflow_element.stages)
 
+    if request.POST and 'export_all' in request.POST:
+        return export.stream_export_response(request.journal, articles)
+
+    if request.POST and 'export_all_background' in request.POST:
+        job = jobs.enqueue(
+            models.ImportJob.EXPORT,
+            owner=request.user,
+            journal=request.journal,
+            article_ids=list(articles.values_list('pk', flat=True)),
+        )
+        return redirect(
+            reverse('imports_job', kwargs={'job_id': job.pk})
+        )
+
     workflow_type, proofing_assignments = utils.get_proofing_assignments_for_journal(
         request.journal,
     )
 
+    articles = export.prefetch_export_data(articles)
+
     for article in articles:
         article.export_files = article.exportfile_set.all()
-        article.export_file_pks = [ef.file.pk for ef in article.exportfile_set.all()]
+        article.export_file_pks = [ef.file.pk for ef in article.export_files]
 
         if proofing_assignments:
             article.proofing_files = utils.proofing_files(workflow_type, proofing_assignments, article)
 
-    if request.POST:
-        if 'export_all' in request.POST:
-            csv_path, csv_name = export.export_using_import_format(articles)
-            return export.zip_export_files(request.journal, articles, csv_path)
-
     template = 'import/articles_all.html'
     context = {
         'articles_in_stage': articles,
@@ -500,11 +531,17 @@ def import_from_jats(request):
             else:
                 articles.append((uploaded_file.name, article))
         elif zipfile.is_zipfile(uploaded_file):
-            articles, errors = jats.import_jats_zipped(
-                uploaded_file, request.journal,
+            _filename, path = files.save_file_to_temp(uploaded_file)
+            job = jobs.enqueue(
+                models.ImportJob.JATS,
                 owner=request.user,
+                journal=request.journal,
+                path=path,
                 stage=stage,
             )
+            return redirect(
+                reverse('imports_job', kwargs={'job_id': job.pk})
+            )
         else:
             messages.add_message(
                 request,
@@ -519,3 +556,67 @@ def import_from_jats(request):
     }
 
     return render(request, template, context)
+
+
+def get_job_for_user(request, job_id):
+    job = get_object_or_404(models.ImportJob, pk=job_id)
+    if job.owner != request.user and not request.user.is_staff:
+        raise Http404
+    return job
+
+
+@decorators.editor_user_required
+def import_job(request, job_id):
+    """
+    Displays the progress of a background import or export job.
+    :param request: HttpRequest
+    :param job_id: ImportJob object PK
+    :return: HttpResponse
+    """
+    job = get_job_for_user(request, job_id)
+
+    template = 'import/job.html'
+    context = {
+        'job': job,
+    }
+
+    return render(request, template, context)
+
+
+@decorators.editor_user_required
+def import_job_status(request, job_id):
+    """
+    Returns the progress of a job as JSON so that the job page can poll it.
+    :param request: HttpRequest
+    :param job_id: ImportJob object PK
+    :return: JsonResponse
+    """
+    job = get_job_for_user(request, job_id)
+
+    return JsonResponse(
+        {
+            'status': job.status,
+            'status_display': job.get_status_display(),
+            'processed': job.processed,
+            'total': job.total,
+            'errors': job.errors,
+            'finished': job.is_finished,
+        }
+    )
+
+
+@decorators.editor_user_required
+def import_job_download(request, job_id):
+    """
+    Serves the file produced by a finished job.
+    :param request: HttpRequest
+    :param job_id: ImportJob object PK
+    :return: HttpStreamingResponse
+    """
+    job = get_job_for_user(request, job_id)
+    if not job.result_file:
+        raise Http404
+    filepath = files.get_temp_file_path_from_name(job.result_file)
+    if not os.path.exists(filepath):
+        raise Http404
+    return files.serve_temp_file(filepath, job.result_file)